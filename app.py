@@ -1,9 +1,17 @@
 # Interface graphique Tkinter
+# python app.py                    -> lance l'application
+# python app.py --profile-startup  -> affiche aussi la durée de chaque étape du démarrage
 
+import time
+# Avant les autres imports : --profile-startup compte aussi le temps des imports
+DEBUT = time.perf_counter()
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from services import BilletterieService
 from dao import init_database
+from taches import ExecuteurTaches
 import os
 
 
@@ -20,11 +28,37 @@ class Colors:
     BORDER = "#e5e7eb"       # Bordures
 
 
+# --- Mesure du démarrage (--profile-startup) ---
+class ProfilDemarrage:
+    """Heure de chaque étape du démarrage, en ms depuis le lancement de app.py"""
+    
+    def __init__(self, debut=DEBUT):
+        self.debut = debut
+        self.etapes = []
+    
+    def etape(self, nom):
+        self.etapes.append((nom, (time.perf_counter() - self.debut) * 1000))
+    
+    def ms(self, nom):
+        return next((ms for n, ms in self.etapes if n == nom), None)
+    
+    def afficher(self):
+        print("Démarrage (ms depuis le lancement de app.py) :")
+        for nom, ms in self.etapes:
+            print(f"  {nom:<32} {ms:>8.1f}")
+
+
 # --- Application principale ---
 class BilletterieApp:
     
-    def __init__(self, root):
+    # Recherche pendant la frappe : on cherche après une pause de DELAI_RECHERCHE_MS
+    DELAI_RECHERCHE_MS = 150
+    CIBLES_RECHERCHE = ("Acheteurs", "Événements")
+    
+    def __init__(self, root, profil=None):
         self.root = root
+        # profil : ProfilDemarrage avec --profile-startup, sinon None
+        self.profil = profil
         self.root.title("Billetterie - Ridwan & Sébastien")
         
         # Taille de la fenêtre
@@ -37,16 +71,38 @@ class BilletterieApp:
         self.root.geometry(f"{win_w}x{win_h}+{x}+{y}")
         self.root.configure(bg=Colors.BG)
         
-        # Service métier
+        # Service métier : rien n'est lu dans la base ici (DAO et connexions au premier usage)
         self.service = BilletterieService()
+        # Les appels au service tournent dans des threads pour ne pas figer la fenêtre
+        self.taches = ExecuteurTaches(self.root, sur_activite=self.afficher_activite)
+        self.etape("service")
         
         # Interface
         self.create_interface()
-        self.charger_stats()
         self.afficher_accueil()
+        # Les cartes montrent d'abord les chiffres du dernier lancement (un petit fichier),
+        # puis les vrais, calculés en arrière-plan une fois la fenêtre affichée (voir main)
+        anciennes = self.service.indicateurs_sauvegardes()
+        if anciennes is not None:
+            try:
+                statut = f"Chiffres du {anciennes['date_analyse']}, mise à jour..."
+                self.afficher_stats(anciennes)
+                self.set_status(statut)
+                self.etape("cartes (dernier lancement)")
+            except (KeyError, TypeError, ValueError):
+                # Fichier abîmé ou d'une autre version (pas un dict, clé manquante, valeur
+                # pas un nombre) : comme s'il n'y en avait pas, les vrais chiffres arrivent
+                anciennes = None
+        self.cartes_anciennes = anciennes is not None
+        self.etape("interface")
         
         self.root.protocol("WM_DELETE_WINDOW", self.quitter)
     
+    def etape(self, nom):
+        # Étape du démarrage (--profile-startup)
+        if self.profil is not None:
+            self.profil.etape(nom)
+    
     def create_interface(self):
         # Frame principale
         main = tk.Frame(self.root, bg=Colors.BG)
@@ -128,19 +184,40 @@ class BilletterieApp:
         self.card_billets = self.creer_carte(stats_frame, "Billets vendus", "0", Colors.PRIMARY)
         self.card_events = self.creer_carte(stats_frame, "Événements", "0", Colors.WARNING)
         
-        # Zone de texte pour les résultats
+        # Recherche d'acheteurs ou d'événements au fil de la frappe
+        recherche = tk.Frame(right, bg=Colors.BG)
+        recherche.pack(fill=tk.X, pady=(0, 10))
+        tk.Label(recherche, text="🔍", font=("Arial", 11),
+                bg=Colors.BG, fg=Colors.TEXT).pack(side=tk.LEFT, padx=(5, 5))
+        self.cible_recherche = ttk.Combobox(recherche, values=self.CIBLES_RECHERCHE,
+                                            state="readonly", width=12)
+        self.cible_recherche.set(self.CIBLES_RECHERCHE[0])
+        self.cible_recherche.pack(side=tk.LEFT, padx=(0, 5))
+        self.entry_recherche = tk.Entry(recherche, font=("Arial", 11))
+        self.entry_recherche.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.entry_recherche.bind("<KeyRelease>", self.sur_frappe)
+        self.cible_recherche.bind("<<ComboboxSelected>>", self.sur_frappe)
+        self.recherche_planifiee = None
+        
+        # Zone des résultats : du texte, ou la liste des ventes
         result_frame = tk.Frame(right, bg=Colors.BG_WHITE)
         result_frame.pack(fill=tk.BOTH, expand=True)
         
-        self.result_text = tk.Text(result_frame, font=("Consolas", 10),
+        self.vue_texte = tk.Frame(result_frame, bg=Colors.BG_WHITE)
+        self.vue_texte.pack(fill=tk.BOTH, expand=True)
+        
+        self.result_text = tk.Text(self.vue_texte, font=("Consolas", 10),
                                    bg=Colors.BG_WHITE, fg=Colors.TEXT,
                                    relief=tk.FLAT, padx=15, pady=15)
         self.result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        scrollbar = tk.Scrollbar(result_frame, command=self.result_text.yview)
+        scrollbar = tk.Scrollbar(self.vue_texte, command=self.result_text.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.result_text.config(yscrollcommand=scrollbar.set)
         
+        # Tableau des ventes chargé page par page (affiché par lister_ventes)
+        self.vue_ventes = ListeVentes(result_frame, self.service, self.taches, self.set_status)
+        
         # Barre de statut en bas
         self.status_label = tk.Label(self.root, text="Prêt", font=("Arial", 9),
                                      bg=Colors.BG, fg=Colors.TEXT_LIGHT, anchor="w")
@@ -161,17 +238,74 @@ class BilletterieApp:
         return label_val
     
     def charger_stats(self):
-        """Charge les statistiques dans les cartes"""
-        try:
-            stats = self.service.calculer_indicateurs_avances()
-            self.card_ca.config(text=f"{stats['chiffre_affaires_total']:.2f} €")
-            self.card_billets.config(text=str(stats['quantite_totale']))
-            self.card_events.config(text=str(stats['nombre_evenements']))
-        except:
-            pass
+        """Charge les statistiques dans les cartes (en arrière-plan), et les garde pour le prochain démarrage"""
+        self.taches.lancer("stats", self.service.calcul_et_sauvegarde_indicateurs,
+                           sur_resultat=self.stats_a_jour, sur_erreur=self.erreur_stats)
+    
+    def afficher_stats(self, stats):
+        # Textes préparés avant de toucher aux cartes : une valeur illisible n'en change aucune
+        ca = f"{stats['chiffre_affaires_total']:.2f} €"
+        billets, evenements = str(stats['quantite_totale']), str(stats['nombre_evenements'])
+        self.card_ca.config(text=ca)
+        self.card_billets.config(text=billets)
+        self.card_events.config(text=evenements)
+    
+    def stats_a_jour(self, stats):
+        self.afficher_stats(stats)
+        if self.cartes_anciennes:
+            self.cartes_anciennes = False
+            self.set_status("Prêt")
+        self.fin_demarrage("cartes à jour")
+    
+    def erreur_stats(self, erreur):
+        # Les cartes gardent les chiffres affichés (on prévient s'ils datent du dernier lancement)
+        if self.cartes_anciennes:
+            self.set_status(f"Chiffres du dernier lancement, mise à jour impossible : {erreur}")
+        self.fin_demarrage("cartes en erreur")
+    
+    def fin_demarrage(self, etape):
+        # Premier calcul des cartes terminé : fin de la mesure du démarrage
+        if self.profil is None:
+            return
+        self.etape(etape)
+        self.profil.afficher()
+        self.set_status(f"Premier affichage en {self.profil.ms('premier affichage'):.0f} ms, "
+                        f"{etape} en {self.profil.ms(etape):.0f} ms")
+        self.profil = None
+    
+    def lancer(self, libelle, fonction, sur_resultat):
+        """
+        Lance un appel au service en arrière-plan pour la zone principale
+        Un nouveau clic remplace le chargement précédent (son résultat est ignoré)
+        """
+        self.vue_ventes.annuler()
+        self.taches.lancer("resultat", fonction, libelle=libelle,
+                           sur_resultat=sur_resultat, sur_erreur=self.erreur_tache)
+    
+    def erreur_tache(self, erreur):
+        self.set_status(f"Erreur : {erreur}")
+        messagebox.showerror("Erreur", str(erreur))
+    
+    def afficher_activite(self, taches):
+        """Indique dans la barre de statut ce qui est en train de charger"""
+        if taches:
+            libelle, duree = max(taches, key=lambda t: t[1])
+            self.set_status(f"⏳ {libelle}... {duree:.1f} s")
+        elif self.status_label.cget("text").startswith("⏳"):
+            # Tâche annulée sans callback : on n'affiche plus le sablier
+            self.set_status("Prêt")
+    
+    def montrer_vue(self, vue):
+        """Affiche la zone de texte ou le tableau des ventes"""
+        for v in (self.vue_texte, self.vue_ventes):
+            if v is not vue:
+                v.pack_forget()
+        if not vue.winfo_ismapped():
+            vue.pack(fill=tk.BOTH, expand=True)
     
     def afficher(self, titre, contenu):
         """Affiche du contenu dans la zone de texte"""
+        self.montrer_vue(self.vue_texte)
         self.result_text.delete("1.0", tk.END)
         self.result_text.insert(tk.END, f"{titre}\n")
         self.result_text.insert(tk.END, "=" * 50 + "\n\n")
@@ -196,28 +330,16 @@ class BilletterieApp:
     
     def rafraichir(self):
         """Rafraîchit les données"""
+        if self.service.cache is not None:
+            self.service.cache.vider()
         self.charger_stats()
         self.lister_ventes()
-        self.set_status("Données rafraîchies")
     
     def lister_ventes(self):
-        """Liste toutes les ventes"""
-        ventes = self.service.lister_ventes()
-        
-        if not ventes:
-            self.afficher("Liste des ventes", "Aucune vente enregistrée.")
-            return
-        
-        contenu = f"Total : {len(ventes)} vente(s)\n\n"
-        for v in ventes:
-            contenu += f"[#{v['id_vente']}] {v['acheteur']}\n"
-            contenu += f"   Événement : {v['evenement']}\n"
-            contenu += f"   Billet : {v['type_billet']} x{v['quantite']}\n"
-            contenu += f"   Montant : {v['montant_total']:.2f}€\n"
-            contenu += f"   Date : {v['date_vente']}\n\n"
-        
-        self.afficher("Liste des ventes", contenu)
-        self.set_status(f"{len(ventes)} vente(s) trouvée(s)")
+        """Liste les ventes (tableau chargé au fur et à mesure du scroll)"""
+        self.taches.annuler("resultat")
+        self.montrer_vue(self.vue_ventes)
+        self.vue_ventes.charger()
     
     def ajouter_vente(self):
         """Ouvre le dialogue pour ajouter une vente"""
@@ -266,10 +388,32 @@ class BilletterieApp:
             else:
                 messagebox.showerror("Erreur", result['error'])
     
+    def sur_frappe(self, event=None):
+        # On attend une petite pause dans la frappe avant de lancer la recherche
+        if self.recherche_planifiee is not None:
+            self.root.after_cancel(self.recherche_planifiee)
+        self.recherche_planifiee = self.root.after(self.DELAI_RECHERCHE_MS, self.rechercher)
+    
+    def rechercher(self):
+        """Recherche pendant la frappe (une nouvelle frappe remplace la recherche en cours)"""
+        self.recherche_planifiee = None
+        texte = self.entry_recherche.get().strip()
+        if len(texte) < 2:
+            return
+        titre = f"Recherche : {texte}"
+        if self.cible_recherche.get() == "Événements":
+            self.lancer(f"Recherche « {texte} »", lambda: self.service.rechercher_evenements(texte),
+                        lambda events: self.afficher_evenements(events, titre))
+        else:
+            self.lancer(f"Recherche « {texte} »", lambda: self.service.rechercher_acheteurs(texte),
+                        lambda acheteurs: self.afficher_acheteurs(acheteurs, titre))
+    
     def lister_evenements(self):
         """Liste les événements"""
-        events = self.service.lister_evenements()
-        
+        self.lancer("Chargement des événements", self.service.lister_evenements,
+                    self.afficher_evenements)
+    
+    def afficher_evenements(self, events, titre="Liste des événements"):
         contenu = f"Total : {len(events)} événement(s)\n\n"
         for e in events:
             contenu += f"[#{e['id_evenement']}] {e['nom']}\n"
@@ -278,13 +422,15 @@ class BilletterieApp:
             contenu += f"   Catégorie : {e['categorie']}\n"
             contenu += f"   Capacité : {e['capacite_max']} places\n\n"
         
-        self.afficher("Liste des événements", contenu)
+        self.afficher(titre, contenu)
         self.set_status(f"{len(events)} événement(s)")
     
     def lister_acheteurs(self):
         """Liste les acheteurs"""
-        acheteurs = self.service.lister_acheteurs()
-        
+        self.lancer("Chargement des acheteurs", self.service.lister_acheteurs,
+                    self.afficher_acheteurs)
+    
+    def afficher_acheteurs(self, acheteurs, titre="Liste des acheteurs"):
         contenu = f"Total : {len(acheteurs)} acheteur(s)\n\n"
         for a in acheteurs:
             contenu += f"[#{a['id_acheteur']}] {a['nom']} {a['prenom']}\n"
@@ -293,12 +439,15 @@ class BilletterieApp:
                 contenu += f"   Tél : {a['telephone']}\n"
             contenu += "\n"
         
-        self.afficher("Liste des acheteurs", contenu)
+        self.afficher(titre, contenu)
         self.set_status(f"{len(acheteurs)} acheteur(s)")
     
     def calculer_ca(self):
         """Affiche le chiffre d'affaires total"""
-        data = self.service.calculer_chiffre_affaires_total()
+        self.lancer("Calcul du chiffre d'affaires", self.service.calculer_chiffre_affaires_total,
+                    self.afficher_ca)
+    
+    def afficher_ca(self, data):
         ca = data['chiffre_affaires_total']
         quantite = data['quantite_totale_vendue']
         panier = data['panier_moyen']
@@ -312,8 +461,10 @@ class BilletterieApp:
     
     def ca_par_evenement(self):
         """Affiche le CA par événement"""
-        data = self.service.calculer_ca_par_evenement()
-        
+        self.lancer("Calcul du CA par événement", self.service.calculer_ca_par_evenement,
+                    self.afficher_ca_par_evenement)
+    
+    def afficher_ca_par_evenement(self, data):
         contenu = ""
         for e in data:
             contenu += f"{e['evenement']}\n"
@@ -325,8 +476,10 @@ class BilletterieApp:
     
     def taux_remplissage(self):
         """Affiche le taux de remplissage"""
-        data = self.service.calculer_taux_remplissage()
-        
+        self.lancer("Calcul des taux de remplissage", self.service.calculer_taux_remplissage,
+                    self.afficher_taux_remplissage)
+    
+    def afficher_taux_remplissage(self, data):
         contenu = ""
         for e in data:
             contenu += f"{e['evenement']}\n"
@@ -338,8 +491,10 @@ class BilletterieApp:
     
     def top_billets(self):
         """Affiche le classement des billets"""
-        data = self.service.obtenir_top_billets()
-        
+        self.lancer("Classement des billets", self.service.obtenir_top_billets,
+                    self.afficher_top_billets)
+    
+    def afficher_top_billets(self, data):
         contenu = ""
         for i, b in enumerate(data, 1):
             contenu += f"#{i} {b['nom_type']} ({b['evenement']})\n"
@@ -351,8 +506,10 @@ class BilletterieApp:
     
     def top_acheteurs(self):
         """Affiche le top des acheteurs"""
-        data = self.service.obtenir_top_acheteurs()
-        
+        self.lancer("Classement des acheteurs", self.service.obtenir_top_acheteurs,
+                    self.afficher_top_acheteurs)
+    
+    def afficher_top_acheteurs(self, data):
         contenu = ""
         for i, a in enumerate(data, 1):
             contenu += f"#{i} {a['acheteur']}\n"
@@ -365,6 +522,7 @@ class BilletterieApp:
     
     def quitter(self):
         """Ferme l'application proprement"""
+        self.taches.fermer()
         self.service.fermer_connexion()
         self.root.destroy()
 
@@ -441,17 +599,209 @@ class DialogVente(tk.Toplevel):
             messagebox.showerror("Erreur", "Veuillez entrer des nombres valides")
 
 
+# --- Tableau des ventes chargé page par page ---
+class ListeVentes(tk.Frame):
+    """
+    Tableau des ventes "virtualisé" : le Treeview ne garde que quelques pages,
+    et on charge la page suivante (ou précédente) quand on arrive au bord en
+    scrollant. Les pages viennent de lister_ventes_page (pagination keyset),
+    donc la mémoire et le temps de chargement ne dépendent pas du nombre de ventes
+    """
+    TAILLE_PAGE = 50
+    PAGES_MAX = 4  # au plus 200 lignes dans le tableau
+    
+    # (clé, titre, largeur, colonne de tri en base ou None)
+    COLONNES = [
+        ("id_vente", "N°", 60, "id_vente"),
+        ("date_vente", "Date", 140, "date_vente"),
+        ("acheteur", "Acheteur", 160, None),
+        ("evenement", "Événement", 180, None),
+        ("type_billet", "Billet", 100, None),
+        ("quantite", "Qté", 50, None),
+        ("montant_total", "Montant", 90, "montant_total"),
+    ]
+    
+    def __init__(self, parent, service, taches, set_status):
+        super().__init__(parent, bg=Colors.BG_WHITE)
+        self.service = service
+        self.taches = taches
+        self.set_status = set_status
+        self.tri = "date_vente"
+        self.descendant = True
+        self.cles = {}  # iid -> clé de pagination (valeur triée, id_vente)
+        self.debut_atteint = True
+        self.fin_atteinte = True
+        self.en_chargement = False
+        
+        self.titre = tk.Label(self, text="Liste des ventes", font=("Arial", 12, "bold"),
+                              bg=Colors.BG_WHITE, fg=Colors.TEXT, anchor="w")
+        self.titre.pack(fill=tk.X, padx=15, pady=(10, 5))
+        
+        cadre = tk.Frame(self, bg=Colors.BG_WHITE)
+        cadre.pack(fill=tk.BOTH, expand=True)
+        
+        self.tree = ttk.Treeview(cadre, columns=[c[0] for c in self.COLONNES],
+                                 show="headings", selectmode="browse")
+        for cle, titre, largeur, tri in self.COLONNES:
+            if tri:
+                self.tree.heading(cle, text=titre, command=lambda t=tri: self.trier(t))
+            else:
+                self.tree.heading(cle, text=titre)
+            ancre = "e" if cle in ("id_vente", "quantite", "montant_total") else "w"
+            self.tree.column(cle, width=largeur, anchor=ancre)
+        
+        self.scrollbar = ttk.Scrollbar(cadre, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.sur_defilement)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.maj_entetes()
+    
+    def charger(self):
+        """Recharge le tableau depuis la première page"""
+        self.tree.delete(*self.tree.get_children())
+        self.cles.clear()
+        self.debut_atteint, self.fin_atteinte = True, False
+        
+        # Le comptage et la première page partent dans la même tâche
+        def premiere_page(tri, descendant):
+            total = self.service.compter_ventes()
+            page = self.service.lister_ventes_page(limite=self.TAILLE_PAGE, tri=tri, descendant=descendant)
+            return total, page
+        
+        def afficher(resultat):
+            total, page = resultat
+            self.titre.config(text=f"Liste des ventes - Total : {total} vente(s)")
+            self.recevoir_page(page, avant=None)
+            self.set_status(f"{total} vente(s) trouvée(s)")
+        
+        self.en_chargement = True
+        self.taches.lancer("ventes", premiere_page, self.tri, self.descendant,
+                           libelle="Chargement des ventes", sur_resultat=afficher,
+                           sur_erreur=self.erreur)
+    
+    def annuler(self):
+        """Abandonne le chargement en cours (la vue n'est plus affichée)"""
+        self.taches.annuler("ventes")
+        self.en_chargement = False
+    
+    def erreur(self, erreur):
+        self.en_chargement = False
+        self.set_status(f"Erreur : {erreur}")
+    
+    def trier(self, tri):
+        # Un clic sur la même colonne inverse l'ordre
+        if tri == self.tri:
+            self.descendant = not self.descendant
+        else:
+            self.tri, self.descendant = tri, True
+        self.maj_entetes()
+        self.charger()
+    
+    def maj_entetes(self):
+        for cle, titre, _, tri in self.COLONNES:
+            if tri == self.tri:
+                titre += " ▼" if self.descendant else " ▲"
+            self.tree.heading(cle, text=titre)
+    
+    def sur_defilement(self, debut, fin):
+        # Appelé par le Treeview à chaque scroll : on charge quand on approche d'un bord
+        self.scrollbar.set(debut, fin)
+        if self.en_chargement:
+            return
+        if float(fin) >= 0.95 and not self.fin_atteinte:
+            self.after_idle(self.page_suivante)
+        elif float(debut) <= 0.05 and not self.debut_atteint:
+            self.after_idle(self.page_precedente)
+    
+    def page_suivante(self):
+        items = self.tree.get_children()
+        if items and not self.fin_atteinte and not self.en_chargement:
+            self.charger_page(apres=self.cles[items[-1]])
+    
+    def page_precedente(self):
+        items = self.tree.get_children()
+        if items and not self.debut_atteint and not self.en_chargement:
+            self.charger_page(avant=self.cles[items[0]])
+    
+    def charger_page(self, apres=None, avant=None):
+        # en_chargement reste levé jusqu'au retour de la tâche : pas de double chargement
+        self.en_chargement = True
+        self.taches.lancer("ventes", self.service.lister_ventes_page,
+                           apres, self.TAILLE_PAGE, self.tri, self.descendant, avant,
+                           libelle="Chargement des ventes",
+                           sur_resultat=lambda page: self.recevoir_page(page, avant),
+                           sur_erreur=self.erreur)
+    
+    def recevoir_page(self, page, avant):
+        try:
+            # Moins d'une page complète : on est arrivé au bout dans ce sens
+            if avant is None:
+                self.fin_atteinte = page["suivant"] is None
+            else:
+                self.debut_atteint = page["suivant"] is None
+            self.ajouter(page["ventes"], a_la_fin=avant is None)
+        finally:
+            self.en_chargement = False
+    
+    def ajouter(self, ventes, a_la_fin):
+        """Ajoute une page en haut ou en bas et enlève ce qui dépasse de l'autre côté"""
+        nb_avant = len(self.tree.get_children())
+        # Index de la ligne en haut de l'écran, pour que l'affichage ne saute pas
+        ligne_haut = int(self.tree.yview()[0] * nb_avant)
+        
+        for i, v in enumerate(ventes):
+            iid = str(v['id_vente'])
+            self.cles[iid] = (v[self.tri], v['id_vente'])
+            self.tree.insert("", tk.END if a_la_fin else i, iid=iid, values=(
+                v['id_vente'], v['date_vente'], v['acheteur'], v['evenement'],
+                v['type_billet'], v['quantite'], f"{v['montant_total']:.2f} €"))
+        if not a_la_fin:
+            ligne_haut += len(ventes)
+        
+        items = self.tree.get_children()
+        exces = len(items) - self.TAILLE_PAGE * self.PAGES_MAX
+        if exces > 0:
+            if a_la_fin:
+                a_enlever = items[:exces]
+                self.debut_atteint = False
+                ligne_haut -= exces
+            else:
+                a_enlever = items[-exces:]
+                self.fin_atteinte = False
+            self.tree.delete(*a_enlever)
+            for iid in a_enlever:
+                del self.cles[iid]
+        
+        total = len(self.tree.get_children())
+        if total and nb_avant:
+            self.tree.yview_moveto(max(0, ligne_haut) / total)
+
+
 # --- Point d'entrée ---
 def main():
     from config import DATABASE_PATH
     
+    parser = argparse.ArgumentParser(description="Billetterie")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="affiche la durée de chaque étape du démarrage (jusqu'aux cartes à jour)")
+    args = parser.parse_args()
+    profil = ProfilDemarrage() if args.profile_startup else None
+    if profil is not None:
+        profil.etape("imports")
+    
     # Créer la base si elle n'existe pas
     if not os.path.exists(DATABASE_PATH):
         print("Initialisation de la base...")
         init_database()
     
     root = tk.Tk()
-    app = BilletterieApp(root)
+    if profil is not None:
+        profil.etape("fenêtre Tk")
+    app = BilletterieApp(root, profil)
+    # On dessine la fenêtre tout de suite, les données arrivent ensuite (tâches en arrière-plan)
+    root.update()
+    app.etape("premier affichage")
+    app.charger_stats()
     root.mainloop()
 
 
@@ -0,0 +1,183 @@
+# Version asyncio du service, pour un serveur web asynchrone
+# Les méthodes sont les mêmes que BilletterieService mais ce sont des coroutines :
+# les lectures tournent dans un pool de threads de taille fixe, et toutes les
+# écritures passent par un seul thread "écrivain"
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from services import BilletterieService
+from ecriture import FileEcriture
+from config import POOL_TAILLE_LECTEURS, ASYNC_FILE_MAX
+
+
+class AsyncBilletterieService:
+    """
+    Façade asyncio de BilletterieService
+    Les ventes et annulations passent par la file d'écriture (ecriture.py) :
+    celles qui arrivent en même temps partagent un seul commit, et chaque
+    appelant reçoit quand même son propre résultat
+    """
+    
+    def __init__(self, service=None, nb_lecteurs=POOL_TAILLE_LECTEURS, taille_file_max=ASYNC_FILE_MAX):
+        self.service = service or BilletterieService()
+        self.ecriture = FileEcriture(self.service)
+        # Autant de threads de lecture que de connexions dans le pool de dao.py
+        self._lecteurs = ThreadPoolExecutor(max_workers=nb_lecteurs, thread_name_prefix="lecture")
+        # Les autres écritures : un seul thread, SQLite n'accepte qu'un écrivain à la fois
+        self._ecrivain = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ecriture")
+        # Si la file d'écriture ne suit pas, les appelants attendent avant d'y entrer
+        self._places_file = asyncio.Semaphore(taille_file_max)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.fermer()
+    
+    async def _lire(self, methode, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._lecteurs, methode, *args)
+    
+    async def _ecrire(self, methode, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ecrivain, methode, *args)
+    
+    # Ventes et annulations : file d'écriture à commit groupé
+    
+    async def effectuer_vente(self, id_acheteur, id_type_billet, quantite):
+        async with self._places_file:
+            return await asyncio.wrap_future(self.ecriture.vendre(id_acheteur, id_type_billet, quantite))
+    
+    async def annuler_vente(self, id_vente):
+        async with self._places_file:
+            return await asyncio.wrap_future(self.ecriture.annuler(id_vente))
+    
+    async def effectuer_ventes_batch(self, commandes):
+        return await self._ecrire(self.service.effectuer_ventes_batch, list(commandes))
+    
+    # Autres écritures
+    
+    async def inscrire_acheteur(self, nom, prenom, email, telephone=None):
+        return await self._ecrire(self.service.inscrire_acheteur, nom, prenom, email, telephone)
+    
+    async def importer_acheteurs(self, acheteurs):
+        return await self._ecrire(self.service.importer_acheteurs, acheteurs)
+    
+    async def creer_evenement(self, nom, description, date_evenement, heure_debut,
+                              lieu, capacite_max, categorie):
+        return await self._ecrire(self.service.creer_evenement, nom, description, date_evenement,
+                                  heure_debut, lieu, capacite_max, categorie)
+    
+    async def creer_type_billet(self, id_evenement, nom_type, prix, quantite):
+        return await self._ecrire(self.service.creer_type_billet, id_evenement, nom_type, prix, quantite)
+    
+    async def reconstruire_stats(self):
+        return await self._ecrire(self.service.reconstruire_stats)
+    
+    # Lectures
+    
+    async def lister_acheteurs(self):
+        return await self._lire(self.service.lister_acheteurs)
+    
+    async def lister_evenements(self):
+        return await self._lire(self.service.lister_evenements)
+    
+    async def lister_evenements_par_categorie(self, categorie):
+        return await self._lire(self.service.lister_evenements_par_categorie, categorie)
+    
+    async def rechercher_acheteurs(self, texte, limit=20):
+        return await self._lire(self.service.rechercher_acheteurs, texte, limit)
+    
+    async def rechercher_evenements(self, texte, limit=20):
+        return await self._lire(self.service.rechercher_evenements, texte, limit)
+    
+    async def lister_types_billets_evenement(self, id_evenement):
+        return await self._lire(self.service.lister_types_billets_evenement, id_evenement)
+    
+    async def lister_ventes(self):
+        return await self._lire(self.service.lister_ventes)
+    
+    async def lister_ventes_page(self, apres=None, limite=50, tri="date_vente", descendant=True, avant=None):
+        return await self._lire(self.service.lister_ventes_page, apres, limite, tri, descendant, avant)
+    
+    async def compter_ventes(self):
+        return await self._lire(self.service.compter_ventes)
+    
+    async def iterer_ventes(self, taille_lot=1000):
+        # Générateur asynchrone : une page keyset par aller-retour dans le pool
+        # (pas de curseur ouvert qui passerait d'un thread à l'autre)
+        apres = None
+        while True:
+            page = await self.lister_ventes_page(apres, taille_lot)
+            for v in page["ventes"]:
+                yield v
+            apres = page["suivant"]
+            if apres is None:
+                break
+    
+    async def exporter_ventes(self, chemin, debut=None, fin=None):
+        # Un export peut durer longtemps : pool de threads par défaut, pour ne pas
+        # occuper un des threads de lecture (l'export a sa propre connexion)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.service.exporter_ventes, chemin, debut, fin)
+    
+    async def exporter_rapport(self, nom, chemin):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.service.exporter_rapport, nom, chemin)
+    
+    async def rafraichir_cumuls(self):
+        return await self._ecrire(self.service.rafraichir_cumuls)
+    
+    async def ventes_par_heure(self, id_evenement, debut=None, fin=None, par_type=False):
+        # Le rafraîchissement des cumuls écrit dans la base : thread écrivain, puis lecture
+        await self.rafraichir_cumuls()
+        return await self._lire(self.service.ventes_par_heure, id_evenement, debut, fin, par_type, False)
+    
+    async def ventes_par_jour(self, id_evenement, debut=None, fin=None, par_type=False):
+        await self.rafraichir_cumuls()
+        return await self._lire(self.service.ventes_par_jour, id_evenement, debut, fin, par_type, False)
+    
+    async def calculer_chiffre_affaires_total(self):
+        return await self._lire(self.service.calculer_chiffre_affaires_total)
+    
+    async def calculer_ca_par_evenement(self):
+        return await self._lire(self.service.calculer_ca_par_evenement)
+    
+    async def calculer_taux_remplissage(self):
+        return await self._lire(self.service.calculer_taux_remplissage)
+    
+    async def obtenir_top_billets(self):
+        return await self._lire(self.service.obtenir_top_billets)
+    
+    async def obtenir_top_acheteurs(self, limit=5):
+        return await self._lire(self.service.obtenir_top_acheteurs, limit)
+    
+    async def obtenir_stats_par_categorie(self):
+        return await self._lire(self.service.obtenir_stats_par_categorie)
+    
+    async def calculer_indicateurs_avances(self):
+        return await self._lire(self.service.calculer_indicateurs_avances)
+    
+    async def indicateurs_sauvegardes(self):
+        return await self._lire(self.service.indicateurs_sauvegardes)
+    
+    async def calcul_et_sauvegarde_indicateurs(self):
+        # Lit la base et écrit un fichier à côté, pas dans la base : thread de lecture
+        return await self._lire(self.service.calcul_et_sauvegarde_indicateurs)
+    
+    def get_cache_stats(self):
+        return self.service.get_cache_stats()
+    
+    def activer_instrumentation(self):
+        return self.service.activer_instrumentation()
+    
+    def get_perf_report(self):
+        return self.service.get_perf_report()
+    
+    async def fermer(self):
+        """Termine les ventes en attente puis ferme les threads et la base"""
+        await self._ecrire(self.ecriture.fermer)
+        self._lecteurs.shutdown()
+        self._ecrivain.shutdown()
+        self.service.fermer_connexion()
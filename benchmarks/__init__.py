@@ -0,0 +1,2 @@
+# Scripts de mesure des performances
+# On les lance depuis la racine du projet : python -m benchmarks.<nom_du_script>
@@ -0,0 +1,79 @@
+# Test de charge : beaucoup d'acheteurs simultanés sur AsyncBilletterieService
+# Chaque acheteur (une coroutine) enchaîne quelques achats ; on mesure la latence
+# de chaque effectuer_vente (p50 / p99) et on vérifie qu'il n'y a pas de survente
+# --mode direct : chaque vente part seule dans le pool (un commit par vente), pour comparer
+#
+# Lancement : python -m benchmarks.charge_async --acheteurs 1000 --achats 5
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.commun import base_temporaire, percentile, preparer_base
+
+
+async def acheteur(service, mode, id_acheteur, nb_achats, nb_types, latences, refus):
+    loop = asyncio.get_running_loop()
+    for _ in range(nb_achats):
+        id_type, quantite = random.randint(1, nb_types), random.randint(1, 3)
+        debut = time.perf_counter()
+        if mode == "groupe":
+            r = await service.effectuer_vente(id_acheteur, id_type, quantite)
+        else:
+            r = await loop.run_in_executor(service._ecrivain, service.service.effectuer_vente,
+                                           id_acheteur, id_type, quantite)
+        latences.append(time.perf_counter() - debut)
+        if not r["success"]:
+            refus.append(r["error"])
+
+
+async def charge(args):
+    from async_service import AsyncBilletterieService
+    
+    async with AsyncBilletterieService() as service:
+        latences, refus = [], []
+        debut = time.perf_counter()
+        await asyncio.gather(*(acheteur(service, args.mode, i + 1, args.achats, args.types, latences, refus)
+                               for i in range(args.acheteurs)))
+        duree = time.perf_counter() - debut
+        
+        vendus = (await service.calculer_chiffre_affaires_total())["quantite_totale_vendue"]
+        types = await service.lister_types_billets_evenement(1)
+        restant = sum(t["quantite_disponible"] for t in types)
+    return latences, refus, duree, vendus, restant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des ventes avec beaucoup d'acheteurs simultanés")
+    parser.add_argument("--acheteurs", type=int, default=1000, help="coroutines simultanées")
+    parser.add_argument("--achats", type=int, default=5, help="ventes par acheteur")
+    parser.add_argument("--types", type=int, default=10)
+    parser.add_argument("--stock", type=int, default=1000, help="stock par type de billet")
+    parser.add_argument("--mode", choices=["groupe", "direct"], default="groupe")
+    args = parser.parse_args()
+    
+    base_temporaire()
+    from dao import ConnectionPool
+    
+    preparer_base(args.acheteurs, args.types, args.stock)
+    ConnectionPool.get_instance().close()
+    
+    latences, refus, duree, vendus, restant = asyncio.run(charge(args))
+    latences.sort()
+    stock_initial = args.types * args.stock
+    survente = vendus + restant - stock_initial
+    
+    print(f"Mode            : {args.mode}")
+    print(f"Acheteurs       : {args.acheteurs} x {args.achats} achats")
+    print(f"Ventes          : {len(latences)} en {duree:.2f} s ({len(latences) / duree:,.0f} ventes/s), "
+          f"{len(refus)} refusée(s)")
+    print(f"Latence p50     : {percentile(latences, 50) * 1000:.1f} ms")
+    print(f"Latence p99     : {percentile(latences, 99) * 1000:.1f} ms")
+    print(f"Billets vendus  : {vendus} (stock initial {stock_initial}, restant {restant})")
+    print("OK : aucune survente" if survente == 0 else f"ERREUR : survente de {survente} billet(s)")
+    return 0 if survente == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+# Outils partagés par les benchmarks : base temporaire, base de départ, percentiles
+# base_temporaire() doit être appelée avant d'importer config / dao / services :
+# le chemin de la base est lu dans BILLETTERIE_DB à l'import de config.py
+
+import os
+import tempfile
+
+CATEGORIES = ("concert", "conference", "spectacle")
+
+
+def base_temporaire(nom="bench.db"):
+    """Crée un dossier temporaire, y fait pointer BILLETTERIE_DB et retourne le chemin de la base"""
+    chemin = os.path.join(tempfile.mkdtemp(prefix="bench_billetterie_"), nom)
+    os.environ["BILLETTERIE_DB"] = chemin
+    return chemin
+
+
+def preparer_base(nb_acheteurs, nb_types=0, stock_par_type=0, nb_evenements=1):
+    """
+    Crée une base neuve : nb_acheteurs acheteurs (ids 1 à nb_acheteurs) et nb_types types de
+    billets (ids 1 à nb_types, prix 10 + i) répartis sur nb_evenements événements
+    Sans type de billet, il n'y a pas d'événement non plus
+    """
+    from dao import init_database, ConnectionPool
+    
+    init_database()
+    with ConnectionPool.get_instance().write() as conn:
+        conn.executemany(
+            "INSERT INTO acheteurs (nom, prenom, email) VALUES (?, ?, ?)",
+            ((f"Nom{i}", f"Prenom{i}", f"acheteur{i}@email.com") for i in range(nb_acheteurs))
+        )
+        if not nb_types:
+            return
+        capacite = -(-nb_types // nb_evenements) * stock_par_type
+        conn.executemany(
+            """INSERT INTO evenements (nom, date_evenement, heure_debut, lieu, capacite_max, categorie)
+               VALUES (?, '2026-01-01', '20:00', 'Salle', ?, ?)""",
+            [(f"Evt{i}", capacite, CATEGORIES[i % len(CATEGORIES)]) for i in range(nb_evenements)]
+        )
+        conn.executemany(
+            """INSERT INTO types_billets (id_evenement, nom_type, prix, quantite_disponible)
+               VALUES (?, ?, ?, ?)""",
+            [(i % nb_evenements + 1, f"Type{i}", 10.0 + i, stock_par_type) for i in range(nb_types)]
+        )
+
+
+def percentile(valeurs, p):
+    # Valeur sous laquelle tombent p % des mesures (0.0 s'il n'y en a pas)
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p / 100))] if valeurs else 0.0
@@ -0,0 +1,63 @@
+# Benchmark : ce que app.py fait avant de pouvoir dessiner la fenêtre, sans Tk
+# (pour mesurer avec la vraie fenêtre : python app.py --profile-startup)
+# Chaque mesure tourne dans un processus neuf (imports compris), sur --base
+# - avant : service créé avec la première copie de l'instantané faite tout de suite
+#           (BILLETTERIE_RAPPORTS_INSTANTANE=1), puis indicateurs calculés pour les cartes
+# - apres : service sans accès à la base, cartes lues dans les indicateurs sauvegardés
+#           (instantané et calcul des indicateurs en arrière-plan, après le premier affichage)
+#
+# Lancement : python -m benchmarks.generateur --facteur 1 --base /tmp/bench.db
+#             python -m benchmarks.demarrage --base /tmp/bench.db
+
+import argparse
+import os
+import subprocess
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESURE = """
+import time
+debut = time.perf_counter()
+import services
+service = services.BilletterieService()
+if {avant}:
+    # Comme avant : première copie faite dans le constructeur du service, avant de rendre la main
+    service.instantane = services.InstantaneRapports(service.db)
+    service.instantane.demarrer()
+    cartes = service.calculer_indicateurs_avances()
+else:
+    cartes = service.indicateurs_sauvegardes()
+print((time.perf_counter() - debut) * 1000)
+service.fermer_connexion()
+"""
+
+
+def mesurer(base, avant):
+    # avant : l'instantané est créé par MESURE elle-même, pas par le service
+    env = dict(os.environ, BILLETTERIE_DB=os.path.abspath(base),
+               BILLETTERIE_RAPPORTS_INSTANTANE="0" if avant else "1")
+    sortie = subprocess.run([sys.executable, "-c", MESURE.format(avant=avant)], env=env, cwd=RACINE,
+                            check=True, capture_output=True, text=True).stdout
+    return float(sortie.split()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps avant le premier affichage de app.py")
+    parser.add_argument("--base", required=True, help="base générée par benchmarks.generateur")
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+    
+    # Un premier calcul pour que les indicateurs sauvegardés existent (comme après un lancement)
+    env = dict(os.environ, BILLETTERIE_DB=os.path.abspath(args.base))
+    subprocess.run([sys.executable, "-c", "import services; services.BilletterieService()"
+                    ".calcul_et_sauvegarde_indicateurs()"], env=env, cwd=RACINE, check=True)
+    
+    print(f"{'mode':<8} {'médiane ms':>11} {'min ms':>8} {'max ms':>8}")
+    for nom, avant in (("avant", True), ("apres", False)):
+        durees = sorted(mesurer(args.base, avant) for _ in range(args.repetitions))
+        print(f"{nom:<8} {durees[len(durees) // 2]:>11.1f} {durees[0]:>8.1f} {durees[-1]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
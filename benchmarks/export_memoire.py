@@ -0,0 +1,47 @@
+# Benchmark : export des ventes (export.py) sur une grosse base, débit et mémoire maximale
+# L'export tourne dans un processus à part : sa mémoire maximale (RSS) ne doit pas
+# dépasser --limite-mo, quel que soit le nombre de ventes
+#
+# Lancement : python -m benchmarks.generateur --facteur 50 --base /tmp/bench.db
+#             python -m benchmarks.export_memoire --base /tmp/bench.db --sortie /tmp/ventes.csv.gz
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit et mémoire de l'export des ventes")
+    parser.add_argument("--base", required=True, help="base générée par benchmarks.generateur")
+    parser.add_argument("--sortie", default="/tmp/export_ventes.csv.gz", help=".csv, .jsonl (+ .gz)")
+    parser.add_argument("--debut")
+    parser.add_argument("--fin")
+    parser.add_argument("--limite-mo", type=int, default=100)
+    args = parser.parse_args()
+    
+    commande = [sys.executable, os.path.join(RACINE, "export.py"), "ventes", args.sortie]
+    if args.debut:
+        commande += ["--debut", args.debut]
+    if args.fin:
+        commande += ["--fin", args.fin]
+    
+    env = dict(os.environ, BILLETTERIE_DB=os.path.abspath(args.base))
+    debut = time.perf_counter()
+    subprocess.run(commande, env=env, check=True)
+    duree = time.perf_counter() - debut
+    # ru_maxrss est en Kio sous Linux
+    rss_mo = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    
+    print(f"Durée         : {duree:.1f} s")
+    print(f"Taille        : {os.path.getsize(args.sortie) / 1e6:.1f} Mo")
+    print(f"Mémoire (RSS) : {rss_mo:.1f} Mo max (limite {args.limite_mo} Mo)")
+    return 0 if rss_mo <= args.limite_mo else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
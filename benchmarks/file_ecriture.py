@@ -0,0 +1,104 @@
+# Benchmark : plusieurs threads vendent et annulent en même temps
+# - direct : chaque thread appelle effectuer_vente / annuler_vente (un commit chacun)
+# - file   : tout passe par FileEcriture (un commit par paquet)
+# Avec le profil "securite" (un fsync par commit) on voit bien la différence
+# En mode file, on vérifie aussi qu'une commande mal formée ou annulée par son appelant
+# ne fait pas échouer les autres commandes de son paquet (le script échoue sinon)
+#
+# Lancement : python -m benchmarks.file_ecriture --threads 16 --profil securite
+
+import argparse
+import os
+import random
+import threading
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+
+def producteur(service, file, nb_ventes, nb_acheteurs, nb_types, compteurs):
+    ventes = []
+    for i in range(nb_ventes):
+        # Une fois sur cinq, on annule une de ses ventes précédentes
+        if ventes and i % 5 == 4:
+            id_vente = ventes.pop(random.randrange(len(ventes)))
+            r = file.annuler(id_vente).result() if file else service.annuler_vente(id_vente)
+        else:
+            args = (random.randint(1, nb_acheteurs), random.randint(1, nb_types), random.randint(1, 3))
+            r = file.vendre(*args).result() if file else service.effectuer_vente(*args)
+            if r["success"]:
+                ventes.append(r["id_vente"])
+        compteurs.append(r["success"])
+
+
+def verifier_isolement(file):
+    """
+    Un paquet avec des commandes mal formées et une commande annulée au milieu :
+    les bonnes commandes passent, et la file marche encore après. Retourne les problèmes
+    """
+    delai, file.delai = file.delai, 0.05  # assez long pour que tout parte dans le même paquet
+    bonnes = [file.vendre(1, 1, 1)]
+    mauvaises = [file.vendre(1, 1, "2"), file.vendre(1, 1, -1), file.vendre(None, 1, 1)]
+    annulee = file.vendre(1, 1, 1)
+    annulee_a_temps = annulee.cancel()
+    bonnes.append(file.vendre(1, 2, 1))
+    problemes = []
+    if not all(f.result(timeout=10)["success"] for f in bonnes):
+        problemes.append(f"bonnes commandes refusées : {[f.result() for f in bonnes]}")
+    if any(f.result(timeout=10)["success"] for f in mauvaises):
+        problemes.append("commande mal formée acceptée")
+    if not annulee_a_temps and not annulee.result(timeout=10)["success"]:
+        problemes.append("commande prise avant son annulation refusée")
+    file.delai = delai
+    try:
+        if not file.vendre(1, 1, 1).result(timeout=10)["success"]:
+            problemes.append("la file refuse les commandes suivantes")
+    except TimeoutError:
+        problemes.append("la file ne répond plus")
+    return problemes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File d'écriture à commit groupé vs un commit par vente")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ventes", type=int, default=500, help="commandes par thread")
+    parser.add_argument("--mode", choices=["file", "direct"], default="file")
+    parser.add_argument("--profil", default="securite", help="profil PRAGMA de config.py")
+    args = parser.parse_args()
+    
+    # Les deux variables sont lues par config.py : à régler avant les imports
+    base_temporaire()
+    os.environ["BILLETTERIE_PRAGMA"] = args.profil
+    from services import BilletterieService
+    from ecriture import FileEcriture
+    
+    nb_acheteurs, nb_types = 1000, 20
+    preparer_base(nb_acheteurs, nb_types, stock_par_type=args.threads * args.ventes * 3)
+    service = BilletterieService()
+    file = FileEcriture(service) if args.mode == "file" else None
+    
+    compteurs = []
+    threads = [threading.Thread(target=producteur,
+                                args=(service, file, args.ventes, nb_acheteurs, nb_types, compteurs))
+               for _ in range(args.threads)]
+    debut = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duree = time.perf_counter() - debut
+    problemes = verifier_isolement(file) if file else []
+    if file:
+        file.fermer()
+    service.fermer_connexion()
+    
+    print(f"Mode      : {args.mode} (profil {args.profil}, {args.threads} threads)")
+    print(f"Commandes : {len(compteurs)} en {duree:.2f} s ({len(compteurs) / duree:,.0f} commandes/s), "
+          f"{compteurs.count(False)} refusée(s)")
+    for probleme in problemes:
+        print(f"ÉCHEC : {probleme}")
+    return 1 if problemes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
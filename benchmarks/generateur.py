@@ -0,0 +1,131 @@
+# Générateur de données synthétiques pour les benchmarks, selon un "facteur d'échelle"
+# Facteur 1 = 20 000 acheteurs, 200 événements (3 types de billets chacun), 1 million de ventes
+# Facteur 50 = 1 million d'acheteurs, 10 000 événements, 50 millions de ventes
+# Les données sont chargées en masse (chargement.py) : index et triggers remis à la fin
+#
+# Lancement : python -m benchmarks.generateur --facteur 0.1 --base /tmp/bench.db
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+ACHETEURS_PAR_FACTEUR = 20_000
+EVENEMENTS_PAR_FACTEUR = 200
+VENTES_PAR_FACTEUR = 1_000_000
+
+NOMS = ["Dupont", "Martin", "Bernard", "Petit", "Durand", "Leroy", "Moreau", "Simon",
+        "Laurent", "Roux", "Fournier", "Girard", "Bonnet", "Lambert", "Fontaine", "Mercier"]
+PRENOMS = ["Marie", "Jean", "Sophie", "Lucas", "Emma", "Thomas", "Chloé", "Hugo",
+           "Léa", "Nathan", "Camille", "Louis", "Manon", "Arthur", "Jade", "Paul"]
+LIEUX = ["Salle des Fêtes", "Place du Marché", "Hangar 42", "Centre des Congrès",
+         "Chapiteau", "Théâtre Municipal", "Café Théâtre", "Zénith", "Palais des Sports"]
+CATEGORIES = ["concert", "conference", "spectacle"]
+# (nom du type, prix de base) : 3 types de billets par événement
+TYPES = [("Standard", 25.0), ("VIP", 80.0), ("Réduit", 15.0)]
+STOCK_PAR_TYPE = 1_000_000  # large : les scénarios de vente ne doivent pas tomber à court
+
+SQL_ACHETEUR = "INSERT INTO acheteurs (id_acheteur, nom, prenom, email, telephone) VALUES (?, ?, ?, ?, ?)"
+SQL_EVENEMENT = """INSERT INTO evenements (id_evenement, nom, description, date_evenement, heure_debut,
+                   lieu, capacite_max, categorie) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+SQL_TYPE_BILLET = """INSERT INTO types_billets (id_type_billet, id_evenement, nom_type, prix,
+                     quantite_disponible) VALUES (?, ?, ?, ?, ?)"""
+SQL_VENTE = """INSERT INTO ventes (id_vente, id_acheteur, id_type_billet, quantite, date_vente,
+               montant_total) VALUES (?, ?, ?, ?, ?, ?)"""
+
+
+def tailles(facteur):
+    """Nombre de lignes de chaque table pour un facteur d'échelle (au moins 1 de chaque)"""
+    return {
+        "acheteurs": max(1, int(ACHETEURS_PAR_FACTEUR * facteur)),
+        "evenements": max(1, int(EVENEMENTS_PAR_FACTEUR * facteur)),
+        "ventes": max(1, int(VENTES_PAR_FACTEUR * facteur)),
+    }
+
+
+def acheteurs(nb, rng):
+    for i in range(1, nb + 1):
+        nom, prenom = rng.choice(NOMS), rng.choice(PRENOMS)
+        yield (i, nom, prenom, f"{prenom.lower()}.{nom.lower()}.{i}@exemple.com",
+               f"06{rng.randrange(10**8):08d}")
+
+
+def evenements(nb, rng, debut):
+    for i in range(1, nb + 1):
+        date = debut + timedelta(days=rng.randrange(730))
+        yield (i, f"Événement {i}", "Généré pour les benchmarks", date.strftime("%Y-%m-%d"),
+               rng.choice(["14:00", "19:30", "20:00", "21:00"]), rng.choice(LIEUX),
+               len(TYPES) * STOCK_PAR_TYPE, rng.choice(CATEGORIES))
+
+
+def types_billets(nb_evenements, rng):
+    id_type = 0
+    for id_evt in range(1, nb_evenements + 1):
+        for nom, prix in TYPES:
+            id_type += 1
+            yield (id_type, id_evt, nom, round(prix * rng.uniform(0.5, 2.0), 2), STOCK_PAR_TYPE)
+
+
+def ventes(nb, nb_acheteurs, prix_par_type, rng, debut, duree_jours=730):
+    """Ventes dans l'ordre chronologique, étalées sur `duree_jours`"""
+    pas = duree_jours * 86400 / nb
+    depart = debut.timestamp()
+    nb_types = len(prix_par_type)
+    for i in range(1, nb + 1):
+        id_type = rng.randrange(nb_types) + 1
+        quantite = rng.randint(1, 4)
+        date = datetime.fromtimestamp(depart + i * pas).strftime("%Y-%m-%d %H:%M:%S")
+        yield (i, rng.randrange(nb_acheteurs) + 1, id_type, quantite, date,
+               prix_par_type[id_type - 1] * quantite)
+
+
+def generer(facteur, graine=42, afficher=print):
+    """Crée une base neuve (BILLETTERIE_DB) au facteur d'échelle donné"""
+    from dao import init_database, ConnectionPool
+    from chargement import sans_index, inserer_par_paquets
+    
+    rng = random.Random(graine)
+    n = tailles(facteur)
+    debut = datetime(2025, 1, 1)
+    init_database()
+    pool = ConnectionPool.get_instance()
+    
+    chrono = time.perf_counter()
+    with sans_index(pool):
+        inserer_par_paquets(SQL_ACHETEUR, acheteurs(n["acheteurs"], rng))
+        inserer_par_paquets(SQL_EVENEMENT, evenements(n["evenements"], rng, debut))
+        lignes_types = list(types_billets(n["evenements"], rng))
+        inserer_par_paquets(SQL_TYPE_BILLET, lignes_types)
+        afficher(f"  {n['acheteurs']} acheteurs, {n['evenements']} événements, "
+                 f"{len(lignes_types)} types de billets")
+        
+        def avancement(total):
+            if total % 1_000_000 == 0 or total == n["ventes"]:
+                afficher(f"  {total} / {n['ventes']} ventes ({time.perf_counter() - chrono:.0f} s)")
+        
+        prix = [t[3] for t in lignes_types]
+        inserer_par_paquets(SQL_VENTE, ventes(n["ventes"], n["acheteurs"], prix, rng, debut),
+                            apres_paquet=avancement)
+        afficher("  Index, triggers et tables de stats...")
+    afficher(f"Base générée en {time.perf_counter() - chrono:.1f} s")
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère une base de test à grande échelle")
+    parser.add_argument("--facteur", type=float, default=1.0,
+                        help="1 = 20k acheteurs, 200 événements, 1M ventes")
+    parser.add_argument("--base", required=True, help="fichier de la base à créer (écrasé)")
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+    
+    os.environ["BILLETTERIE_DB"] = os.path.abspath(args.base)
+    n = generer(args.facteur, args.graine)
+    from dao import ConnectionPool
+    ConnectionPool.get_instance().close()
+    print(f"{args.base} : {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Benchmark : inscriptions et import en masse d'acheteurs (upsert sur l'email)
+# 1. Inscriptions une par une : ancienne façon (get_by_email puis create : deux requêtes)
+#    contre inscrire_acheteur (un seul INSERT ... ON CONFLICT), avec 10 % d'emails déjà pris
+# 2. Import de --acheteurs fiches neuves avec importer_acheteurs (lues au fur et à mesure)
+# 3. Réimport du même fichier où 10 % des fiches ont changé de téléphone, 1 % sont
+#    invalides, et les emails sont en majuscules : aucune fiche ne doit être créée
+# 4. Import où chaque fiche neuve revient un peu plus loin (dans un autre paquet) avec un
+#    autre téléphone : la mise à jour touche une fiche ajoutée par un paquet précédent
+# Vérifie ensuite les compteurs, que le trigger de recherche n'est enlevé / remis qu'une fois
+# par import (PRAGMA schema_version) et l'index de recherche (integrity-check de FTS5)
+#
+# Lancement : python -m benchmarks.import_acheteurs --acheteurs 1000000
+
+import argparse
+import random
+import time
+
+from benchmarks.commun import base_temporaire
+
+
+def fiches(nb, rng, modifiees=0.0, invalides=0.0):
+    # Générateur de dicts comme ceux d'un fichier client ; mêmes emails à chaque appel
+    for i in range(1, nb + 1):
+        nom, prenom = f"Nom{i % 997}", f"Prenom{i % 331}"
+        telephone = f"06{i * 7919 % 10**8:08d}"
+        if rng.random() < modifiees:
+            telephone = f"07{rng.randrange(10**8):08d}"
+        email = f"{prenom}.{nom}.{i}@exemple.com"
+        if rng.random() < invalides:
+            email = email.replace("@", " ")
+        yield {"nom": nom, "prenom": prenom, "email": email, "telephone": telephone}
+
+
+def doublons(nb):
+    # nb fiches neuves, puis les mêmes avec un autre téléphone (nb > TAILLE_PAQUET : autre paquet)
+    for telephone in ("0611111111", "0622222222"):
+        for i in range(nb):
+            yield {"nom": "Double", "prenom": f"P{i}", "email": f"double.{i}@exemple.com",
+                   "telephone": telephone}
+
+
+def inscriptions(service, nb, ancienne):
+    # Durées (ms) de nb inscriptions, dont une sur dix avec un email déjà pris
+    durees = []
+    for i in range(nb):
+        email = f"inscrit.{i // 10 * 10 if i % 10 == 9 else i}.{ancienne}@exemple.com"
+        debut = time.perf_counter()
+        if ancienne:
+            if not service.acheteur_dao.get_by_email(email):
+                service.acheteur_dao.create("Inscrit", "Test", email, "0600000000")
+        else:
+            service.inscrire_acheteur("Inscrit", "Test", email, "0600000000")
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inscriptions et import en masse d'acheteurs")
+    parser.add_argument("--acheteurs", type=int, default=1_000_000)
+    parser.add_argument("--inscriptions", type=int, default=5000)
+    args = parser.parse_args()
+    
+    base_temporaire()
+    from dao import init_database
+    from services import BilletterieService
+    
+    init_database()
+    service = BilletterieService()
+    
+    print(f"{'inscription':<22} {'moyenne ms':>10} {'p99 ms':>8}")
+    for ancienne, nom in ((True, "get_by_email + create"), (False, "ON CONFLICT")):
+        durees = sorted(inscriptions(service, args.inscriptions, ancienne))
+        print(f"{nom:<22} {sum(durees) / len(durees):>10.3f} {durees[int(len(durees) * 0.99)]:>8.3f}")
+    
+    print(f"{'import':<22} {'durée s':>8} {'fiches/s':>9} {'insérés':>9} {'mis à jour':>10} {'rejetés':>8}")
+    echec = False
+    passes = (
+        ("neuf", fiches(args.acheteurs, random.Random(1)), args.acheteurs, (args.acheteurs, 0)),
+        ("réimport modifié", (dict(f, email=f["email"].upper())
+                               for f in fiches(args.acheteurs, random.Random(2), 0.10, 0.01)),
+         args.acheteurs, None),
+        ("doublons entre paquets", doublons(60_000), 120_000, (60_000, 60_000)),
+    )
+    for nom, lignes, nb, attendu in passes:
+        with service.db.read() as conn:
+            schema = conn.execute("PRAGMA schema_version").fetchone()[0]
+        debut = time.perf_counter()
+        r = service.importer_acheteurs(lignes)
+        duree = time.perf_counter() - debut
+        with service.db.read() as conn:
+            changements = conn.execute("PRAGMA schema_version").fetchone()[0] - schema
+        if changements > 2:
+            print(f"ÉCHEC : {changements} changements de schéma pendant l'import (DROP / CREATE TRIGGER)")
+            echec = True
+        print(f"{nom:<22} {duree:>8.1f} {nb / duree:>9.0f} {r['inseres']:>9} "
+              f"{r['mis_a_jour']:>10} {r['rejetes']:>8}")
+        if attendu is not None and (r['inseres'], r['mis_a_jour']) != attendu:
+            echec = True
+        if attendu is None and (r['inseres'] != 0 or not r['mis_a_jour'] or not r['rejetes']):
+            echec = True
+    
+    with service.db.write() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM acheteurs").fetchone()[0]
+        trigger = conn.execute(service.acheteur_dao.SQL_TRIGGER_RECHERCHE).fetchone()
+        conn.execute("INSERT INTO recherche_acheteurs (recherche_acheteurs, rank) VALUES ('integrity-check', 1)")
+    print(f"Acheteurs en base : {total} ; index de recherche cohérent avec la table")
+    service.fermer_connexion()
+    if not trigger:
+        print("ÉCHEC : trigger de recherche pas remis après l'import")
+        echec = True
+    if echec:
+        print("ÉCHEC : compteurs inattendus")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
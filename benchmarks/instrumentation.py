@@ -0,0 +1,92 @@
+# Benchmark : coût de l'instrumentation des DAO (instrumentation.py)
+# La même suite d'appels au service (ventes, pages de la liste, recherches, stats)
+# tourne avec et sans instrumentation, chaque fois dans un processus neuf et sur
+# une copie neuve de la base, plusieurs tours en alternance ; on garde le meilleur
+# temps de chaque côté
+#
+# Lancement : python -m benchmarks.instrumentation --ventes 100000 --tours 5
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+
+def scenario(nb_operations, file_resultats):
+    """Tourne dans un processus à part : BILLETTERIE_INSTRUMENTATION dit si on mesure"""
+    from services import BilletterieService
+    
+    service = BilletterieService()
+    service.cache = None  # on mesure les DAO, pas le cache du service
+    nb_acheteurs = len(service.acheteur_dao.get_all())
+    random.seed(1)
+    
+    debut = time.perf_counter()
+    for i in range(nb_operations):
+        choix = i % 10
+        if choix < 3:
+            service.effectuer_vente(random.randint(1, nb_acheteurs), random.randint(1, 50), 1)
+        elif choix < 6:
+            page = service.lister_ventes_page(limite=50)
+            service.lister_ventes_page(apres=page["suivant"], limite=50)
+        elif choix < 8:
+            service.acheteur_dao.get_by_id(random.randint(1, nb_acheteurs))
+            service.lister_types_billets_evenement(1)
+        else:
+            service.calculer_indicateurs_avances()
+            service.obtenir_top_acheteurs()
+    duree = time.perf_counter() - debut
+    
+    rapport = service.get_perf_report()
+    service.fermer_connexion()
+    file_resultats.put((duree, len(rapport)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût de l'instrumentation des DAO")
+    parser.add_argument("--ventes", type=int, default=100_000, help="ventes déjà en base")
+    parser.add_argument("--operations", type=int, default=10000)
+    parser.add_argument("--tours", type=int, default=7)
+    args = parser.parse_args()
+    
+    base = base_temporaire("base.db")
+    dossier = os.path.dirname(base)
+    from benchmarks.ventes_batch import generer_commandes
+    from services import BilletterieService
+    
+    preparer_base(1000, 50, stock_par_type=args.ventes)
+    service = BilletterieService()
+    service.effectuer_ventes_batch(generer_commandes(args.ventes, 1000, 50))
+    service.fermer_connexion()
+    
+    ctx = multiprocessing.get_context("spawn")
+    temps = {"0": [], "1": []}
+    for _ in range(args.tours):
+        for active in ("0", "1"):
+            # Les ventes du scénario ne doivent pas grossir la base du tour suivant
+            copie = os.path.join(dossier, "copie.db")
+            for suffixe in ("-wal", "-shm"):
+                if os.path.exists(copie + suffixe):
+                    os.remove(copie + suffixe)
+            shutil.copyfile(base, copie)
+            os.environ["BILLETTERIE_DB"] = copie
+            os.environ["BILLETTERIE_INSTRUMENTATION"] = active
+            file_resultats = ctx.Queue()
+            p = ctx.Process(target=scenario, args=(args.operations, file_resultats))
+            p.start()
+            duree, nb_methodes = file_resultats.get()
+            p.join()
+            temps[active].append(duree)
+    
+    sans, avec = min(temps["0"]), min(temps["1"])
+    print(f"Sans instrumentation : {sans:.3f} s ({args.operations} opérations)")
+    print(f"Avec instrumentation : {avec:.3f} s ({nb_methodes} méthodes de DAO mesurées)")
+    print(f"Surcoût              : {(avec - sans) / sans * 100:+.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Benchmark : mémoire et durée de lister_ventes (toutes les ventes, avec les jointures)
+# selon la forme des lignes retournées
+# - row_dict : sqlite3.Row converti en dict par le service (ancienne façon)
+# - row      : sqlite3.Row sans conversion, ce que font les services
+# Durée : meilleur de --repetitions passages ; mémoire : taille de la liste obtenue (tracemalloc)
+#
+# Lancement : python -m benchmarks.generateur --facteur 1 --base /tmp/bench.db
+#             python -m benchmarks.lignes --base /tmp/bench.db
+
+import argparse
+import gc
+import sqlite3
+import time
+import tracemalloc
+
+from dao import VenteDAO
+
+MODES = {
+    "row_dict": (sqlite3.Row, lambda lignes: [dict(r) for r in lignes]),
+    "row": (sqlite3.Row, lambda lignes: lignes),
+}
+
+
+def lister(base, mode):
+    row_factory, conversion = MODES[mode]
+    conn = sqlite3.connect(base)
+    conn.row_factory = row_factory
+    try:
+        return conversion(conn.execute(VenteDAO.SQL_GET_ALL).fetchall())
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire et durée des listes de ventes")
+    parser.add_argument("--base", required=True, help="base générée par benchmarks.generateur")
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'mode':<10} {'lignes':>9} {'durée s':>8} {'mémoire Mo':>11} {'octets/ligne':>13}")
+    for mode in MODES:
+        durees = []
+        for _ in range(args.repetitions):
+            gc.collect()
+            debut = time.perf_counter()
+            lignes = lister(args.base, mode)
+            durees.append(time.perf_counter() - debut)
+            nb = len(lignes)
+            del lignes
+        
+        gc.collect()
+        tracemalloc.start()
+        lignes = lister(args.base, mode)
+        memoire = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del lignes
+        print(f"{mode:<10} {nb:>9} {min(durees):>8.2f} {memoire / 1e6:>11.1f} {memoire / max(nb, 1):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Micro-benchmark : recherche d'acheteurs par email / par ID sur une grosse table
+# "avant" = requête construite avec une f-string (nouveau texte SQL à chaque appel,
+#           donc le cache de requêtes préparées ne sert jamais)
+# "après" = requête paramétrée des DAO (texte fixe, requête préparée réutilisée)
+#
+# Lancement : python -m benchmarks.lookups_acheteurs --acheteurs 1000000
+
+import argparse
+import random
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+
+def mesurer(nom, fonction, valeurs):
+    debut = time.perf_counter()
+    for v in valeurs:
+        fonction(v)
+    debit = len(valeurs) / (time.perf_counter() - debut)
+    print(f"  {nom:<32} {debit:>12,.0f} recherches/s")
+    return debit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherches d'acheteurs avant/après paramétrage")
+    parser.add_argument("--acheteurs", type=int, default=1_000_000)
+    parser.add_argument("--recherches", type=int, default=100_000)
+    args = parser.parse_args()
+    
+    base_temporaire()
+    from dao import AcheteurDAO, ConnectionPool
+    
+    print(f"Création de {args.acheteurs:,} acheteurs...")
+    preparer_base(args.acheteurs)
+    
+    dao = AcheteurDAO()
+    ids = [random.randint(1, args.acheteurs) for _ in range(args.recherches)]
+    emails = [f"acheteur{i - 1}@email.com" for i in ids]
+    
+    with ConnectionPool.get_instance().read() as conn:
+        print("Par email :")
+        avant = mesurer("avant (f-string)",
+                        lambda e: conn.execute(f"SELECT * FROM acheteurs WHERE email = '{e}'").fetchone(),
+                        emails)
+        apres = mesurer("après (AcheteurDAO.get_by_email)", dao.get_by_email, emails)
+        print(f"  gain : x{apres / avant:.2f}")
+        
+        print("Par ID :")
+        avant = mesurer("avant (f-string)",
+                        lambda i: conn.execute(f"SELECT * FROM acheteurs WHERE id_acheteur = {i}").fetchone(),
+                        ids)
+        apres = mesurer("après (AcheteurDAO.get_by_id)", dao.get_by_id, ids)
+        print(f"  gain : x{apres / avant:.2f}")
+    
+    ConnectionPool.get_instance().close()
+
+
+if __name__ == "__main__":
+    main()
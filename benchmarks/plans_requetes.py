@@ -0,0 +1,135 @@
+# Vérification des plans d'exécution : EXPLAIN QUERY PLAN sur toutes les requêtes
+# des DAO (constantes SQL_*). Le script échoue (code de sortie 1) si une requête parcourt
+# toute une grosse table : SCAN simple, ou SCAN dans l'ordre d'un index (USING INDEX,
+# USING COVERING INDEX), sauf les requêtes de AUTORISEES. À relancer après chaque
+# changement de requête ou d'index
+#
+# Lancement : python -m benchmarks.plans_requetes            (base neuve créée depuis schema.sql)
+#             python -m benchmarks.plans_requetes --base billetterie.db
+
+import argparse
+import re
+import sqlite3
+
+from benchmarks.commun import base_temporaire
+
+# Petites tables (une ligne par événement, type de billet ou catégorie) : les parcourir est normal
+TABLES_DIMENSION = {"evenements", "types_billets", "stats_evenements", "stats_types_billets",
+                    "stats_categories", "rollups_etat"}
+
+# Requêtes qui ont le droit de parcourir une grosse table, avec la raison
+# (un SCAN ... USING [COVERING] INDEX parcourt aussi toute la table, seulement dans l'ordre de l'index)
+PAGE_LIMIT = "première page : parcours dans l'ordre de l'index du tri, arrêté par LIMIT"
+AUTORISEES = {
+    "VenteDAO.SQL_PAGES[id_vente, desc, debut]": "parcours dans l'ordre de la clé primaire, arrêté par LIMIT",
+    "VenteDAO.SQL_PAGES[id_vente, asc, debut]": "parcours dans l'ordre de la clé primaire, arrêté par LIMIT",
+    "VenteDAO.SQL_PAGES[date_vente, desc, debut]": PAGE_LIMIT,
+    "VenteDAO.SQL_PAGES[date_vente, asc, debut]": PAGE_LIMIT,
+    "VenteDAO.SQL_PAGES[montant_total, desc, debut]": PAGE_LIMIT,
+    "VenteDAO.SQL_PAGES[montant_total, asc, debut]": PAGE_LIMIT,
+    "StatsDAO.SQL_TOP_ACHETEURS": "parcours dans l'ordre de l'index des dépenses, arrêté par LIMIT",
+    "AcheteurDAO.SQL_GET_ALL": "lister_acheteurs veut toute la table (ordre de l'index, sans tri temporaire)",
+    "VenteDAO.SQL_GET_ALL": "lister_ventes veut toute la table ; l'interface passe par SQL_PAGES",
+    "StatsDAO.SQL_REBUILD[4]": "reconstruire_stats relit toutes les ventes (réparation, lancée à la main)",
+    "StatsDAO.SQL_REBUILD[7]": "reconstruire_stats relit toutes les ventes (réparation, lancée à la main)",
+}
+
+# Morceaux de requête qui ne s'exécutent pas seuls
+FRAGMENTS = {"VenteDAO.SQL_COLONNES_LISTE"}
+
+CLASSES_DAO = ("AcheteurDAO", "EvenementDAO", "TypeBilletDAO", "VenteDAO", "StatsDAO", "RollupDAO")
+
+
+def requetes_dao():
+    """Toutes les requêtes des DAO : [(nom, sql)]"""
+    import dao
+    
+    requetes = []
+    for nom_classe in CLASSES_DAO:
+        classe = getattr(dao, nom_classe)
+        for nom in sorted(n for n in vars(classe) if n.startswith("SQL_")):
+            valeur = getattr(classe, nom)
+            nom_complet = f"{nom_classe}.{nom}"
+            if nom_complet in FRAGMENTS:
+                continue
+            if isinstance(valeur, dict):
+                # SQL_PAGES : {(tri, descendant, sens): sql}
+                for (tri, descendant, sens), sql in valeur.items():
+                    ordre = "desc" if descendant else "asc"
+                    requetes.append((f"{nom_complet}[{tri}, {ordre}, {sens or 'debut'}]", sql))
+            elif isinstance(valeur, list):
+                # SQL_REBUILD : plusieurs requêtes à la suite
+                requetes.extend((f"{nom_complet}[{i}]", sql) for i, sql in enumerate(valeur))
+            else:
+                requetes.append((nom_complet, valeur))
+    return requetes
+
+
+def scans_interdits(conn, tables, sql):
+    """Les lignes du plan qui parcourent toute une grosse table (avec ou sans index)"""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?")).fetchall()
+    alias = {a: t for t, a in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?(\w+)", sql, re.I)}
+    interdits, details = [], []
+    for ligne in plan:
+        detail = ligne[3]
+        details.append(detail)
+        scan = re.match(r"SCAN (\w+)(?: USING|$)", detail)
+        if scan is None:
+            continue
+        # Un SCAN peut aussi porter sur une sous-requête (ex: "SCAN c"), ce n'est pas une table
+        table = alias.get(scan.group(1), scan.group(1))
+        if table in tables and table not in TABLES_DIMENSION:
+            interdits.append(detail)
+    return interdits, details
+
+
+def verifier(chemin, details=False):
+    """
+    Vérifie les plans de toutes les requêtes des DAO sur la base `chemin`
+    Affiche chaque échec (et chaque plan si details), retourne le nombre d'échecs
+    """
+    conn = sqlite3.connect(chemin)
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    echecs = 0
+    noms = set()
+    for nom, sql in requetes_dao():
+        noms.add(nom)
+        interdits, plan = scans_interdits(conn, tables, sql)
+        if interdits and nom not in AUTORISEES:
+            echecs += 1
+            print(f"ÉCHEC {nom} : {' ; '.join(interdits)}")
+        elif details:
+            etat = "admis" if interdits else "ok   "
+            print(f"{etat} {nom} : {' ; '.join(plan) or '-'}")
+    conn.close()
+    # Une requête renommée ou supprimée ne doit pas laisser une autorisation qui ne sert plus
+    for nom in sorted(set(AUTORISEES) - noms):
+        echecs += 1
+        print(f"ÉCHEC {nom} : autorisée dans AUTORISEES mais introuvable dans les DAO")
+    return echecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie qu'aucune requête des DAO ne fait de SCAN complet")
+    parser.add_argument("--base", help="base à analyser (par défaut : base neuve depuis schema.sql)")
+    parser.add_argument("--details", action="store_true", help="affiche le plan de chaque requête")
+    args = parser.parse_args()
+    
+    if args.base:
+        chemin = args.base
+    else:
+        chemin = base_temporaire("plans.db")
+        from dao import init_database, ConnectionPool
+        init_database()
+        ConnectionPool.get_instance().close()
+    
+    echecs = verifier(chemin, args.details)
+    if echecs:
+        print(f"{echecs} requête(s) avec un SCAN complet")
+        return 1
+    print("OK : aucune requête ne parcourt toute une grosse table")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
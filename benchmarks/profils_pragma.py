@@ -0,0 +1,82 @@
+# Benchmark : comparaison des profils PRAGMA de config.py
+# Pour chaque profil : un thread vend des billets pendant qu'un autre lit les stats,
+# on mesure les ventes par seconde et le temps de réponse des lectures
+#
+# Lancement : python -m benchmarks.profils_pragma --ventes 2000
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+
+from benchmarks.commun import base_temporaire, percentile
+
+
+def mesurer_profil(nb_ventes, file_resultats):
+    """Tourne dans un processus à part : le profil est lu dans BILLETTERIE_PRAGMA"""
+    from dao import init_database
+    from services import BilletterieService
+    
+    init_database()
+    service = BilletterieService()
+    service.cache = None  # on mesure la base, pas le cache du service
+    service.inscrire_acheteur("Bench", "Vendeur", "bench@email.com")
+    service.creer_evenement("Bench", "Benchmark", "2026-01-01", "20:00", "Salle", nb_ventes, "concert")
+    service.creer_type_billet(1, "Standard", 10.0, nb_ventes)
+    
+    fini = threading.Event()
+    latences = []
+    
+    def lecteur():
+        while not fini.is_set():
+            debut = time.perf_counter()
+            service.calculer_chiffre_affaires_total()
+            latences.append((time.perf_counter() - debut) * 1000)
+    
+    thread = threading.Thread(target=lecteur)
+    thread.start()
+    debut = time.perf_counter()
+    for _ in range(nb_ventes):
+        service.effectuer_vente(1, 1, 1)
+    duree = time.perf_counter() - debut
+    fini.set()
+    thread.join()
+    service.fermer_connexion()
+    
+    file_resultats.put({
+        "ventes_par_s": nb_ventes / duree,
+        "lectures": len(latences),
+        "lecture_p50_ms": statistics.median(latences) if latences else 0.0,
+        "lecture_p99_ms": percentile(latences, 99),
+    })
+
+
+def main():
+    from config import PRAGMA_PROFILS
+    
+    parser = argparse.ArgumentParser(description="Comparaison des profils PRAGMA")
+    parser.add_argument("--ventes", type=int, default=2000)
+    # "chargement" et "export" servent à des pools à part, pas aux ventes
+    parser.add_argument("--profils", nargs="*",
+                        default=[p for p in PRAGMA_PROFILS if p not in ("chargement", "export")])
+    args = parser.parse_args()
+    
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'profil':<12} {'ventes/s':>10} {'lectures':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for profil in args.profils:
+        # Chaque profil a sa propre base neuve (le mode WAL reste écrit dans le fichier)
+        base_temporaire()
+        os.environ["BILLETTERIE_PRAGMA"] = profil
+        file_resultats = ctx.Queue()
+        p = ctx.Process(target=mesurer_profil, args=(args.ventes, file_resultats))
+        p.start()
+        r = file_resultats.get()
+        p.join()
+        print(f"{profil:<12} {r['ventes_par_s']:>10,.0f} {r['lectures']:>10} "
+              f"{r['lecture_p50_ms']:>10.2f} {r['lecture_p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
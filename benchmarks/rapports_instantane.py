@@ -0,0 +1,106 @@
+# Benchmark : temps de réponse des ventes pendant que des rapports tournent
+# Un thread vend des billets un par un (effectuer_vente), pendant que d'autres threads
+# enchaînent les rapports de StatsDAO (get_top_billets, get_top_acheteurs(-1)...)
+# - sans_rapports : référence, personne ne lit les stats
+# - direct        : les rapports lisent la base où se font les ventes
+# - instantane    : les rapports lisent un instantané (instantane.py), refait toutes
+#                   les --intervalle secondes pendant la mesure
+# Avec --profil defaut (journal "rollback"), chaque lecture bloque les commits des ventes
+# Avec autant de threads de rapports que de connexions de lecture (POOL_TAILLE_LECTEURS),
+# les rapports occupent tout le pool et la vente attend une connexion pour lire l'acheteur
+#
+# Lancement : python -m benchmarks.rapports_instantane --facteur 0.2 --profil defaut
+
+import argparse
+import os
+import threading
+import time
+
+from benchmarks.commun import base_temporaire, percentile
+
+MODES = ("sans_rapports", "direct", "instantane")
+RAPPORTS = ("get_chiffre_affaires_par_evenement", "get_taux_remplissage_par_evenement",
+            "get_top_billets", "get_ventes_par_categorie", "get_indicateurs")
+
+
+def rapporteur(stats_dao, fin, compteur):
+    # Tous les rapports du tableau de bord en boucle, avec le classement complet des acheteurs
+    # (arrêt à l'heure prévue : en mode direct, le vendeur peut attendre une connexion tout ce temps)
+    while time.perf_counter() < fin:
+        for nom in RAPPORTS:
+            getattr(stats_dao, nom)()
+        stats_dao.get_top_acheteurs(-1)
+        compteur.append(1)
+
+
+def mesurer(service, mode, nb_rapporteurs, duree, intervalle, nb_types):
+    from dao import StatsDAO
+    from instantane import InstantaneRapports
+    
+    instantane = None
+    if mode == "instantane":
+        instantane = InstantaneRapports(service.db, intervalle=intervalle)
+        instantane.demarrer()
+    stats_dao = StatsDAO(instantane)
+    
+    fin = time.perf_counter() + duree
+    rapports = []
+    threads = [] if mode == "sans_rapports" else [
+        threading.Thread(target=rapporteur, args=(stats_dao, fin, rapports))
+        for _ in range(nb_rapporteurs)]
+    for t in threads:
+        t.start()
+    
+    latences = []
+    i = 0
+    while time.perf_counter() < fin:
+        debut = time.perf_counter()
+        service.effectuer_vente(1 + i % 1000, 1 + i % nb_types, 1)
+        latences.append((time.perf_counter() - debut) * 1000)
+        i += 1
+    for t in threads:
+        t.join()
+    
+    resultat = {"ventes": len(latences), "p50": percentile(latences, 50),
+                "p99": percentile(latences, 99), "max": max(latences), "rapports": len(rapports)}
+    if instantane is not None:
+        resultat["copies"] = instantane.nb_rafraichissements
+        instantane.close()
+    return resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des ventes pendant les rapports")
+    parser.add_argument("--facteur", type=float, default=0.2,
+                        help="taille de la base (1 = 20k acheteurs, 1M ventes)")
+    parser.add_argument("--profil", default="performance", help="profil PRAGMA de config.py")
+    parser.add_argument("--rapporteurs", type=int, default=4, help="threads qui lancent les rapports")
+    parser.add_argument("--duree", type=float, default=10, help="durée de chaque mesure (s)")
+    parser.add_argument("--intervalle", type=float, default=2,
+                        help="secondes entre deux copies de l'instantané")
+    args = parser.parse_args()
+    
+    # Variables lues par config.py : à régler avant les imports
+    base_temporaire()
+    os.environ["BILLETTERIE_PRAGMA"] = args.profil
+    os.environ["BILLETTERIE_RAPPORTS_INSTANTANE"] = "0"  # le benchmark choisit lui-même
+    from benchmarks.generateur import generer
+    from services import BilletterieService
+    
+    print(f"Génération de la base (facteur {args.facteur})...")
+    n = generer(args.facteur, afficher=lambda *_: None)
+    service = BilletterieService()
+    service.cache = None  # on mesure la base, pas le cache du service
+    
+    print(f"Profil {args.profil}, {args.rapporteurs} threads de rapports, {args.duree:.0f} s par mode")
+    print(f"{'mode':<14} {'ventes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'rapports':>9}")
+    for mode in MODES:
+        r = mesurer(service, mode, args.rapporteurs, args.duree, args.intervalle, 3 * n["evenements"])
+        copies = f"  ({r['copies']} copies)" if "copies" in r else ""
+        print(f"{mode:<14} {r['ventes']:>7} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['max']:>8.1f} "
+              f"{r['rapports']:>9}{copies}")
+    service.fermer_connexion()
+
+
+if __name__ == "__main__":
+    main()
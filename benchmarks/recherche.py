@@ -0,0 +1,85 @@
+# Benchmark : recherche d'acheteurs pendant la frappe (FTS5, AcheteurDAO.rechercher)
+# On crée --acheteurs acheteurs (chargement en masse : l'index de recherche est refait
+# d'un coup à la fin), puis on rejoue la frappe de vraies fiches lettre par lettre : "prénom nom",
+# début d'email, début de téléphone. Une recherche par touche, comme dans app.py
+# Attention : le générateur n'a que 16 noms et 16 prénoms, chaque nom correspond donc à
+# 1/16 des acheteurs (bien pire qu'une vraie base)
+# Le script échoue si le p95 dépasse --seuil-ms
+#
+# Lancement : python -m benchmarks.recherche --acheteurs 1000000
+
+import argparse
+import random
+import time
+
+from benchmarks.commun import base_temporaire, percentile
+
+
+def frappes(texte):
+    # Ce que contient la zone de recherche après chaque touche ("m", "ma", "mar"...)
+    return [texte[:i] for i in range(1, len(texte) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche d'acheteurs pendant la frappe")
+    parser.add_argument("--acheteurs", type=int, default=1_000_000)
+    parser.add_argument("--fiches", type=int, default=30, help="fiches dont on rejoue la frappe")
+    parser.add_argument("--seuil-ms", type=float, default=10.0, help="p95 maximum accepté")
+    args = parser.parse_args()
+    
+    base_temporaire()
+    from dao import init_database
+    from chargement import inserer_par_paquets, sans_index
+    from benchmarks.generateur import acheteurs, SQL_ACHETEUR
+    from services import BilletterieService
+    
+    init_database()
+    rng = random.Random(42)
+    debut = time.perf_counter()
+    with sans_index():
+        inserer_par_paquets(SQL_ACHETEUR, acheteurs(args.acheteurs, rng))
+    print(f"{args.acheteurs} acheteurs insérés (avec l'index de recherche) "
+          f"en {time.perf_counter() - debut:.1f} s")
+    
+    service = BilletterieService()
+    with service.db.read() as conn:
+        fiches = [conn.execute("SELECT * FROM acheteurs WHERE id_acheteur = ?",
+                               (rng.randint(1, args.acheteurs),)).fetchone()
+                  for _ in range(args.fiches)]
+    
+    durees = {"prénom nom": [], "email": [], "téléphone": []}
+    trouvees = 0
+    for fiche in fiches:
+        saisies = {
+            "prénom nom": f"{fiche['prenom']} {fiche['nom']}",
+            "email": fiche['email'].split("@")[0],
+            "téléphone": fiche['telephone'],
+        }
+        for genre, texte in saisies.items():
+            for saisie in frappes(texte):
+                t = time.perf_counter()
+                resultats = service.rechercher_acheteurs(saisie)
+                durees[genre].append((time.perf_counter() - t) * 1000)
+            # Saisie complète : la fiche doit sortir (sauf "prénom nom", partagés par ~4000 acheteurs)
+            if genre != "prénom nom" and any(r['id_acheteur'] == fiche['id_acheteur'] for r in resultats):
+                trouvees += 1
+    service.fermer_connexion()
+    
+    print(f"{'saisie':<12} {'recherches':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    toutes = []
+    for genre, valeurs in durees.items():
+        toutes += valeurs
+        print(f"{genre:<12} {len(valeurs):>10} {percentile(valeurs, 50):>8.2f} {percentile(valeurs, 95):>8.2f} "
+              f"{percentile(valeurs, 99):>8.2f} {max(valeurs):>8.2f}")
+    p95 = percentile(toutes, 95)
+    print(f"{'total':<12} {len(toutes):>10} {percentile(toutes, 50):>8.2f} {p95:>8.2f} "
+          f"{percentile(toutes, 99):>8.2f} {max(toutes):>8.2f}")
+    print(f"Fiches retrouvées par email / téléphone complet : {trouvees} / {2 * len(fiches)}")
+    if p95 > args.seuil_ms:
+        print(f"ÉCHEC : p95 de {p95:.1f} ms (seuil {args.seuil_ms} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+# Benchmark : temps de calcul des stats du tableau de bord quand la table ventes grossit
+# "tables stats_*" = StatsDAO actuel (tables tenues à jour par les triggers)
+# "jointures"      = les anciennes requêtes qui relisent toutes les ventes
+#
+# Lancement : python -m benchmarks.stats_dashboard --paliers 10000 100000 1000000
+
+import argparse
+import random
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+# Anciennes requêtes (avant les tables de stats), pour comparer
+REQUETES_JOINTURES = [
+    "SELECT COALESCE(SUM(montant_total), 0) FROM ventes",
+    """SELECT e.id_evenement, COALESCE(SUM(v.montant_total), 0) AS ca
+       FROM evenements e
+       LEFT JOIN types_billets tb ON e.id_evenement = tb.id_evenement
+       LEFT JOIN ventes v ON tb.id_type_billet = v.id_type_billet
+       GROUP BY e.id_evenement ORDER BY ca DESC""",
+    """SELECT e.categorie, COALESCE(SUM(v.quantite), 0) AS billets
+       FROM evenements e
+       LEFT JOIN types_billets tb ON e.id_evenement = tb.id_evenement
+       LEFT JOIN ventes v ON tb.id_type_billet = v.id_type_billet
+       GROUP BY e.categorie ORDER BY billets DESC""",
+]
+
+
+def ajouter_ventes(nb, nb_acheteurs, nb_types):
+    from dao import ConnectionPool
+    
+    pool = ConnectionPool.get_instance()
+    for _ in range(0, nb, 100_000):
+        lot = min(100_000, nb)
+        nb -= lot
+        with pool.write() as conn:
+            conn.executemany(
+                "INSERT INTO ventes (id_acheteur, id_type_billet, quantite, montant_total) VALUES (?, ?, ?, ?)",
+                ((random.randint(1, nb_acheteurs), random.randint(1, nb_types), q, q * 20.0)
+                 for q in (random.randint(1, 4) for _ in range(lot)))
+            )
+
+
+def chrono_ms(fonction, repetitions=5):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stats du tableau de bord vs taille de la table ventes")
+    parser.add_argument("--paliers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--evenements", type=int, default=200)
+    parser.add_argument("--acheteurs", type=int, default=10_000)
+    parser.add_argument("--sans-jointures", action="store_true", help="ne pas mesurer les anciennes requêtes")
+    args = parser.parse_args()
+    
+    base_temporaire()
+    from dao import ConnectionPool
+    from services import BilletterieService
+    
+    preparer_base(args.acheteurs, args.evenements * 2, 1_000_000, nb_evenements=args.evenements)
+    service = BilletterieService()
+    service.cache = None  # on mesure la base, pas le cache du service
+    pool = ConnectionPool.get_instance()
+    
+    def tableau_de_bord():
+        service.calculer_chiffre_affaires_total()
+        service.calculer_ca_par_evenement()
+        service.calculer_taux_remplissage()
+        service.obtenir_stats_par_categorie()
+        service.obtenir_top_billets()
+        service.obtenir_top_acheteurs()
+    
+    def jointures():
+        with pool.read() as conn:
+            for sql in REQUETES_JOINTURES:
+                conn.execute(sql).fetchall()
+    
+    print(f"{'ventes':>12} {'tables stats_* (ms)':>20} {'jointures (ms)':>16}")
+    total = 0
+    for palier in sorted(args.paliers):
+        ajouter_ventes(palier - total, args.acheteurs, args.evenements * 2)
+        total = palier
+        t_stats = chrono_ms(tableau_de_bord)
+        t_join = "-" if args.sans_jointures else f"{chrono_ms(jointures, 1):.1f}"
+        print(f"{total:>12,} {t_stats:>20.2f} {t_join:>16}")
+    service.fermer_connexion()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Benchmark : ouverture de billetterie avec peu de stock et beaucoup de demandes
+# La plupart des types sont vite épuisés : avec le registre du stock (stock.py), ces
+# demandes sont refusées sans passer par la file d'écriture (un refus relit le stock du type)
+# - registre : STOCK_MEMOIRE_ACTIF
+# - base     : sans registre, chaque demande va jusqu'à SQLite
+# Vérifie ensuite qu'il n'y a pas de survente et que le registre est égal à la base
+# --crash : le processus vendeur est tué (SIGKILL) en pleine vente, puis on vérifie
+#           qu'un service neuf retrouve un stock cohérent avec les ventes enregistrées
+#
+# Lancement : python -m benchmarks.stock_memoire --threads 32 --mode registre
+
+import argparse
+import multiprocessing
+import os
+import random
+import signal
+import threading
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+NB_ACHETEURS, NB_TYPES = 1000, 20
+
+
+def producteur(file, nb_demandes, compteurs):
+    for _ in range(nb_demandes):
+        r = file.vendre(random.randint(1, NB_ACHETEURS), random.randint(1, NB_TYPES),
+                        random.randint(1, 4)).result()
+        compteurs.append(r["success"])
+
+
+def vendre(nb_threads, nb_demandes):
+    """Lance les threads vendeurs sur la file d'écriture, retourne (durée, résultats)"""
+    from services import BilletterieService
+    from ecriture import FileEcriture
+
+    service = BilletterieService()
+    file = FileEcriture(service)
+    compteurs = []
+    threads = [threading.Thread(target=producteur, args=(file, nb_demandes, compteurs))
+               for _ in range(nb_threads)]
+    debut = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    file.fermer()
+    return service, time.perf_counter() - debut, compteurs
+
+
+def verifier(service, stock_initial):
+    """Nombre de types vendus au-delà du stock, et écarts entre registre et base"""
+    with service.db.read() as conn:
+        lignes = conn.execute("""
+            SELECT tb.id_type_billet, tb.quantite_disponible, COALESCE(SUM(v.quantite), 0) AS vendus
+            FROM types_billets tb LEFT JOIN ventes v ON v.id_type_billet = tb.id_type_billet
+            GROUP BY tb.id_type_billet""").fetchall()
+    incoherents = sum(1 for r in lignes if r['quantite_disponible'] + r['vendus'] != stock_initial)
+    ecarts = service.stock.ecarts() if service.stock is not None else {}
+    return incoherents, ecarts
+
+
+def enfant_crash(nb_threads, nb_demandes):
+    # Processus tué en pleine vente par le parent
+    vendre(nb_threads, nb_demandes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registre du stock en mémoire pendant une ouverture")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--demandes", type=int, default=2000, help="demandes par thread")
+    parser.add_argument("--stock", type=int, default=500, help="stock de chaque type")
+    parser.add_argument("--mode", choices=["registre", "base"], default="registre")
+    parser.add_argument("--crash", action="store_true")
+    args = parser.parse_args()
+
+    # Variables lues par config.py : à régler avant les imports
+    base_temporaire()
+    os.environ["BILLETTERIE_STOCK_MEMOIRE"] = "1" if args.mode == "registre" else "0"
+    preparer_base(NB_ACHETEURS, NB_TYPES, stock_par_type=args.stock)
+
+    if args.crash:
+        from dao import ConnectionPool
+        ConnectionPool.get_instance().close()
+        ctx = multiprocessing.get_context("spawn")
+        p = ctx.Process(target=enfant_crash, args=(args.threads, args.demandes))
+        p.start()
+        time.sleep(2)
+        os.kill(p.pid, signal.SIGKILL)
+        p.join()
+        from services import BilletterieService
+        service = BilletterieService()  # registre rechargé depuis la base
+        incoherents, ecarts = verifier(service, args.stock)
+        print(f"Processus tué ; ventes enregistrées : {service.compter_ventes()}")
+        print(f"Types incohérents (stock + vendus != stock initial) : {incoherents}")
+        print(f"Écarts registre / base après redémarrage : {len(ecarts)}")
+        service.fermer_connexion()
+        return 1 if incoherents or ecarts else 0
+
+    service, duree, compteurs = vendre(args.threads, args.demandes)
+    incoherents, ecarts = verifier(service, args.stock)
+    acceptees = sum(compteurs)
+    print(f"Mode {args.mode} : {len(compteurs)} demandes en {duree:.2f} s "
+          f"({len(compteurs) / duree:.0f} demandes/s)")
+    print(f"Acceptées : {acceptees}, refusées : {len(compteurs) - acceptees}")
+    print(f"Survente : {'NON' if not incoherents else f'OUI ({incoherents} types)'}")
+    if service.stock is not None:
+        print(f"Écarts registre / base : {len(ecarts)}")
+    service.fermer_connexion()
+    return 1 if incoherents or ecarts else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
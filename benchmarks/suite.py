@@ -0,0 +1,208 @@
+# Suite de benchmarks : scénarios chronométrés sur une base générée (benchmarks.generateur)
+# Ventes (une par une et groupées), annulations, pages de la liste des ventes,
+# chaque rapport de StatsDAO et le rafraîchissement du tableau de bord
+# Les résultats sont écrits en JSON pour comparer deux commits
+# La suite vérifie aussi les plans des requêtes (benchmarks.plans_requetes) : elle sort
+# avec le code 1 si une requête parcourt toute une grosse table, ou s'il y a une régression
+#
+# Lancement : python -m benchmarks.suite --base /tmp/bench.db --facteur 1 --sortie avant.json
+#             python -m benchmarks.suite --base /tmp/bench.db --sortie apres.json --comparer avant.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import time
+
+from benchmarks.plans_requetes import verifier as verifier_plans
+
+# Variation (en %) au-delà de laquelle une comparaison est signalée comme régression
+SEUIL_REGRESSION = 10
+
+
+def chronometrer(fonction, repetitions):
+    """Durées (en ms) de `repetitions` appels à fonction()"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def resume_latence(durees):
+    durees = sorted(durees)
+    return {
+        "mesure": "median_ms",
+        "median_ms": round(statistics.median(durees), 4),
+        "min_ms": round(durees[0], 4),
+        "p95_ms": round(durees[min(len(durees) - 1, int(len(durees) * 0.95))], 4),
+        "repetitions": len(durees),
+    }
+
+
+def resume_debit(nb_operations, duree_s):
+    return {"mesure": "ops_par_s", "ops_par_s": round(nb_operations / duree_s, 1),
+            "operations": nb_operations, "duree_s": round(duree_s, 3)}
+
+
+def scenarios(service, args):
+    """Lance tous les scénarios, retourne {nom: résumé}"""
+    from dao import VenteDAO, StatsDAO
+    
+    rng = random.Random(args.graine)
+    with service.db.read() as conn:
+        nb_acheteurs = conn.execute("SELECT MAX(id_acheteur) FROM acheteurs").fetchone()[0]
+        nb_types = conn.execute("SELECT MAX(id_type_billet) FROM types_billets").fetchone()[0]
+    resultats = {}
+    
+    def commande():
+        return {"id_acheteur": rng.randint(1, nb_acheteurs), "id_type_billet": rng.randint(1, nb_types),
+                "quantite": rng.randint(1, 3)}
+    
+    # Écritures : les ventes créées ici sont annulées ensuite, la base ne grossit pas d'un tour à l'autre
+    crees = []
+    debut = time.perf_counter()
+    for _ in range(args.ventes):
+        c = commande()
+        r = service.effectuer_vente(c["id_acheteur"], c["id_type_billet"], c["quantite"])
+        if r["success"]:
+            crees.append(r["id_vente"])
+    resultats["vente_unitaire"] = resume_debit(args.ventes, time.perf_counter() - debut)
+    
+    commandes = [commande() for _ in range(args.ventes * 10)]
+    debut = time.perf_counter()
+    lot = service.effectuer_ventes_batch(commandes)
+    resultats["ventes_batch"] = resume_debit(len(commandes), time.perf_counter() - debut)
+    crees.extend(r["id_vente"] for r in lot if r["success"])
+    
+    debut = time.perf_counter()
+    for id_vente in crees:
+        service.annuler_vente(id_vente)
+    resultats["annulation"] = resume_debit(len(crees), time.perf_counter() - debut)
+    
+    # Liste des ventes : première page pour chaque tri, puis une page loin dans la liste
+    for tri in VenteDAO.TRIS:
+        resultats[f"page_premiere_{tri}"] = resume_latence(chronometrer(
+            lambda: service.lister_ventes_page(limite=50, tri=tri), args.repetitions))
+    page = service.lister_ventes_page(limite=50)
+    for _ in range(args.profondeur):
+        page = service.lister_ventes_page(apres=page["suivant"], limite=50)
+    suivant = page["suivant"]
+    resultats["page_profonde"] = resume_latence(chronometrer(
+        lambda: service.lister_ventes_page(apres=suivant, limite=50), args.repetitions))
+    resultats["page_precedente"] = resume_latence(chronometrer(
+        lambda: service.lister_ventes_page(avant=suivant, limite=50), args.repetitions))
+    
+    # Chaque rapport de StatsDAO (directement, sans le cache du service)
+    stats_dao = StatsDAO(service.db)
+    for nom in sorted(n for n in vars(StatsDAO) if n.startswith("get_")):
+        methode = getattr(stats_dao, nom)
+        resultats[f"stats_{nom[4:]}"] = resume_latence(chronometrer(methode, args.repetitions))
+    
+    # Ce que fait l'interface quand on clique sur "Rafraîchir"
+    def rafraichir():
+        service.calculer_indicateurs_avances()
+        service.compter_ventes()
+        service.lister_ventes_page(limite=50)
+    resultats["dashboard_rafraichir"] = resume_latence(chronometrer(rafraichir, args.repetitions))
+    return resultats
+
+
+def infos_base(service):
+    with service.db.read() as conn:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("acheteurs", "evenements", "types_billets", "ventes")}
+
+
+def commit_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.dirname(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def comparer(ancien, nouveau):
+    """Affiche la variation de chaque scénario, retourne le nombre de régressions"""
+    regressions = 0
+    print(f"\n{'scénario':<34} {'avant':>12} {'après':>12} {'variation':>10}")
+    for nom, r in nouveau["scenarios"].items():
+        a = ancien["scenarios"].get(nom)
+        if a is None:
+            print(f"{nom:<34} {'-':>12} {r[r['mesure']]:>12} {'nouveau':>10}")
+            continue
+        cle = r["mesure"]
+        variation = (r[cle] - a[cle]) / a[cle] * 100 if a[cle] else 0.0
+        # Pour un débit, plus c'est haut mieux c'est ; pour une latence, c'est l'inverse
+        pire = -variation if cle == "ops_par_s" else variation
+        marque = "  RÉGRESSION" if pire > SEUIL_REGRESSION else ""
+        regressions += bool(marque)
+        print(f"{nom:<34} {a[cle]:>12} {r[cle]:>12} {variation:>+9.1f}%{marque}")
+    print(f"\nAvant : {ancien['meta'].get('commit')}  après : {nouveau['meta'].get('commit')} "
+          "(latences : médiane en ms, débits : opérations/s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scénarios chronométrés, résultats en JSON")
+    parser.add_argument("--base", required=True, help="base générée (créée si elle n'existe pas)")
+    parser.add_argument("--facteur", type=float, default=1.0, help="facteur d'échelle si on doit la créer")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--ventes", type=int, default=500, help="ventes une par une (x10 en groupé)")
+    parser.add_argument("--repetitions", type=int, default=20, help="répétitions des lectures")
+    parser.add_argument("--profondeur", type=int, default=200, help="page mesurée pour page_profonde")
+    parser.add_argument("--sortie", help="fichier JSON des résultats")
+    parser.add_argument("--comparer", help="fichier JSON d'un tour précédent")
+    args = parser.parse_args()
+    
+    os.environ["BILLETTERIE_DB"] = os.path.abspath(args.base)
+    if not os.path.exists(args.base):
+        from benchmarks.generateur import generer
+        print(f"Génération de {args.base} (facteur {args.facteur})...")
+        generer(args.facteur, args.graine)
+    
+    from config import PRAGMA_PROFIL
+    from services import BilletterieService
+    service = BilletterieService()
+    service.cache = None  # on mesure la base, pas le cache du service
+    
+    resultats = {
+        "meta": {
+            "commit": commit_git(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "base": infos_base(service),
+            "profil_pragma": PRAGMA_PROFIL,
+            "sqlite": sqlite3.sqlite_version,
+            "python": platform.python_version(),
+        },
+        "scenarios": scenarios(service, args),
+    }
+    service.fermer_connexion()
+    
+    for nom, r in resultats["scenarios"].items():
+        print(f"{nom:<34} {r[r['mesure']]:>12} {r['mesure']}")
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {args.sortie}")
+    echec = False
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            ancien = json.load(f)
+        echec = comparer(ancien, resultats) > 0
+    
+    print("\nPlans des requêtes :")
+    if verifier_plans(args.base):
+        echec = True
+    else:
+        print("OK : aucune requête ne parcourt toute une grosse table")
+    return 1 if echec else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
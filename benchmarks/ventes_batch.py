@@ -0,0 +1,77 @@
+# Benchmark : effectuer_ventes_batch comparé à une boucle sur effectuer_vente
+# La boucle fait un commit par vente, elle est donc mesurée sur un échantillon
+# et on compare les débits (ventes par seconde)
+# On vérifie aussi que les stats_* mises à jour par paquet (VenteDAO.create_many) sont
+# celles que donne StatsDAO.rebuild_stats (le script échoue sinon)
+#
+# Lancement : python -m benchmarks.ventes_batch --commandes 100000
+
+import argparse
+import random
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+
+def generer_commandes(nb, nb_acheteurs, nb_types):
+    return [{"id_acheteur": random.randint(1, nb_acheteurs),
+             "id_type_billet": random.randint(1, nb_types),
+             "quantite": random.randint(1, 4)} for _ in range(nb)]
+
+
+TABLES_STATS = ("stats_types_billets", "stats_evenements", "stats_categories", "stats_acheteurs")
+
+
+def lire_stats(db):
+    # Contenu des tables stats_* (montants arrondis au centime)
+    with db.read() as conn:
+        return {table: sorted(tuple(round(v, 2) if isinstance(v, float) else v for v in ligne)
+                              for ligne in conn.execute(f"SELECT * FROM {table}"))
+                for table in TABLES_STATS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ventes groupées vs ventes une par une")
+    parser.add_argument("--commandes", type=int, default=100_000)
+    parser.add_argument("--echantillon-boucle", type=int, default=2000,
+                        help="nombre de ventes faites une par une pour mesurer la boucle")
+    parser.add_argument("--acheteurs", type=int, default=1000)
+    parser.add_argument("--types", type=int, default=50)
+    args = parser.parse_args()
+    
+    base_temporaire()
+    from services import BilletterieService
+    
+    # Stock large : on veut mesurer l'écriture, pas les refus
+    preparer_base(args.acheteurs, args.types, stock_par_type=args.commandes * 4)
+    service = BilletterieService()
+    
+    commandes = generer_commandes(args.echantillon_boucle, args.acheteurs, args.types)
+    debut = time.perf_counter()
+    for c in commandes:
+        service.effectuer_vente(c['id_acheteur'], c['id_type_billet'], c['quantite'])
+    debit_boucle = len(commandes) / (time.perf_counter() - debut)
+    
+    commandes = generer_commandes(args.commandes, args.acheteurs, args.types)
+    debut = time.perf_counter()
+    resultats = service.effectuer_ventes_batch(commandes)
+    duree_batch = time.perf_counter() - debut
+    debit_batch = len(commandes) / duree_batch
+    acceptees = sum(1 for r in resultats if r['success'])
+    
+    from dao import StatsDAO
+    stats = lire_stats(service.db)
+    StatsDAO(service.db).rebuild_stats()
+    stats_ok = stats == lire_stats(service.db)
+    service.fermer_connexion()
+    
+    print(f"Boucle effectuer_vente  : {debit_boucle:,.0f} ventes/s (sur {args.echantillon_boucle} ventes)")
+    print(f"effectuer_ventes_batch  : {debit_batch:,.0f} ventes/s "
+          f"({acceptees}/{len(commandes)} acceptées en {duree_batch:.2f} s)")
+    print(f"Accélération            : x{debit_batch / debit_boucle:.0f}")
+    print(f"Stats par paquet        : {'OK' if stats_ok else 'ÉCHEC (différentes de rebuild_stats)'}")
+    return 0 if stats_ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+# Benchmark : plusieurs vendeurs (processus) vendent le même type de billet en même temps
+# On vérifie qu'il n'y a jamais de survente et on mesure le nombre de ventes par seconde
+# Un vendeur qui meurt (exception, base verrouillée...) ou qui ne finit pas avant --delai
+# arrête le benchmark en échec au lieu de le laisser attendre pour toujours
+#
+# Lancement : python -m benchmarks.ventes_concurrentes --processus 4 --stock 2000
+
+import argparse
+import multiprocessing
+import queue
+import random
+import time
+
+from benchmarks.commun import base_temporaire, preparer_base
+
+
+def vendeur(mode, id_acheteur, id_type, file_resultats):
+    """Un processus vendeur : vend jusqu'à ce qu'il n'y ait plus de stock"""
+    from services import BilletterieService
+    
+    service = BilletterieService()
+    ventes, billets = 0, 0
+    while True:
+        quantite = random.randint(1, 3)
+        if mode == "naif":
+            result = vente_naive(service, id_acheteur, id_type, quantite)
+        else:
+            result = service.effectuer_vente(id_acheteur, id_type, quantite)
+        
+        if result["success"]:
+            ventes += 1
+            billets += quantite
+        elif "Stock insuffisant (0" in result.get("error", ""):
+            break
+    service.fermer_connexion()
+    file_resultats.put((ventes, billets))
+
+
+def vente_naive(service, id_acheteur, id_type, quantite):
+    """L'ancienne façon de faire : lecture du stock puis 2 commits séparés"""
+    type_billet = service.type_billet_dao.get_by_id(id_type)
+    if type_billet["quantite_disponible"] < quantite:
+        return {"success": False, "error": f"Stock insuffisant ({type_billet['quantite_disponible']} dispo)"}
+    service.vente_dao.create(id_acheteur, id_type, quantite, type_billet["prix"] * quantite)
+    service.type_billet_dao.update_quantite(id_type, type_billet["quantite_disponible"] - quantite)
+    return {"success": True}
+
+
+def attendre_vendeurs(processus, file_resultats, delai):
+    """
+    Résultats (ventes, billets) de tous les vendeurs, ou None si l'un d'eux s'est arrêté
+    sans répondre ou si tous n'ont pas fini au bout de `delai` secondes (les autres sont arrêtés)
+    """
+    resultats = []
+    limite = time.monotonic() + delai
+    while len(resultats) < len(processus):
+        try:
+            resultats.append(file_resultats.get(timeout=0.5))
+            continue
+        except queue.Empty:
+            pass
+        # Un vendeur qui finit normalement a déjà mis son résultat dans la file
+        morts = [p for p in processus if p.exitcode not in (None, 0)]
+        if morts or time.monotonic() > limite:
+            for p in morts:
+                print(f"ERREUR : vendeur {p.pid} arrêté sans résultat (code {p.exitcode})")
+            if not morts:
+                print(f"ERREUR : vendeurs pas terminés au bout de {delai} s")
+            for p in processus:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
+            return None
+    for p in processus:
+        p.join(timeout=10)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ventes concurrentes sur un même type de billet")
+    parser.add_argument("--processus", type=int, default=4)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--mode", choices=["atomique", "naif"], default="atomique")
+    parser.add_argument("--delai", type=float, default=300, help="secondes max pour tous les vendeurs")
+    args = parser.parse_args()
+    
+    # La variable est lue par config.py, donc dans le parent et dans les processus fils
+    base_temporaire()
+    
+    # 1 acheteur, 1 événement, 1 type de billet ; pool fermé avant de lancer les vendeurs
+    preparer_base(1, 1, args.stock)
+    from dao import ConnectionPool
+    ConnectionPool.get_instance().close()
+    id_acheteur, id_type = 1, 1
+    
+    ctx = multiprocessing.get_context("spawn")
+    file_resultats = ctx.Queue()
+    processus = [ctx.Process(target=vendeur, args=(args.mode, id_acheteur, id_type, file_resultats))
+                 for _ in range(args.processus)]
+    
+    debut = time.perf_counter()
+    for p in processus:
+        p.start()
+    resultats = attendre_vendeurs(processus, file_resultats, args.delai)
+    duree = time.perf_counter() - debut
+    if resultats is None:
+        return 1
+    
+    # Vérification : billets vendus + stock restant doit donner le stock de départ
+    from dao import ConnectionPool
+    with ConnectionPool.get_instance().read() as conn:
+        vendus_en_base = conn.execute("SELECT COALESCE(SUM(quantite), 0) FROM ventes").fetchone()[0]
+        restant = conn.execute("SELECT quantite_disponible FROM types_billets WHERE id_type_billet = ?",
+                               (id_type,)).fetchone()[0]
+    ConnectionPool.get_instance().close()
+    
+    nb_ventes = sum(v for v, _ in resultats)
+    survente = vendus_en_base + restant - args.stock
+    
+    print(f"Mode            : {args.mode}")
+    print(f"Processus       : {args.processus}")
+    print(f"Ventes          : {nb_ventes} en {duree:.2f} s ({nb_ventes / duree:.0f} ventes/s)")
+    print(f"Billets vendus  : {vendus_en_base} (stock initial {args.stock}, restant {restant})")
+    print(f"Survente        : {survente} billet(s)")
+    print("OK : aucune survente" if survente == 0 else "ERREUR : survente détectée")
+    return 0 if survente == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+# Petit cache en mémoire pour les lectures fréquentes du service
+# (les événements et les types de billets ne changent presque jamais)
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_TTL
+
+
+class CacheTTL:
+    """
+    Cache LRU : chaque entrée a une durée de vie (TTL) et quand le cache
+    est plein on enlève l'entrée utilisée il y a le plus longtemps
+    Les clés sont des tuples (nom_de_la_méthode, arguments...)
+    """
+    
+    def __init__(self, taille_max=256):
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()  # clé -> (expiration, valeur)
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Augmente à chaque invalidation : une valeur calculée pendant une invalidation
+        # peut être déjà fausse, set() ne la garde pas (voir en_cache)
+        self.generation = 0
+    
+    def get(self, cle):
+        # Retourne (True, valeur) si la clé est en cache et pas expirée, sinon (False, None)
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[0] > time.monotonic():
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return True, entree[1]
+            if entree is not None:
+                del self._entrees[cle]
+            self.misses += 1
+            return False, None
+    
+    def set(self, cle, valeur, ttl, generation=None):
+        # generation : self.generation lu avant de calculer la valeur ; si une invalidation
+        # est passée depuis, la valeur a pu être lue avant l'écriture : on ne la garde pas
+        with self._verrou:
+            if generation is not None and generation != self.generation:
+                return
+            self._entrees[cle] = (time.monotonic() + ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+    
+    def invalider(self, *cles):
+        # Enlève des clés précises, ex: ("lister_types_billets_evenement", 3)
+        with self._verrou:
+            self.generation += 1
+            for cle in cles:
+                if self._entrees.pop(cle, None) is not None:
+                    self.invalidations += 1
+    
+    def invalider_methodes(self, *noms):
+        # Enlève toutes les clés d'une méthode, quels que soient ses arguments
+        with self._verrou:
+            self.generation += 1
+            for cle in [c for c in self._entrees if c[0] in noms]:
+                del self._entrees[cle]
+                self.invalidations += 1
+    
+    def vider(self):
+        with self._verrou:
+            self.generation += 1
+            self._entrees.clear()
+    
+    def stats(self):
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taux_hit": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+                "entrees": len(self._entrees),
+            }
+
+
+def figer(valeur):
+    # Les listes sont gardées en tuples : un appelant ne peut pas modifier la valeur partagée
+    # (les lignes sqlite3.Row ne se modifient pas)
+    return tuple(valeur) if isinstance(valeur, list) else valeur
+
+
+def en_cache(methode):
+    """
+    Décorateur pour les méthodes du service : le résultat est gardé dans
+    self.cache pendant CACHE_TTL[nom de la méthode] secondes
+    Les listes sont retournées en tuples, et les dicts en copie : le résultat
+    gardé en cache ne peut pas être modifié par un appelant
+    """
+    nom = methode.__name__
+    
+    @functools.wraps(methode)
+    def wrapper(self, *args, **kwargs):
+        if self.cache is None:
+            return methode(self, *args, **kwargs)
+        cle = (nom,) + args
+        if kwargs:
+            cle += tuple(sorted(kwargs.items()))
+        trouve, valeur = self.cache.get(cle)
+        if not trouve:
+            # Génération lue avant la requête : une vente enregistrée pendant le calcul
+            # invalide le cache, et cette valeur peut-être déjà fausse n'y entre pas
+            generation = self.cache.generation
+            valeur = figer(methode(self, *args, **kwargs))
+            self.cache.set(cle, valeur, CACHE_TTL[nom], generation)
+        return dict(valeur) if isinstance(valeur, dict) else valeur
+    return wrapper
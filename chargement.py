@@ -0,0 +1,200 @@
+# Chargement en masse : pour remplir une grosse base bien plus vite qu'avec
+# les méthodes create() des DAO (générateur de benchmarks, imports)
+# Pendant le chargement, les index et les triggers de stats sont enlevés :
+# on les recrée à la fin, puis on recalcule les tables stats_* d'un coup
+# Pour aller encore plus vite, utiliser un pool avec le profil PRAGMA "chargement"
+
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from dao import ConnectionPool, StatsDAO, RollupDAO, AcheteurDAO, EvenementDAO, normaliser_email
+
+# Nombre de lignes par executemany / par transaction
+TAILLE_PAQUET = 50_000
+
+# Formats acceptés par importer_ventes()
+FORMATS_VENTES = (".csv", ".jsonl")
+
+SQL_VENTE_DATEE = """INSERT INTO ventes (id_acheteur, id_type_billet, quantite, date_vente, montant_total)
+                     VALUES (?, ?, ?, ?, ?)"""
+SQL_IDS_ACHETEURS = "SELECT id_acheteur FROM acheteurs"
+SQL_PRIX_TYPES = "SELECT id_type_billet, prix FROM types_billets"
+
+SQL_OBJETS_SCHEMA = """
+    SELECT type, name, sql FROM sqlite_master
+    WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+"""
+# Index de recherche plein texte : table -> DAO qui sait le refaire
+# (un "rebuild" est ~7 fois plus rapide que les triggers ligne par ligne)
+RECHERCHES = {"acheteurs": AcheteurDAO, "evenements": EvenementDAO}
+SQL_DERNIER_ROWID = "SELECT COALESCE(MAX(rowid), 0) FROM {}"
+
+
+def par_paquets(lignes, taille=TAILLE_PAQUET):
+    """Découpe un itérable (même un générateur infini) en listes de `taille` lignes"""
+    iterateur = iter(lignes)
+    while True:
+        paquet = list(islice(iterateur, taille))
+        if not paquet:
+            return
+        yield paquet
+
+
+@contextmanager
+def sans_index(pool=None):
+    """
+    Enlève les index (sauf ceux des clés primaires / UNIQUE) et les triggers
+    le temps du bloc, puis les recrée, recalcule les stats, met à jour les cumuls
+    par heure / par jour, refait l'index de recherche des tables qui ont reçu
+    des lignes et lance ANALYZE
+    Les insertions dans le bloc ne mettent donc à jour que les tables elles-mêmes
+    (on ne s'attend qu'à des insertions : une ligne modifiée dans le bloc n'est
+    pas remise à jour dans l'index de recherche)
+    """
+    pool = pool or ConnectionPool.get_instance()
+    with pool.write() as conn:
+        derniers = {t: conn.execute(SQL_DERNIER_ROWID.format(t)).fetchone()[0] for t in RECHERCHES}
+        objets = conn.execute(SQL_OBJETS_SCHEMA).fetchall()
+        for objet in objets:
+            conn.execute(f"DROP {objet['type'].upper()} {objet['name']}")
+    
+    try:
+        yield
+    finally:
+        with pool.write() as conn:
+            # Les index d'abord : le recalcul des stats s'en sert
+            for objet in sorted(objets, key=lambda o: o['type'] != "index"):
+                conn.execute(objet['sql'])
+        StatsDAO(pool).rebuild_stats()
+        RollupDAO(pool).rafraichir()
+        with pool.read() as conn:
+            a_refaire = [t for t in RECHERCHES
+                         if conn.execute(SQL_DERNIER_ROWID.format(t)).fetchone()[0] != derniers[t]]
+        for table in a_refaire:
+            RECHERCHES[table](pool).reconstruire_recherche()
+        with pool.write() as conn:
+            conn.execute("ANALYZE")
+
+
+def inserer_par_paquets(sql, lignes, taille=TAILLE_PAQUET, pool=None, apres_paquet=None):
+    """
+    Insère les lignes (un itérable, lu au fur et à mesure) avec executemany,
+    une transaction par paquet : la mémoire utilisée ne dépend pas du nombre de lignes
+    apres_paquet(total) est appelé après chaque paquet (pour afficher l'avancement)
+    Retourne le nombre de lignes insérées
+    """
+    pool = pool or ConnectionPool.get_instance()
+    total = 0
+    for paquet in par_paquets(lignes, taille):
+        with pool.write() as conn:
+            conn.executemany(sql, paquet)
+        total += len(paquet)
+        if apres_paquet:
+            apres_paquet(total)
+    return total
+
+
+def lire_ventes(chemin):
+    """Lit un fichier de ventes ligne par ligne : un dict par vente (valeurs texte en CSV)"""
+    with open(chemin, encoding="utf-8", newline="") as f:
+        if chemin.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for ligne in f:
+                if ligne.strip():
+                    try:
+                        yield json.loads(ligne)
+                    except ValueError:
+                        yield None  # ligne illisible : comptée comme rejetée
+
+
+def convertir_vente(vente, acheteurs, prix):
+    # Une vente lue dans le fichier -> tuple pour SQL_VENTE_DATEE (None si elle est invalide)
+    id_acheteur, id_type = int(vente["id_acheteur"]), int(vente["id_type_billet"])
+    quantite = int(vente["quantite"])
+    date_vente = str(vente["date_vente"] or "").strip().replace("T", " ")
+    if id_acheteur not in acheteurs or id_type not in prix or quantite <= 0 or not date_vente:
+        return None
+    montant = vente.get("montant_total")
+    montant = float(montant) if montant not in (None, "") else prix[id_type] * quantite
+    return (id_acheteur, id_type, quantite, date_vente, montant)
+
+
+def importer_ventes(chemin, pool=None, taille=TAILLE_PAQUET, apres_paquet=None):
+    """
+    Importe des ventes passées depuis un fichier CSV (avec en-tête) ou JSONL
+    Champs : id_acheteur, id_type_billet, quantite, date_vente et montant_total
+    (facultatif : prix du billet x quantité) ; chaque vente reçoit un nouvel id_vente
+    Le stock des types de billets n'est pas modifié : ces ventes ont déjà eu lieu
+    Les lignes invalides (acheteur ou type inconnu, quantité <= 0, champ manquant)
+    sont ignorées. Retourne (ventes importées, lignes rejetées)
+    """
+    if not chemin.lower().endswith(FORMATS_VENTES):
+        raise ValueError(f"Format non reconnu (attendu : {', '.join(FORMATS_VENTES)}) : {chemin}")
+    pool = pool or ConnectionPool.get_instance()
+    with pool.read() as conn:
+        acheteurs = {r[0] for r in conn.execute(SQL_IDS_ACHETEURS)}
+        prix = {r[0]: r[1] for r in conn.execute(SQL_PRIX_TYPES)}
+    
+    rejetees = 0
+    
+    def lignes():
+        nonlocal rejetees
+        for vente in lire_ventes(chemin):
+            try:
+                ligne = convertir_vente(vente, acheteurs, prix)
+            except (KeyError, TypeError, ValueError):
+                ligne = None
+            if ligne is None:
+                rejetees += 1
+            else:
+                yield ligne
+    
+    with sans_index(pool):
+        importees = inserer_par_paquets(SQL_VENTE_DATEE, lignes(), taille, pool, apres_paquet)
+    return importees, rejetees
+
+
+def convertir_acheteur(acheteur):
+    # Un acheteur (dict) -> tuple pour AcheteurDAO.SQL_IMPORTER (None s'il est invalide)
+    nom, prenom = (acheteur.get("nom") or "").strip(), (acheteur.get("prenom") or "").strip()
+    email = normaliser_email(acheteur.get("email") or "")
+    if not nom or not prenom or "@" not in email:
+        return None
+    return (nom, prenom, email, (acheteur.get("telephone") or "").strip() or None)
+
+
+def importer_acheteurs(acheteurs, pool=None, taille=TAILLE_PAQUET, apres_paquet=None):
+    """
+    Importe des acheteurs (dicts nom, prenom, email, telephone facultatif), lus au fur
+    et à mesure : un itérable de plusieurs millions de fiches ne tient jamais en mémoire
+    Un email déjà connu (sans tenir compte de la casse) met la fiche à jour
+    Les fiches sans nom, prénom ou email valide sont ignorées
+    apres_paquet(total) est appelé après chaque paquet (fiches lues, rejetées comprises)
+    Retourne (insérés, mis à jour, rejetés) ; une fiche identique à celle en base
+    n'est comptée nulle part
+    """
+    inseres = mis_a_jour = rejetes = lus = 0
+    # Trigger de recherche enlevé une fois pour tout l'import, pas à chaque paquet
+    with AcheteurDAO(pool).import_en_cours() as dao:
+        for paquet in par_paquets(acheteurs, taille):
+            lignes = []
+            for acheteur in paquet:
+                try:
+                    ligne = convertir_acheteur(acheteur)
+                except (AttributeError, TypeError):
+                    ligne = None  # pas un dict, ou un champ qui n'est pas du texte
+                if ligne is None:
+                    rejetes += 1
+                else:
+                    lignes.append(ligne)
+            if lignes:
+                i, m = dao.importer_paquet(lignes)
+                inseres += i
+                mis_a_jour += m
+            lus += len(paquet)
+            if apres_paquet:
+                apres_paquet(lus)
+    return inseres, mis_a_jour, rejetes
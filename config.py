@@ -7,7 +7,122 @@ import os
 DOSSIER_PROJET = os.path.dirname(os.path.abspath(__file__))
 
 # Chemin vers la base de données SQLite
-DATABASE_PATH = os.path.join(DOSSIER_PROJET, "billetterie.db")
+# (on peut le changer avec la variable BILLETTERIE_DB, pratique pour les benchmarks)
+DATABASE_PATH = os.environ.get("BILLETTERIE_DB", os.path.join(DOSSIER_PROJET, "billetterie.db"))
 
 # Chemin vers le fichier SQL qui crée les tables
 SCHEMA_PATH = os.path.join(DOSSIER_PROJET, "schema.sql")
+
+# Nombre de requêtes préparées gardées en cache par connexion sqlite3
+# (toutes nos requêtes ont un texte fixe, donc elles restent dans le cache)
+SQLITE_CACHED_STATEMENTS = 256
+
+# Nombre maximum de connexions de lecture ouvertes en même temps (pool de dao.py)
+POOL_TAILLE_LECTEURS = 4
+
+# Profils de PRAGMA appliqués à chaque nouvelle connexion (voir dao.ConnectionPool)
+# On choisit le profil avec PRAGMA_PROFIL (ou la variable BILLETTERIE_PRAGMA)
+PRAGMA_PROFILS = {
+    # Réglages d'origine de SQLite : journal "rollback", les lecteurs attendent pendant un commit
+    "defaut": {},
+    # WAL : les lectures ne sont plus bloquées par les ventes, un seul fsync au checkpoint
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,       # en Kio (négatif) : 64 Mo de cache de pages
+        "mmap_size": 268435456,     # 256 Mo lus via mmap
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,       # en ms : on attend le verrou au lieu d'échouer
+    },
+    # WAL mais avec un fsync à chaque commit (aucune vente perdue si la machine s'arrête)
+    "securite": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Chargement en masse (insert_data.py --rapide) : journal en mémoire et aucun fsync
+    # Une coupure pendant le chargement peut abîmer la base : on relance alors le chargement
+    "chargement": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "temp_store": "MEMORY",
+    },
+    # Exports (export.py) : une lecture de toute la table, on garde peu de pages en mémoire
+    # (pas de mmap : les pages lues resteraient comptées dans la mémoire du processus)
+    # Pas de journal_mode : on ne change pas le mode de la base
+    "export": {
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "busy_timeout": 5000,
+    },
+}
+PRAGMA_PROFIL = os.environ.get("BILLETTERIE_PRAGMA", "performance")
+
+# Toutes les combien de secondes on lance un wal_checkpoint(PASSIVE) (0 = jamais)
+WAL_CHECKPOINT_INTERVALLE = 30
+
+# Cache des lectures du service (voir cache.py)
+CACHE_ACTIF = True
+CACHE_TAILLE_MAX = 256
+# Durée de vie en secondes de chaque méthode mise en cache
+# (de toute façon, chaque écriture invalide les entrées qu'elle touche)
+CACHE_TTL = {
+    "lister_evenements": 300,
+    "lister_evenements_par_categorie": 300,
+    "lister_types_billets_evenement": 60,
+    "lister_acheteurs": 60,
+    "calculer_chiffre_affaires_total": 10,
+    "calculer_ca_par_evenement": 10,
+    "calculer_taux_remplissage": 10,
+    "obtenir_top_billets": 10,
+    "obtenir_top_acheteurs": 10,
+    "obtenir_stats_par_categorie": 10,
+    "calculer_indicateurs_avances": 10,
+}
+
+# File d'écriture (ecriture.py) : les ventes et annulations reçues pendant
+# ECRITURE_DELAI_MS (ou jusqu'à ECRITURE_LOT_MAX commandes) partagent un seul commit
+ECRITURE_DELAI_MS = 2
+ECRITURE_LOT_MAX = 500
+
+# Service asyncio (async_service.py) : nombre maximum de ventes et annulations
+# en attente dans la file d'écriture avant de faire patienter les appelants
+ASYNC_FILE_MAX = 10000
+
+# Registre du stock en mémoire (stock.py) : les demandes pour un type de billet épuisé
+# sont refusées sans lire la base ni passer par la file d'écriture. Utile pendant une
+# grosse ouverture de billetterie ; désactivé par défaut
+STOCK_MEMOIRE_ACTIF = os.environ.get("BILLETTERIE_STOCK_MEMOIRE", "0") == "1"
+# Toutes les combien de secondes le registre relit en base le stock des types épuisés
+# (billets rendus par une annulation d'un autre processus) ; 0 = jamais
+STOCK_MEMOIRE_RECALAGE = 2
+
+# Rapports sur un instantané (instantane.py) : les requêtes de StatsDAO lisent une copie
+# de la base refaite toutes les RAPPORTS_INSTANTANE_INTERVALLE secondes, au lieu de la base
+# où se font les ventes. Désactivé par défaut : la copie prend la taille de la base
+RAPPORTS_INSTANTANE_ACTIF = os.environ.get("BILLETTERIE_RAPPORTS_INSTANTANE", "0") == "1"
+# None = copie en mémoire (1 Gio au plus, limite du VFS memdb de SQLite) ;
+# sinon la copie va dans <chemin>.a et <chemin>.b (grosses bases)
+RAPPORTS_INSTANTANE_CHEMIN = None
+RAPPORTS_INSTANTANE_INTERVALLE = 10
+# Retard maximum des rapports en secondes : au-delà, la copie est refaite avant de répondre
+RAPPORTS_INSTANTANE_AGE_MAX = 30
+# La copie se fait par paquets de pages (4 Kio par page), avec une pause entre deux paquets
+RAPPORTS_INSTANTANE_PAGES = 1000
+RAPPORTS_INSTANTANE_PAUSE_MS = 1
+
+# Instrumentation des DAO (instrumentation.py) : temps, lignes et requêtes de chaque
+# méthode, rapport avec service.get_perf_report() ; désactivée par défaut
+INSTRUMENTATION_ACTIVE = os.environ.get("BILLETTERIE_INSTRUMENTATION", "0") == "1"
+# Nombre de durées gardées par méthode pour calculer p50 / p95 / p99
+INSTRUMENTATION_ECHANTILLONS = 10000
+# Un appel de DAO plus long que ça (en ms) est signalé dans le journal "billetterie.lent"
+# (None = pas de journal des requêtes lentes)
+SEUIL_REQUETE_LENTE_MS = 200
+
+# Derniers indicateurs du tableau de bord, gardés à côté de la base : au démarrage,
+# app.py affiche ces chiffres tout de suite, puis les remplace par les vrais
+INDICATEURS_SAUVEGARDE_CHEMIN = f"{DATABASE_PATH}.indicateurs.json"
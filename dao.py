@@ -1,55 +1,321 @@
 # C'est ici qu'on fait toutes les requêtes SQL vers la base de données
 
+import queue
+import re
 import sqlite3
-from config import DATABASE_PATH, SCHEMA_PATH
+import threading
+import unicodedata
+from contextlib import contextmanager
+from config import (DATABASE_PATH, SCHEMA_PATH, SQLITE_CACHED_STATEMENTS, POOL_TAILLE_LECTEURS,
+                    PRAGMA_PROFILS, PRAGMA_PROFIL, WAL_CHECKPOINT_INTERVALLE)
+
+
+# Toutes les requêtes utilisent des paramètres "?" et un texte SQL fixe
+# (constantes SQL_* dans chaque DAO) : SQLite garde la requête préparée
+# dans son cache et ne refait pas l'analyse à chaque appel
+
+# Taille des paquets pour les requêtes "IN (?, ?, ...)" (limite de paramètres SQLite)
+TAILLE_PAQUET_IN = 500
+MARQUEURS_IN = ", ".join("?" * TAILLE_PAQUET_IN)
+
+
+def par_paquets(valeurs, taille=TAILLE_PAQUET_IN):
+    """
+    Découpe une liste en morceaux de taille fixe
+    Le dernier morceau est complété en répétant sa première valeur,
+    comme ça la requête "IN (...)" a toujours le même texte
+    """
+    valeurs = list(valeurs)
+    for i in range(0, len(valeurs), taille):
+        paquet = valeurs[i:i + taille]
+        yield paquet + [paquet[0]] * (taille - len(paquet))
+
+
+# Recherche plein texte (tables FTS5 recherche_* de schema.sql)
+# Un "mot" pour le tokenizer unicode61 : lettres et chiffres
+RE_MOTS = re.compile(r"[^\W_]+")
+# On classe au plus CANDIDATS_RECHERCHE fiches (les plus récentes qui correspondent) :
+# bm25 sur toutes les fiches d'un début de mot courant ("ma", "06") prend plus de 100 ms
+# sur 1M d'acheteurs, contre moins de 10 ms pour 200 fiches
+CANDIDATS_RECHERCHE = 200
+# Un nombre plus court que ça (début de téléphone) n'est cherché que comme mot entier :
+# "06*" correspond à presque tous les acheteurs
+PREFIXE_CHIFFRES_MIN = 4
+
+
+def normaliser(texte):
+    # Minuscules et sans accents, comme dans l'index FTS5 (presque tout est en ASCII : on évite NFD)
+    texte = texte.lower()
+    if texte.isascii():
+        return texte
+    return "".join(c for c in unicodedata.normalize("NFD", texte) if not unicodedata.combining(c))
+
+
+def mots_recherche(texte):
+    """
+    Mots tapés, normalisés comme dans l'index FTS5
+    Les mots d'une seule lettre sont ignorés : ils correspondent à presque tout
+    """
+    return [mot for mot in RE_MOTS.findall(normaliser(texte)) if len(mot) >= 2]
+
+
+def requete_fts(mots, fini=False):
+    """
+    ["marie", "dup"] -> '"marie" "dup"*' : les mots déjà finis (suivis d'un espace, d'un point...)
+    doivent être des mots de la fiche, le dernier peut n'en être que le début (sauf si fini)
+    Un mot entier se lit directement dans l'index, bien plus vite qu'un début de mot
+    (les mots ne contiennent que des lettres et des chiffres : pas de guillemet à échapper)
+    Un nombre de moins de PREFIXE_CHIFFRES_MIN chiffres est toujours un mot entier
+    """
+    dernier = len(mots) - 1
+    
+    def prefixe(i, mot):
+        return i == dernier and not fini and not (mot.isdigit() and len(mot) < PREFIXE_CHIFFRES_MIN)
+    
+    return " ".join(f'"{mot}"*' if prefixe(i, mot) else f'"{mot}"' for i, mot in enumerate(mots))
+
+
+def requete_recherche(table_fts, table, cle, poids):
+    """
+    Les `limit` fiches les plus pertinentes parmi les CANDIDATS_RECHERCHE plus récentes qui
+    correspondent, classées par FTS5 (bm25, avec un poids par colonne : `poids` dans l'ordre
+    des colonnes de la table FTS5)
+    FTS5 ne calcule le score (rank) que des fiches lues par la sous-requête ; il compte quand
+    même une fois les fiches de chaque mot pour bm25
+    À pertinence égale, la fiche la plus récente d'abord
+    Paramètres : texte de la recherche (requete_fts), nombre de candidats, limit
+    """
+    fonction_rang = f"bm25({', '.join(f'{p:.1f}' for p in poids.values())})"
+    return f"""
+            SELECT t.* FROM (
+                SELECT rowid, rank FROM {table_fts}
+                WHERE {table_fts} MATCH ? AND rank MATCH '{fonction_rang}'
+                ORDER BY rowid DESC LIMIT ?
+            ) r
+            JOIN {table} t ON t.{cle} = r.rowid
+            ORDER BY r.rank, t.{cle} DESC
+            LIMIT ?
+        """
+
+
+def normaliser_email(email):
+    # Un même email s'écrit d'une seule façon en base : " Marie.Dupont@Email.com" -> "marie.dupont@email.com"
+    return email.strip().lower()
+
+
+# Lignes de résultats : sqlite3.Row (ligne['nom'], ligne[0], keys(), dict(ligne) quand il
+# faut vraiment un dict). Les services les retournent sans les convertir en dict
+# (un tuple par ligne avec accès par nom, fait en Python, économisait ~5 % de mémoire
+# mais rendait la liste des ventes 30 % plus lente : voir benchmarks/lignes.py)
 
 
 # Connexion à la base de données 
 
-class DatabaseConnection:
+class ConnectionPool:
     """
-    On utilise un Singleton pour avoir une seule connexion à la base
-    Ca évite d'ouvrir plein de connexions en même temps
+    Pool de connexions à la base (remplace l'ancien Singleton à une seule connexion)
+    - lectures : chaque thread emprunte sa propre connexion le temps de sa lecture,
+      avec au plus `taille` connexions de lecture ouvertes en même temps
+    - écritures : une seule connexion dédiée, protégée par un verrou,
+      car SQLite n'accepte de toute façon qu'un écrivain à la fois
+    Utilisation : `with pool.read() as conn` / `with pool.write() as conn`
+    Chaque connexion reçoit les PRAGMA du profil choisi dans config.py
     """
     _instance = None
+    _verrou_instance = threading.Lock()
+    
+    def __init__(self, chemin=None, taille=POOL_TAILLE_LECTEURS, profil=PRAGMA_PROFIL,
+                 intervalle_checkpoint=WAL_CHECKPOINT_INTERVALLE):
+        # Le chemin est lu à l'ouverture (None = DATABASE_PATH de config.py)
+        self.chemin = chemin
+        self.taille = taille
+        if profil not in PRAGMA_PROFILS:
+            raise ValueError(f"Profil PRAGMA inconnu : {profil}")
+        self.profil = profil
+        self.intervalle_checkpoint = intervalle_checkpoint
+        self._arret_checkpoints = None
+        self._local = threading.local()
+        self._places = threading.BoundedSemaphore(taille)
+        self._lecteurs_libres = queue.LifoQueue()
+        self._verrou_ecriture = threading.RLock()
+        self._ecrivain = None
+        self._profondeur_ecriture = 0
+        # Fonction appelée avec le texte de chaque requête exécutée (voir instrumentation.py)
+        self._trace = None
+    
+    @classmethod
+    def get_instance(cls):
+        # Le pool partagé par toute l'application (créé au premier appel)
+        with cls._verrou_instance:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+    
+    def _connecter(self):
+        # check_same_thread=False : une connexion passe d'un thread à l'autre,
+        # mais jamais deux threads en même temps (c'est le pool qui le garantit)
+        conn = sqlite3.connect(self.chemin or DATABASE_PATH,
+                               cached_statements=SQLITE_CACHED_STATEMENTS,
+                               check_same_thread=False,
+                               isolation_level=None)  # on gère les transactions nous-mêmes
+        # Ca permet d'accéder aux colonnes par leur nom (plus pratique)
+        conn.row_factory = sqlite3.Row
+        # On active les clés étrangères (sinon SQLite les ignore)
+        conn.execute("PRAGMA foreign_keys = ON")
+        # Puis les réglages du profil (valeurs venant de config.py, pas de l'utilisateur)
+        for nom, valeur in PRAGMA_PROFILS[self.profil].items():
+            conn.execute(f"PRAGMA {nom} = {valeur}")
+        conn.set_trace_callback(self._trace)
+        return conn
+    
+    def definir_trace(self, fonction):
+        """
+        Branche fonction(sql) sur toutes les connexions (None pour l'enlever)
+        À appeler au démarrage : une connexion de lecture prêtée à ce moment-là n'est pas tracée
+        """
+        self._trace = fonction
+        with self._verrou_ecriture:
+            if self._ecrivain is not None:
+                self._ecrivain.set_trace_callback(fonction)
+        libres = []
+        while True:
+            try:
+                libres.append(self._lecteurs_libres.get_nowait())
+            except queue.Empty:
+                break
+        for conn in libres:
+            conn.set_trace_callback(fonction)
+            self._lecteurs_libres.put(conn)
+    
+    def _mode_wal(self):
+        return str(PRAGMA_PROFILS[self.profil].get("journal_mode", "")).upper() == "WAL"
+    
+    def checkpoint(self):
+        """
+        Recopie le journal WAL dans la base sans bloquer personne (mode PASSIVE)
+        Retourne (busy, pages dans le WAL, pages recopiées)
+        """
+        with self.read() as conn:
+            return tuple(conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone())
+    
+    def demarrer_checkpoints(self, intervalle=None):
+        """Lance un thread qui fait un checkpoint toutes les `intervalle` secondes"""
+        intervalle = intervalle or self.intervalle_checkpoint
+        if self._arret_checkpoints is not None or not intervalle:
+            return
+        arret = threading.Event()
+        
+        def boucle():
+            # wait() renvoie True quand on demande l'arrêt
+            while not arret.wait(intervalle):
+                try:
+                    self.checkpoint()
+                except sqlite3.Error as e:
+                    print(f"Erreur checkpoint: {e}")
+        
+        self._arret_checkpoints = arret
+        threading.Thread(target=boucle, name="wal-checkpoint", daemon=True).start()
+    
+    def arreter_checkpoints(self):
+        if self._arret_checkpoints is not None:
+            self._arret_checkpoints.set()
+            self._arret_checkpoints = None
     
-    def __new__(cls):
-        # Si on n'a pas encore créé d'instance, on en crée une
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.connection = None
-        return cls._instance
-    
-    def get_connection(self):
-        # On ouvre la connexion si elle n'existe pas encore
-        if self.connection is None:
-            self.connection = sqlite3.connect(DATABASE_PATH)
-            # Ca permet d'accéder aux colonnes par leur nom (plus pratique)
-            self.connection.row_factory = sqlite3.Row
-            # On active les clés étrangères (sinon SQLite les ignore)
-            self.connection.execute("PRAGMA foreign_keys = ON")
-        return self.connection
+    @contextmanager
+    def read(self):
+        """Emprunte une connexion de lecture pour le thread courant"""
+        # Lecture imbriquée, ou lecture pendant une écriture du même thread :
+        # on garde la même connexion (comme ça on voit ses propres écritures)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        
+        self._places.acquire()
+        try:
+            try:
+                conn = self._lecteurs_libres.get_nowait()
+            except queue.Empty:
+                conn = self._connecter()
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+                self._lecteurs_libres.put(conn)
+        finally:
+            self._places.release()
+    
+    @contextmanager
+    def write(self):
+        """
+        Transaction en écriture sur la connexion dédiée (BEGIN IMMEDIATE)
+        On prend le verrou d'écriture tout de suite, donc deux vendeurs
+        ne peuvent pas lire le même stock puis écrire chacun de leur côté
+        Un write() imbriqué devient un SAVEPOINT : en cas d'erreur seule
+        la partie imbriquée est annulée
+        """
+        with self._verrou_ecriture:
+            if self._ecrivain is None:
+                self._ecrivain = self._connecter()
+                # Le WAL ne grossit qu'avec les écritures : on planifie les checkpoints ici
+                if self._mode_wal():
+                    self.demarrer_checkpoints()
+            conn = self._ecrivain
+            
+            self._profondeur_ecriture += 1
+            point = f"ecriture_{self._profondeur_ecriture}"
+            ancienne = getattr(self._local, "conn", None)
+            self._local.conn = conn
+            try:
+                if self._profondeur_ecriture == 1:
+                    conn.execute("BEGIN IMMEDIATE")
+                else:
+                    conn.execute(f"SAVEPOINT {point}")
+                try:
+                    yield conn
+                except BaseException:
+                    if self._profondeur_ecriture == 1:
+                        conn.rollback()
+                    else:
+                        conn.execute(f"ROLLBACK TO {point}")
+                        conn.execute(f"RELEASE {point}")
+                    raise
+                if self._profondeur_ecriture == 1:
+                    conn.commit()
+                else:
+                    conn.execute(f"RELEASE {point}")
+            finally:
+                self._local.conn = ancienne
+                self._profondeur_ecriture -= 1
     
     def close(self):
-        # On ferme proprement la connexion
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+        # On ferme proprement les connexions qui ne sont pas en cours d'utilisation
+        # (le pool se rouvre tout seul si on s'en sert de nouveau)
+        self.arreter_checkpoints()
+        while True:
+            try:
+                self._lecteurs_libres.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._verrou_ecriture:
+            if self._ecrivain is not None:
+                self._ecrivain.close()
+                self._ecrivain = None
 
 
-def init_database():
+def init_database(pool=None):
     """Crée les tables en exécutant le fichier schema.sql"""
-    db = DatabaseConnection()
-    conn = db.get_connection()
+    pool = pool or ConnectionPool.get_instance()
     try:
         # On lit le fichier SQL et on l'exécute
         with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
-            conn.executescript(f.read())
-        conn.commit()
+            script = f.read()
+        with pool.write() as conn:
+            conn.executescript(script)
         return True
     except Exception as e:
         print(f"Erreur: {e}")
-        conn.rollback()
         return False
 
 
@@ -57,151 +323,345 @@ def init_database():
 
 class AcheteurDAO:
     
-    def __init__(self):
-        self.db = DatabaseConnection()
+    SQL_CREATE = "INSERT INTO acheteurs (nom, prenom, email, telephone) VALUES (?, ?, ?, ?)"
+    # Inscription en une requête : pas d'id retourné si l'email est déjà pris
+    # (pas de fenêtre entre la vérification et l'insertion, l'index UNIQUE tranche)
+    SQL_INSCRIRE = """INSERT INTO acheteurs (nom, prenom, email, telephone) VALUES (?, ?, ?, ?)
+                      ON CONFLICT(email) DO NOTHING RETURNING id_acheteur"""
+    # Import : un email connu met à jour la fiche (le téléphone n'est pas effacé s'il manque)
+    # Le WHERE laisse intactes les fiches qui n'ont pas changé : pas d'écriture, pas de
+    # trigger de recherche (réimporter le même fichier ne coûte presque rien)
+    SQL_IMPORTER = """
+        INSERT INTO acheteurs (nom, prenom, email, telephone) VALUES (?, ?, ?, ?)
+        ON CONFLICT(email) DO UPDATE SET
+            nom = excluded.nom,
+            prenom = excluded.prenom,
+            telephone = COALESCE(excluded.telephone, telephone)
+        WHERE nom IS NOT excluded.nom OR prenom IS NOT excluded.prenom
+           OR telephone IS NOT COALESCE(excluded.telephone, telephone)
+    """
+    SQL_DERNIER_ID = "SELECT COALESCE(MAX(id_acheteur), 0) FROM acheteurs"
+    SQL_COMPTER_DEPUIS = "SELECT COUNT(*) FROM acheteurs WHERE id_acheteur > ?"
+    SQL_TRIGGER_RECHERCHE = """SELECT sql FROM sqlite_master
+                               WHERE type = 'trigger' AND name = 'trg_acheteurs_recherche_insert'"""
+    SQL_INDEXER_DEPUIS = """INSERT INTO recherche_acheteurs (rowid, nom, prenom, email, telephone)
+                            SELECT id_acheteur, nom, prenom, email, telephone
+                            FROM acheteurs WHERE id_acheteur > ?"""
+    SQL_GET_BY_ID = "SELECT * FROM acheteurs WHERE id_acheteur = ?"
+    SQL_GET_BY_EMAIL = "SELECT * FROM acheteurs WHERE email = ?"
+    SQL_IDS_EXISTANTS = f"SELECT id_acheteur FROM acheteurs WHERE id_acheteur IN ({MARQUEURS_IN})"
+    SQL_GET_ALL = "SELECT * FROM acheteurs ORDER BY nom, prenom"
+    # Un mot trouvé dans le nom compte plus que dans l'email ou le téléphone
+    # (dans l'ordre des colonnes de recherche_acheteurs)
+    POIDS_RECHERCHE = {"nom": 10, "prenom": 10, "email": 2, "telephone": 1}
+    SQL_RECHERCHE = requete_recherche("recherche_acheteurs", "acheteurs", "id_acheteur", POIDS_RECHERCHE)
+    SQL_RECONSTRUIRE_RECHERCHE = "INSERT INTO recherche_acheteurs (recherche_acheteurs) VALUES ('rebuild')"
+    
+    def __init__(self, pool=None):
+        self.db = pool or ConnectionPool.get_instance()
+        # Pendant un import (voir import_en_cours) : SQL du trigger enlevé, dernier id indexé
+        self._trigger_recherche = None
+        self._indexees = None
     
     def create(self, nom, prenom, email, telephone=None):
         # Ajoute un nouvel acheteur dans la base
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        tel = f"'{telephone}'" if telephone else "NULL"
-        cursor.execute(
-            f"INSERT INTO acheteurs (nom, prenom, email, telephone) VALUES ('{nom}', '{prenom}', '{email}', {tel})"
-        )
-        conn.commit()
-        return cursor.lastrowid  # On retourne l'ID du nouvel acheteur
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_CREATE, (nom, prenom, normaliser_email(email), telephone or None))
+            return cursor.lastrowid  # On retourne l'ID du nouvel acheteur
+    
+    def inscrire(self, nom, prenom, email, telephone=None):
+        # Comme create(), mais retourne None (sans erreur) si l'email est déjà pris
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_INSCRIRE, (nom, prenom, normaliser_email(email), telephone or None))
+            ligne = cursor.fetchone()
+            return ligne[0] if ligne else None
+    
+    def importer_paquet(self, lignes):
+        """
+        Insère ou met à jour (selon l'email) un paquet de (nom, prenom, email, telephone)
+        déjà vérifiés, en une transaction. Retourne (insérés, mis à jour)
+        Les nouvelles fiches sont ajoutées à l'index de recherche en une seule requête
+        après le paquet (le trigger d'insertion, ligne par ligne, est ~3 fois plus lent)
+        Hors de import_en_cours(), le trigger est enlevé et remis dans la même transaction :
+        les autres connexions ne voient jamais la table sans lui
+        """
+        with self.db.write() as conn:
+            isole = self._indexees is None
+            if isole:
+                self._enlever_trigger(conn)
+            avant = conn.execute(self.SQL_DERNIER_ID).fetchone()[0]
+            modifiees = conn.executemany(self.SQL_IMPORTER, lignes).rowcount
+            # AUTOINCREMENT : les nouvelles fiches ont toutes un id plus grand que l'ancien maximum
+            inseres = conn.execute(self.SQL_COMPTER_DEPUIS, (avant,)).fetchone()[0]
+            # Indexées tout de suite : un paquet suivant peut mettre à jour ces fiches,
+            # et le trigger de mise à jour suppose qu'elles sont déjà dans l'index
+            self._indexer(conn)
+            if isole:
+                self._remettre_trigger(conn)
+            return inseres, modifiees - inseres
+    
+    @contextmanager
+    def import_en_cours(self):
+        """
+        Pour un import en plusieurs paquets : le trigger d'insertion de l'index de recherche
+        est enlevé une fois avant le premier paquet et remis après le dernier
+        (chaque DROP / CREATE TRIGGER change le schéma : toutes les connexions doivent
+        repréparer leurs requêtes en cache)
+        Entre deux paquets, une fiche ajoutée par une autre écriture n'est pas indexée
+        tout de suite : elle l'est par le paquet suivant, ou à la fin
+        """
+        with self.db.write() as conn:
+            self._enlever_trigger(conn)
+        try:
+            yield self
+        finally:
+            with self.db.write() as conn:
+                self._remettre_trigger(conn)
+    
+    def _enlever_trigger(self, conn):
+        # Sans trigger (déjà enlevé, par exemple par chargement.sans_index) : rien à indexer ici
+        trigger = conn.execute(self.SQL_TRIGGER_RECHERCHE).fetchone()
+        if trigger:
+            conn.execute("DROP TRIGGER trg_acheteurs_recherche_insert")
+        self._trigger_recherche = trigger[0] if trigger else None
+        self._indexees = conn.execute(self.SQL_DERNIER_ID).fetchone()[0]
+    
+    def _indexer(self, conn):
+        # Ajoute à l'index de recherche les fiches insérées depuis le dernier appel
+        if self._trigger_recherche:
+            conn.execute(self.SQL_INDEXER_DEPUIS, (self._indexees,))
+            self._indexees = conn.execute(self.SQL_DERNIER_ID).fetchone()[0]
+    
+    def _remettre_trigger(self, conn):
+        self._indexer(conn)
+        if self._trigger_recherche:
+            conn.execute(self._trigger_recherche)
+        self._trigger_recherche = self._indexees = None
     
     def get_by_id(self, id_acheteur):
         # Cherche un acheteur par son ID
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM acheteurs WHERE id_acheteur = {id_acheteur}")
-        return cursor.fetchone()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_ID, (id_acheteur,))
+            return cursor.fetchone()
     
     def get_by_email(self, email):
         # Cherche un acheteur par son email (pour vérifier s'il existe déjà)
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM acheteurs WHERE email = '{email}'")
-        return cursor.fetchone()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_EMAIL, (normaliser_email(email),))
+            return cursor.fetchone()
+    
+    def get_ids_existants(self, ids_acheteurs):
+        # Renvoie l'ensemble des IDs qui existent vraiment dans la table
+        with self.db.read() as conn:
+            existants = set()
+            for paquet in par_paquets(set(ids_acheteurs)):
+                existants.update(r[0] for r in conn.execute(self.SQL_IDS_EXISTANTS, paquet))
+            return existants
     
     def get_all(self):
         # Récupère tous les acheteurs, triés par nom
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM acheteurs ORDER BY nom, prenom")
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_ALL)
+            return cursor.fetchall()
+    
+    def rechercher(self, texte, limit=20):
+        # Acheteurs dont le nom, prénom, email ou téléphone commence par les mots tapés
+        mots = mots_recherche(texte)
+        if not mots:
+            return []
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_RECHERCHE, (requete_fts(mots, fini=not texte[-1].isalnum()),
+                                                CANDIDATS_RECHERCHE, limit))
+            return cursor.fetchall()
+    
+    def reconstruire_recherche(self):
+        # Refait l'index de recherche depuis la table (après un import direct en base)
+        with self.db.write() as conn:
+            conn.execute(self.SQL_RECONSTRUIRE_RECHERCHE)
 
 
 # DAO Evenements 
 
 class EvenementDAO:
     
-    def __init__(self):
-        self.db = DatabaseConnection()
+    SQL_CREATE = """INSERT INTO evenements 
+               (nom, description, date_evenement, heure_debut, lieu, capacite_max, categorie)
+               VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    SQL_GET_BY_ID = "SELECT * FROM evenements WHERE id_evenement = ?"
+    SQL_GET_ALL = "SELECT * FROM evenements ORDER BY date_evenement"
+    SQL_GET_BY_CATEGORIE = "SELECT * FROM evenements WHERE categorie = ? ORDER BY date_evenement"
+    # Dans l'ordre des colonnes de recherche_evenements
+    POIDS_RECHERCHE = {"nom": 10, "description": 1, "lieu": 5}
+    SQL_RECHERCHE = requete_recherche("recherche_evenements", "evenements", "id_evenement", POIDS_RECHERCHE)
+    SQL_RECONSTRUIRE_RECHERCHE = "INSERT INTO recherche_evenements (recherche_evenements) VALUES ('rebuild')"
+    
+    def __init__(self, pool=None):
+        self.db = pool or ConnectionPool.get_instance()
     
     def create(self, nom, description, date_evenement, heure_debut, lieu, capacite_max, categorie):
         # Crée un nouvel événement
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"""INSERT INTO evenements 
-               (nom, description, date_evenement, heure_debut, lieu, capacite_max, categorie)
-               VALUES ('{nom}', '{description}', '{date_evenement}', '{heure_debut}', '{lieu}', {capacite_max}, '{categorie}')"""
-        )
-        conn.commit()
-        return cursor.lastrowid
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self.SQL_CREATE,
+                (nom, description, date_evenement, heure_debut, lieu, capacite_max, categorie)
+            )
+            return cursor.lastrowid
     
     def get_by_id(self, id_evenement):
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM evenements WHERE id_evenement = {id_evenement}")
-        return cursor.fetchone()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_ID, (id_evenement,))
+            return cursor.fetchone()
     
     def get_all(self):
         # Liste tous les événements triés par date
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM evenements ORDER BY date_evenement")
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_ALL)
+            return cursor.fetchall()
     
     def get_by_categorie(self, categorie):
         # Filtre les événements par catégorie (concert, spectacle, etc.)
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"SELECT * FROM evenements WHERE categorie = '{categorie}' ORDER BY date_evenement"
-        )
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_CATEGORIE, (categorie,))
+            return cursor.fetchall()
+    
+    def rechercher(self, texte, limit=20):
+        # Événements dont le nom, la description ou le lieu commence par les mots tapés
+        mots = mots_recherche(texte)
+        if not mots:
+            return []
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_RECHERCHE, (requete_fts(mots, fini=not texte[-1].isalnum()),
+                                                CANDIDATS_RECHERCHE, limit))
+            return cursor.fetchall()
+    
+    def reconstruire_recherche(self):
+        with self.db.write() as conn:
+            conn.execute(self.SQL_RECONSTRUIRE_RECHERCHE)
 
 
 # DAO Types de billets 
 
 class TypeBilletDAO:
     
-    def __init__(self):
-        self.db = DatabaseConnection()
+    SQL_CREATE = """INSERT INTO types_billets (id_evenement, nom_type, prix, quantite_disponible)
+               VALUES (?, ?, ?, ?)"""
+    SQL_GET_BY_ID = "SELECT * FROM types_billets WHERE id_type_billet = ?"
+    SQL_GET_BY_EVENEMENT = "SELECT * FROM types_billets WHERE id_evenement = ? ORDER BY prix"
+    SQL_UPDATE_QUANTITE = "UPDATE types_billets SET quantite_disponible = ? WHERE id_type_billet = ?"
+    SQL_GET_STOCKS = f"""SELECT id_type_billet, quantite_disponible, prix FROM types_billets
+                    WHERE id_type_billet IN ({MARQUEURS_IN})"""
+    # Décrément conditionnel : ne passe que s'il reste assez de billets
+    SQL_DECREMENTER = """UPDATE types_billets SET quantite_disponible = quantite_disponible - ?
+               WHERE id_type_billet = ? AND quantite_disponible >= ?"""
+    SQL_INCREMENTER = """UPDATE types_billets SET quantite_disponible = quantite_disponible + ?
+                   WHERE id_type_billet = ?"""
+    SQL_GET_PRIX = "SELECT prix FROM types_billets WHERE id_type_billet = ?"
+    SQL_GET_ALL_STOCKS = "SELECT id_type_billet, quantite_disponible FROM types_billets"
+    
+    def __init__(self, pool=None):
+        self.db = pool or ConnectionPool.get_instance()
     
     def create(self, id_evenement, nom_type, prix, quantite_disponible):
         # Crée un nouveau type de billet pour un événement
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"""INSERT INTO types_billets (id_evenement, nom_type, prix, quantite_disponible)
-               VALUES ({id_evenement}, '{nom_type}', {prix}, {quantite_disponible})"""
-        )
-        conn.commit()
-        return cursor.lastrowid
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_CREATE, (id_evenement, nom_type, prix, quantite_disponible))
+            return cursor.lastrowid
     
     def get_by_id(self, id_type_billet):
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM types_billets WHERE id_type_billet = {id_type_billet}")
-        return cursor.fetchone()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_ID, (id_type_billet,))
+            return cursor.fetchone()
     
     def get_by_evenement(self, id_evenement):
         # Récupère tous les types de billets pour un événement donné
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"SELECT * FROM types_billets WHERE id_evenement = {id_evenement} ORDER BY prix"
-        )
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_EVENEMENT, (id_evenement,))
+            return cursor.fetchall()
     
     def update_quantite(self, id_type_billet, nouvelle_quantite):
         # Met à jour le stock de billets après une vente
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"UPDATE types_billets SET quantite_disponible = {nouvelle_quantite} WHERE id_type_billet = {id_type_billet}"
-        )
-        conn.commit()
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_UPDATE_QUANTITE, (nouvelle_quantite, id_type_billet))
+    
+    def get_all_stocks(self):
+        # Stock de tous les types de billets (chargement du registre du stock, stock.py)
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_ALL_STOCKS)
+            return cursor.fetchall()
+    
+    def get_stocks(self, ids_types):
+        # Stock et prix de plusieurs types de billets d'un coup : {id: (stock, prix)}
+        with self.db.read() as conn:
+            stocks = {}
+            for paquet in par_paquets(set(ids_types)):
+                for r in conn.execute(self.SQL_GET_STOCKS, paquet):
+                    stocks[r['id_type_billet']] = (r['quantite_disponible'], r['prix'])
+            return stocks
+    
+    def decrement_many(self, quantites_par_type):
+        """
+        Retire du stock pour plusieurs types de billets : {id_type_billet: quantite}
+        Appelé dans un pool.write(), ça fait partie de la même transaction
+        Lève une erreur si un des stocks ne suffit plus (la mise à jour est annulée)
+        """
+        with self.db.write() as conn:
+            cursor = conn.executemany(
+                self.SQL_DECREMENTER,
+                [(q, id_type, q) for id_type, q in quantites_par_type.items()]
+            )
+            if cursor.rowcount != len(quantites_par_type):
+                raise sqlite3.IntegrityError("Stock insuffisant pendant la mise à jour groupée")
 
 
 # DAO Ventes 
 
+def requetes_pagination(select, tris):
+    """
+    Prépare les requêtes de pagination "keyset" pour chaque tri possible
+    Retourne {(tri, descendant, sens): sql} avec sens = None (première page),
+    "apres" (page suivante) ou "avant" (page précédente, lue à l'envers)
+    La clé d'une vente est (valeur triée, id_vente), ou juste id_vente
+    """
+    requetes = {}
+    for tri in tris:
+        if tri == "id_vente":
+            cle, marqueurs, ordre = "v.id_vente", "?", "v.id_vente {0}"
+        else:
+            cle, marqueurs, ordre = f"(v.{tri}, v.id_vente)", "(?, ?)", f"v.{tri} {{0}}, v.id_vente {{0}}"
+        for descendant in (True, False):
+            sens, inverse = ("DESC", "ASC") if descendant else ("ASC", "DESC")
+            plus_loin, plus_pres = ("<", ">") if descendant else (">", "<")
+            requetes[(tri, descendant, None)] = (
+                f"{select} ORDER BY {ordre.format(sens)} LIMIT ?")
+            requetes[(tri, descendant, "apres")] = (
+                f"{select} WHERE {cle} {plus_loin} {marqueurs} ORDER BY {ordre.format(sens)} LIMIT ?")
+            requetes[(tri, descendant, "avant")] = (
+                f"{select} WHERE {cle} {plus_pres} {marqueurs} ORDER BY {ordre.format(inverse)} LIMIT ?")
+    return requetes
+
+
 class VenteDAO:
     
-    def __init__(self):
-        self.db = DatabaseConnection()
-    
-    def create(self, id_acheteur, id_type_billet, quantite, montant_total):
-        # Enregistre une nouvelle vente
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"""INSERT INTO ventes (id_acheteur, id_type_billet, quantite, montant_total)
-               VALUES ({id_acheteur}, {id_type_billet}, {quantite}, {montant_total})"""
-        )
-        conn.commit()
-        return cursor.lastrowid
-    
-    def get_all(self):
-        # Récupère toutes les ventes avec les infos liées (jointures)
-        # On fait des JOIN pour avoir le nom de l'acheteur, l'événement, etc.
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+    SQL_CREATE = """INSERT INTO ventes (id_acheteur, id_type_billet, quantite, montant_total)
+               VALUES (?, ?, ?, ?)"""
+    SQL_DERNIER_ID = "SELECT MAX(id_vente) FROM ventes"
+    SQL_GET_ALL = """
             SELECT v.id_vente, v.date_vente, v.quantite, v.montant_total,
                    a.nom || ' ' || a.prenom AS acheteur, a.email,
                    tb.nom_type AS type_billet, tb.prix AS prix_unitaire,
@@ -210,130 +670,528 @@ class VenteDAO:
             JOIN acheteurs a ON v.id_acheteur = a.id_acheteur
             JOIN types_billets tb ON v.id_type_billet = tb.id_type_billet
             JOIN evenements e ON tb.id_evenement = e.id_evenement
-            ORDER BY v.date_vente DESC
-        """)
-        return cursor.fetchall()
-    
-    def get_by_id(self, id_vente):
-        # Récupère une vente par son ID (pour la suppression)
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"""
+            ORDER BY v.date_vente DESC, v.id_vente DESC
+        """
+    # Pagination "keyset" : on repart de la dernière vente affichée (valeur triée, id)
+    # au lieu d'un OFFSET, donc chaque page coûte pareil grâce aux index
+    SQL_COLONNES_LISTE = """
+            SELECT v.id_vente, v.date_vente, v.quantite, v.montant_total,
+                   a.nom || ' ' || a.prenom AS acheteur, a.email,
+                   tb.nom_type AS type_billet, tb.prix AS prix_unitaire,
+                   e.nom AS evenement, e.date_evenement, e.categorie
+            FROM ventes v
+            JOIN acheteurs a ON v.id_acheteur = a.id_acheteur
+            JOIN types_billets tb ON v.id_type_billet = tb.id_type_billet
+            JOIN evenements e ON tb.id_evenement = e.id_evenement
+        """
+    # Colonnes par lesquelles on peut trier (chacune a un index (colonne, id_vente))
+    TRIS = ("date_vente", "montant_total", "id_vente")
+    # Toutes les requêtes de pagination possibles (texte fixe pour chaque cas)
+    SQL_PAGES = requetes_pagination(SQL_COLONNES_LISTE, TRIS)
+    # Export : ventes d'une période [début, fin[ dans l'ordre chronologique (index idx_ventes_date)
+    SQL_PERIODE = SQL_COLONNES_LISTE + """
+            WHERE v.date_vente >= ? AND v.date_vente < ?
+            ORDER BY v.date_vente, v.id_vente
+        """
+    # Bornes utilisées quand on ne filtre pas (les dates sont des textes "AAAA-MM-JJ HH:MM:SS")
+    DATE_MIN, DATE_MAX = "", "9999-12-31 23:59:59"
+    SQL_GET_BY_ID = """
             SELECT v.*, tb.prix 
             FROM ventes v
             JOIN types_billets tb ON v.id_type_billet = tb.id_type_billet
-            WHERE v.id_vente = {id_vente}
-        """)
-        return cursor.fetchone()
+            WHERE v.id_vente = ?
+        """
+    SQL_GET_STOCK_VENTE = "SELECT id_type_billet, quantite FROM ventes WHERE id_vente = ?"
+    SQL_DELETE = "DELETE FROM ventes WHERE id_vente = ?"
+    # create_many d'au moins VENTES_STATS_PAQUET_MIN ventes : le trigger trg_ventes_insert_stats
+    # est enlevé pendant l'insertion, et les stats_* reçoivent les totaux du paquet
+    # (mêmes requêtes que le trigger, une fois par type de billet / par acheteur)
+    VENTES_STATS_PAQUET_MIN = 1000
+    SQL_TRIGGER_STATS = """SELECT sql FROM sqlite_master
+                           WHERE type = 'trigger' AND name = 'trg_ventes_insert_stats'"""
+    # Paramètres : (nombre_ventes, billets, montant, id_type_billet), une ligne par type
+    SQL_STATS_PAR_TYPE = [
+        """INSERT INTO stats_types_billets (id_type_billet, id_evenement, nombre_ventes, total_vendu, ca_type)
+           SELECT tb.id_type_billet, tb.id_evenement, ?, ?, ?
+           FROM types_billets tb WHERE tb.id_type_billet = ?
+           ON CONFLICT(id_type_billet) DO UPDATE SET
+               nombre_ventes = nombre_ventes + excluded.nombre_ventes,
+               total_vendu = total_vendu + excluded.total_vendu,
+               ca_type = ca_type + excluded.ca_type""",
+        """INSERT INTO stats_evenements (id_evenement, nombre_ventes, billets_vendus, chiffre_affaires)
+           SELECT tb.id_evenement, ?, ?, ?
+           FROM types_billets tb WHERE tb.id_type_billet = ?
+           ON CONFLICT(id_evenement) DO UPDATE SET
+               nombre_ventes = nombre_ventes + excluded.nombre_ventes,
+               billets_vendus = billets_vendus + excluded.billets_vendus,
+               chiffre_affaires = chiffre_affaires + excluded.chiffre_affaires""",
+        """INSERT INTO stats_categories (categorie, nombre_ventes, billets_vendus, chiffre_affaires)
+           SELECT e.categorie, ?, ?, ?
+           FROM types_billets tb JOIN evenements e ON tb.id_evenement = e.id_evenement
+           WHERE tb.id_type_billet = ?
+           ON CONFLICT(categorie) DO UPDATE SET
+               nombre_ventes = nombre_ventes + excluded.nombre_ventes,
+               billets_vendus = billets_vendus + excluded.billets_vendus,
+               chiffre_affaires = chiffre_affaires + excluded.chiffre_affaires""",
+    ]
+    # Paramètres : (id_acheteur, nombre_ventes, billets, montant)
+    SQL_STATS_PAR_ACHETEUR = """
+        INSERT INTO stats_acheteurs (id_acheteur, nombre_achats, total_billets, total_depense)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(id_acheteur) DO UPDATE SET
+            nombre_achats = nombre_achats + excluded.nombre_achats,
+            total_billets = total_billets + excluded.total_billets,
+            total_depense = total_depense + excluded.total_depense
+    """
+    
+    def __init__(self, pool=None):
+        self.db = pool or ConnectionPool.get_instance()
+    
+    def create(self, id_acheteur, id_type_billet, quantite, montant_total):
+        # Enregistre une nouvelle vente
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_CREATE, (id_acheteur, id_type_billet, quantite, montant_total))
+            return cursor.lastrowid
+    
+    def create_avec_reservation(self, id_acheteur, id_type_billet, quantite):
+        """
+        Enregistre une vente en réservant le stock dans la même transaction
+        Le UPDATE ne passe que s'il reste assez de billets, donc pas de survente
+        même avec plusieurs vendeurs en même temps (et un seul commit)
+        Retourne (id_vente, montant_total) ou None si le stock ne suffit pas
+        """
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(TypeBilletDAO.SQL_DECREMENTER, (quantite, id_type_billet, quantite))
+            if cursor.rowcount == 0:
+                return None
+            
+            cursor.execute(TypeBilletDAO.SQL_GET_PRIX, (id_type_billet,))
+            montant_total = cursor.fetchone()['prix'] * quantite
+            cursor.execute(self.SQL_CREATE, (id_acheteur, id_type_billet, quantite, montant_total))
+            return cursor.lastrowid, montant_total
+    
+    def create_many(self, ventes):
+        """
+        Insère plusieurs ventes avec executemany : [(id_acheteur, id_type_billet, quantite, montant_total)]
+        Appelé dans un pool.write(), ça fait partie de la même transaction
+        Retourne la liste des IDs créés (dans l'ordre des ventes)
+        Un gros paquet ajoute ses totaux aux stats_* en une fois, sans le trigger ligne par
+        ligne (qui divisait le débit par 2,5) : il est enlevé et remis dans la même transaction,
+        les autres connexions ne voient jamais la table sans lui
+        """
+        if not ventes:
+            return []
+        with self.db.write() as conn:
+            trigger = None
+            if len(ventes) >= self.VENTES_STATS_PAQUET_MIN:
+                trigger = conn.execute(self.SQL_TRIGGER_STATS).fetchone()
+                if trigger:
+                    conn.execute("DROP TRIGGER trg_ventes_insert_stats")
+            conn.executemany(self.SQL_CREATE, ventes)
+            if trigger:
+                self._ajouter_stats(conn, ventes)
+                conn.execute(trigger[0])
+            # On a le verrou d'écriture et la clé est AUTOINCREMENT :
+            # les IDs sont donc consécutifs et le dernier est le plus grand
+            dernier_id = conn.execute(self.SQL_DERNIER_ID).fetchone()[0]
+            return list(range(dernier_id - len(ventes) + 1, dernier_id + 1))
+    
+    def _ajouter_stats(self, conn, ventes):
+        # Totaux du paquet par type de billet et par acheteur, ajoutés aux stats_*
+        # cle -> [nombre_ventes, billets, montant]
+        par_type, par_acheteur = {}, {}
+        for id_acheteur, id_type, quantite, montant in ventes:
+            for totaux, cle in ((par_type, id_type), (par_acheteur, id_acheteur)):
+                t = totaux.get(cle)
+                if t is None:
+                    totaux[cle] = [1, quantite, montant]
+                else:
+                    t[0] += 1
+                    t[1] += quantite
+                    t[2] += montant
+        lignes_types = [(*t, id_type) for id_type, t in par_type.items()]
+        for sql in self.SQL_STATS_PAR_TYPE:
+            conn.executemany(sql, lignes_types)
+        conn.executemany(self.SQL_STATS_PAR_ACHETEUR, [(cle, *t) for cle, t in par_acheteur.items()])
+    
+    def get_all(self):
+        # Récupère toutes les ventes avec les infos liées (jointures)
+        # On fait des JOIN pour avoir le nom de l'acheteur, l'événement, etc.
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_ALL)
+            return cursor.fetchall()
+    
+    def iter_page(self, after=None, limit=50, tri="date_vente", descendant=True, before=None):
+        """
+        Une page de ventes, triée par `tri` (date_vente par défaut, plus récentes d'abord)
+        after  : clé (valeur triée, id_vente) de la dernière vente de la page précédente
+        before : clé de la première vente de la page suivante, pour revenir en arrière
+        Sans after ni before : première page
+        """
+        if tri not in self.TRIS:
+            raise ValueError(f"Tri impossible sur {tri}")
+        sens, cle = ("apres", after) if after is not None else ("avant", before)
+        if cle is None:
+            sens, parametres = None, (limit,)
+        elif tri == "id_vente":
+            parametres = (cle[1], limit)
+        else:
+            parametres = (cle[0], cle[1], limit)
+        
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_PAGES[(tri, descendant, sens)], parametres)
+            lignes = cursor.fetchall()
+        # La page "avant" est lue à l'envers, on la remet dans l'ordre d'affichage
+        return lignes[::-1] if sens == "avant" else lignes
+    
+    def iter_all(self, taille_lot=1000):
+        # Parcourt toutes les ventes par paquets (fetchmany) sans tout charger en mémoire
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_ALL)
+            while True:
+                lignes = cursor.fetchmany(taille_lot)
+                if not lignes:
+                    break
+                yield from lignes
+    
+    def iter_periode(self, debut=None, fin=None, taille_lot=5000):
+        """
+        Parcourt les ventes de debut (inclus) à fin (exclue), des plus anciennes aux plus
+        récentes, par paquets (fetchmany) : la mémoire ne dépend pas du nombre de ventes
+        debut / fin : "AAAA-MM-JJ" ou "AAAA-MM-JJ HH:MM:SS", None = pas de limite
+        """
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_PERIODE, (debut or self.DATE_MIN, fin or self.DATE_MAX))
+            while True:
+                lignes = cursor.fetchmany(taille_lot)
+                if not lignes:
+                    break
+                yield from lignes
+    
+    def get_by_id(self, id_vente):
+        # Récupère une vente par son ID (pour la suppression)
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_BY_ID, (id_vente,))
+            return cursor.fetchone()
     
     def delete(self, id_vente):
         # Supprime une vente de la base
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"DELETE FROM ventes WHERE id_vente = {id_vente}")
-        conn.commit()
-        return cursor.rowcount > 0  # True si ça a supprimé quelque chose
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_DELETE, (id_vente,))
+            return cursor.rowcount > 0  # True si ça a supprimé quelque chose
+    
+    def delete_avec_restitution(self, id_vente):
+        """
+        Supprime une vente et remet ses billets en stock, en une seule transaction
+        Retourne la vente supprimée (id_type_billet, quantite) ou None si elle n'existe pas
+        """
+        with self.db.write() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_GET_STOCK_VENTE, (id_vente,))
+            vente = cursor.fetchone()
+            if vente is None:
+                return None
+            
+            cursor.execute(TypeBilletDAO.SQL_INCREMENTER, (vente['quantite'], vente['id_type_billet']))
+            cursor.execute(self.SQL_DELETE, (id_vente,))
+            return vente
 
 
 # DAO Stats 
 
 class StatsDAO:
+    """
+    Les stats sont lues dans les tables stats_* (une ligne par événement,
+    type de billet, catégorie ou acheteur) tenues à jour par les triggers
+    de schema.sql : le coût ne dépend plus du nombre de ventes
+    """
     
-    def __init__(self):
-        self.db = DatabaseConnection()
+    SQL_CA_TOTAL = "SELECT COALESCE(SUM(chiffre_affaires), 0) as ca FROM stats_evenements"
+    SQL_QUANTITE_TOTALE = "SELECT COALESCE(SUM(billets_vendus), 0) as total FROM stats_evenements"
+    SQL_NOMBRE_VENTES = "SELECT COALESCE(SUM(nombre_ventes), 0) as total FROM stats_evenements"
+    SQL_CA_PAR_EVENEMENT = """
+            SELECT e.id_evenement, e.nom AS evenement, e.date_evenement, e.categorie,
+                   COALESCE(s.chiffre_affaires, 0) AS chiffre_affaires,
+                   COALESCE(s.billets_vendus, 0) AS billets_vendus
+            FROM evenements e
+            LEFT JOIN stats_evenements s ON e.id_evenement = s.id_evenement
+            ORDER BY chiffre_affaires DESC
+        """
+    SQL_TAUX_REMPLISSAGE = """
+            SELECT e.nom AS evenement, e.capacite_max,
+                   COALESCE(s.billets_vendus, 0) AS billets_vendus,
+                   ROUND(COALESCE(s.billets_vendus, 0) * 100.0 / e.capacite_max, 2) AS taux_remplissage
+            FROM evenements e
+            LEFT JOIN stats_evenements s ON e.id_evenement = s.id_evenement
+            ORDER BY taux_remplissage DESC
+        """
+    SQL_TOP_BILLETS = """
+            SELECT tb.nom_type, e.nom AS evenement,
+                   s.total_vendu,
+                   s.ca_type
+            FROM stats_types_billets s
+            JOIN types_billets tb ON s.id_type_billet = tb.id_type_billet
+            JOIN evenements e ON tb.id_evenement = e.id_evenement
+            WHERE s.nombre_ventes > 0
+            ORDER BY s.total_vendu DESC
+        """
+    SQL_TOP_ACHETEURS = """
+            SELECT a.nom || ' ' || a.prenom AS acheteur,
+                   s.nombre_achats,
+                   s.total_billets,
+                   s.total_depense
+            FROM stats_acheteurs s
+            JOIN acheteurs a ON s.id_acheteur = a.id_acheteur
+            WHERE s.nombre_achats > 0
+            ORDER BY s.total_depense DESC
+            LIMIT ?
+        """
+    SQL_VENTES_PAR_CATEGORIE = """
+            SELECT c.categorie,
+                   c.nombre_evenements,
+                   COALESCE(s.billets_vendus, 0) AS billets_vendus,
+                   COALESCE(s.chiffre_affaires, 0) AS chiffre_affaires
+            FROM (SELECT categorie, COUNT(*) AS nombre_evenements
+                  FROM evenements GROUP BY categorie) c
+            LEFT JOIN stats_categories s ON c.categorie = s.categorie
+            ORDER BY chiffre_affaires DESC
+        """
+    # Tous les indicateurs du tableau de bord en une seule lecture
+    # (avec MAX(), SQLite renvoie le nom de l'événement de la ligne du maximum)
+    SQL_INDICATEURS = """
+            SELECT COUNT(*) AS nombre_evenements,
+                   COALESCE(SUM(s.chiffre_affaires), 0) AS chiffre_affaires_total,
+                   COALESCE(SUM(s.billets_vendus), 0) AS quantite_totale,
+                   COALESCE(AVG(COALESCE(s.chiffre_affaires, 0)), 0) AS ca_moyen_par_evenement,
+                   COALESCE(AVG(ROUND(COALESCE(s.billets_vendus, 0) * 100.0 / e.capacite_max, 2)), 0)
+                       AS taux_remplissage_moyen,
+                   MAX(COALESCE(s.chiffre_affaires, 0)) AS ca_top,
+                   e.nom AS evenement_top
+            FROM evenements e
+            LEFT JOIN stats_evenements s ON e.id_evenement = s.id_evenement
+        """
+    # Reconstruction complète depuis la table ventes (réparation)
+    SQL_REBUILD = [
+        "DELETE FROM stats_types_billets",
+        "DELETE FROM stats_evenements",
+        "DELETE FROM stats_categories",
+        "DELETE FROM stats_acheteurs",
+        """INSERT INTO stats_types_billets (id_type_billet, id_evenement, nombre_ventes, total_vendu, ca_type)
+           SELECT v.id_type_billet, tb.id_evenement, COUNT(*), SUM(v.quantite), SUM(v.montant_total)
+           FROM ventes v JOIN types_billets tb ON v.id_type_billet = tb.id_type_billet
+           GROUP BY v.id_type_billet""",
+        """INSERT INTO stats_evenements (id_evenement, nombre_ventes, billets_vendus, chiffre_affaires)
+           SELECT id_evenement, SUM(nombre_ventes), SUM(total_vendu), SUM(ca_type)
+           FROM stats_types_billets GROUP BY id_evenement""",
+        """INSERT INTO stats_categories (categorie, nombre_ventes, billets_vendus, chiffre_affaires)
+           SELECT e.categorie, SUM(s.nombre_ventes), SUM(s.billets_vendus), SUM(s.chiffre_affaires)
+           FROM stats_evenements s JOIN evenements e ON s.id_evenement = e.id_evenement
+           GROUP BY e.categorie""",
+        """INSERT INTO stats_acheteurs (id_acheteur, nombre_achats, total_billets, total_depense)
+           SELECT id_acheteur, COUNT(*), SUM(quantite), SUM(montant_total)
+           FROM ventes GROUP BY id_acheteur""",
+    ]
+    
+    def __init__(self, pool=None):
+        self.db = pool or ConnectionPool.get_instance()
     
     def get_chiffre_affaires_total(self):
         # Calcule le CA total avec SUM()
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COALESCE(SUM(montant_total), 0) as ca FROM ventes")
-        return cursor.fetchone()['ca']
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_CA_TOTAL)
+            return cursor.fetchone()['ca']
     
     def get_quantite_totale_vendue(self):
         # Compte le nombre total de billets vendus
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COALESCE(SUM(quantite), 0) as total FROM ventes")
-        return cursor.fetchone()['total']
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_QUANTITE_TOTALE)
+            return cursor.fetchone()['total']
+    
+    def get_nombre_ventes(self):
+        # Nombre de ventes enregistrées
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_NOMBRE_VENTES)
+            return cursor.fetchone()['total']
     
     def get_chiffre_affaires_par_evenement(self):
         # CA par événement - on utilise GROUP BY pour regrouper
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT e.id_evenement, e.nom AS evenement, e.date_evenement, e.categorie,
-                   COALESCE(SUM(v.montant_total), 0) AS chiffre_affaires,
-                   COALESCE(SUM(v.quantite), 0) AS billets_vendus
-            FROM evenements e
-            LEFT JOIN types_billets tb ON e.id_evenement = tb.id_evenement
-            LEFT JOIN ventes v ON tb.id_type_billet = v.id_type_billet
-            GROUP BY e.id_evenement
-            ORDER BY chiffre_affaires DESC
-        """)
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_CA_PAR_EVENEMENT)
+            return cursor.fetchall()
     
     def get_taux_remplissage_par_evenement(self):
         # Calcule le % de places vendues pour chaque événement
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT e.nom AS evenement, e.capacite_max,
-                   COALESCE(SUM(v.quantite), 0) AS billets_vendus,
-                   ROUND(COALESCE(SUM(v.quantite), 0) * 100.0 / e.capacite_max, 2) AS taux_remplissage
-            FROM evenements e
-            LEFT JOIN types_billets tb ON e.id_evenement = tb.id_evenement
-            LEFT JOIN ventes v ON tb.id_type_billet = v.id_type_billet
-            GROUP BY e.id_evenement
-            ORDER BY taux_remplissage DESC
-        """)
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_TAUX_REMPLISSAGE)
+            return cursor.fetchall()
     
     def get_top_billets(self):
         # Classement des types de billets les plus vendus
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT tb.nom_type, e.nom AS evenement,
-                   SUM(v.quantite) AS total_vendu,
-                   SUM(v.montant_total) AS ca_type
-            FROM types_billets tb
-            JOIN ventes v ON tb.id_type_billet = v.id_type_billet
-            JOIN evenements e ON tb.id_evenement = e.id_evenement
-            GROUP BY tb.id_type_billet
-            ORDER BY total_vendu DESC
-        """)
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_TOP_BILLETS)
+            return cursor.fetchall()
     
     def get_top_acheteurs(self, limit=5):
         # Top des meilleurs clients
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            SELECT a.nom || ' ' || a.prenom AS acheteur,
-                   COUNT(v.id_vente) AS nombre_achats,
-                   SUM(v.quantite) AS total_billets,
-                   SUM(v.montant_total) AS total_depense
-            FROM acheteurs a
-            JOIN ventes v ON a.id_acheteur = v.id_acheteur
-            GROUP BY a.id_acheteur
-            ORDER BY total_depense DESC
-            LIMIT {limit}
-        """)
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_TOP_ACHETEURS, (limit,))
+            return cursor.fetchall()
     
     def get_ventes_par_categorie(self):
         # Stats par catégorie (concert, spectacle, conférence)
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT e.categorie,
-                   COUNT(DISTINCT e.id_evenement) AS nombre_evenements,
-                   COALESCE(SUM(v.quantite), 0) AS billets_vendus,
-                   COALESCE(SUM(v.montant_total), 0) AS chiffre_affaires
-            FROM evenements e
-            LEFT JOIN types_billets tb ON e.id_evenement = tb.id_evenement
-            LEFT JOIN ventes v ON tb.id_type_billet = v.id_type_billet
-            GROUP BY e.categorie
-            ORDER BY chiffre_affaires DESC
-        """)
-        return cursor.fetchall()
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_VENTES_PAR_CATEGORIE)
+            return cursor.fetchall()
+    
+    def get_indicateurs(self):
+        # Une ligne avec CA, quantité, moyennes et événement top
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_INDICATEURS)
+            return cursor.fetchone()
+    
+    def rebuild_stats(self):
+        """
+        Recalcule toutes les tables stats_* à partir de la table ventes
+        A lancer si on pense qu'elles ne sont plus à jour (import direct en base, etc.)
+        """
+        with self.db.write() as conn:
+            for sql in self.SQL_REBUILD:
+                conn.execute(sql)
+
+
+# --- DAO Cumuls par heure / par jour ---
+
+def requetes_rollup(table, periode, expression):
+    """
+    Requêtes d'une table de cumuls (ventes_par_heure ou ventes_par_jour)
+    periode : nom de la colonne ; expression : comment la calculer depuis v.date_vente
+    """
+    return {
+        # Ajoute les ventes d'un intervalle d'id (dernier repère, nouveau repère]
+        "rafraichir": f"""
+            INSERT INTO {table} (id_evenement, {periode}, id_type_billet,
+                                 nombre_ventes, billets_vendus, chiffre_affaires)
+            SELECT tb.id_evenement, {expression}, v.id_type_billet,
+                   COUNT(*), SUM(v.quantite), SUM(v.montant_total)
+            FROM ventes v
+            JOIN types_billets tb ON v.id_type_billet = tb.id_type_billet
+            WHERE v.id_vente > ? AND v.id_vente <= ?
+            GROUP BY 1, 2, 3
+            ON CONFLICT(id_evenement, {periode}, id_type_billet) DO UPDATE SET
+                nombre_ventes = nombre_ventes + excluded.nombre_ventes,
+                billets_vendus = billets_vendus + excluded.billets_vendus,
+                chiffre_affaires = chiffre_affaires + excluded.chiffre_affaires
+        """,
+        # Total de chaque période sur [début, fin[ pour un événement
+        "evenement": f"""
+            SELECT {periode}, SUM(nombre_ventes) AS nombre_ventes,
+                   SUM(billets_vendus) AS billets_vendus, SUM(chiffre_affaires) AS chiffre_affaires
+            FROM {table}
+            WHERE id_evenement = ? AND {periode} >= ? AND {periode} < ?
+            GROUP BY {periode}
+            HAVING SUM(nombre_ventes) > 0
+            ORDER BY {periode}
+        """,
+        # Même chose, détaillé par type de billet
+        "par_type": f"""
+            SELECT r.{periode}, r.id_type_billet, tb.nom_type, r.nombre_ventes,
+                   r.billets_vendus, r.chiffre_affaires
+            FROM {table} r
+            JOIN types_billets tb ON r.id_type_billet = tb.id_type_billet
+            WHERE r.id_evenement = ? AND r.{periode} >= ? AND r.{periode} < ? AND r.nombre_ventes > 0
+            ORDER BY r.{periode}, r.id_type_billet
+        """,
+    }
+
+
+class RollupDAO:
+    """
+    Tables ventes_par_heure et ventes_par_jour (voir schema.sql)
+    rafraichir() n'ajoute que les ventes arrivées depuis la dernière fois, repérées par
+    leur id (AUTOINCREMENT : les nouvelles ventes ont toujours un id plus grand)
+    Les annulations de ventes déjà comptées sont retirées par un trigger
+    """
+    
+    # Une date illisible donne la période '' (même expression dans le trigger de schema.sql)
+    _HEURE = requetes_rollup("ventes_par_heure", "heure",
+                             "COALESCE(strftime('%Y-%m-%d %H:00:00', v.date_vente), '')")
+    _JOUR = requetes_rollup("ventes_par_jour", "jour", "COALESCE(date(v.date_vente), '')")
+    SQL_RAFRAICHIR_HEURE = _HEURE["rafraichir"]
+    SQL_RAFRAICHIR_JOUR = _JOUR["rafraichir"]
+    SQL_PAR_HEURE = _HEURE["evenement"]
+    SQL_PAR_HEURE_TYPE = _HEURE["par_type"]
+    SQL_PAR_JOUR = _JOUR["evenement"]
+    SQL_PAR_JOUR_TYPE = _JOUR["par_type"]
+    SQL_REPERE = "SELECT dernier_id_vente FROM rollups_etat WHERE id = 1"
+    SQL_DERNIER_ID = VenteDAO.SQL_DERNIER_ID
+    SQL_AVANCER_REPERE = "UPDATE rollups_etat SET dernier_id_vente = ? WHERE id = 1"
+    SQL_VIDER = ["DELETE FROM ventes_par_heure", "DELETE FROM ventes_par_jour",
+                 "UPDATE rollups_etat SET dernier_id_vente = 0 WHERE id = 1"]
+    
+    # Au plus autant de ventes par transaction (le premier calcul sur une grosse base
+    # ne bloque donc pas les ventes d'un coup pendant longtemps)
+    TAILLE_LOT = 500_000
+    
+    def __init__(self, pool=None):
+        self.db = pool or ConnectionPool.get_instance()
+    
+    def _en_retard(self):
+        # Lecture seule : dans le cas courant (rien de neuf), on ne prend pas le verrou d'écriture
+        with self.db.read() as conn:
+            repere = conn.execute(self.SQL_REPERE).fetchone()[0]
+            dernier = conn.execute(self.SQL_DERNIER_ID).fetchone()[0] or 0
+            return dernier > repere
+    
+    def rafraichir(self, taille_lot=TAILLE_LOT):
+        """Ajoute aux cumuls les ventes plus récentes que le repère, retourne leur nombre d'ids"""
+        total = 0
+        while self._en_retard():
+            with self.db.write() as conn:
+                repere = conn.execute(self.SQL_REPERE).fetchone()[0]
+                dernier = conn.execute(self.SQL_DERNIER_ID).fetchone()[0] or 0
+                jusqua = min(dernier, repere + taille_lot)
+                conn.execute(self.SQL_RAFRAICHIR_HEURE, (repere, jusqua))
+                conn.execute(self.SQL_RAFRAICHIR_JOUR, (repere, jusqua))
+                conn.execute(self.SQL_AVANCER_REPERE, (jusqua,))
+            total += jusqua - repere
+        return total
+    
+    def reconstruire(self):
+        # Vide les cumuls et les recalcule depuis toute la table ventes (réparation)
+        with self.db.write() as conn:
+            for sql in self.SQL_VIDER:
+                conn.execute(sql)
+        return self.rafraichir()
+    
+    def get_par_heure(self, id_evenement, debut=None, fin=None, par_type=False):
+        # Ventes heure par heure sur [debut, fin[ ("AAAA-MM-JJ" ou "AAAA-MM-JJ HH:MM:SS")
+        sql = self.SQL_PAR_HEURE_TYPE if par_type else self.SQL_PAR_HEURE
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (id_evenement, debut or VenteDAO.DATE_MIN, fin or VenteDAO.DATE_MAX))
+            return cursor.fetchall()
+    
+    def get_par_jour(self, id_evenement, debut=None, fin=None, par_type=False):
+        # Ventes jour par jour sur [debut, fin[
+        sql = self.SQL_PAR_JOUR_TYPE if par_type else self.SQL_PAR_JOUR
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (id_evenement, debut or VenteDAO.DATE_MIN, fin or VenteDAO.DATE_MAX))
+            return cursor.fetchall()
@@ -0,0 +1,156 @@
+# File d'écriture avec "commit groupé" pour les ventes et les annulations
+# Sans elle, chaque vente paie son propre commit (et donc un fsync) ; ici les
+# commandes qui arrivent en même temps partagent une seule transaction
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from config import ECRITURE_DELAI_MS, ECRITURE_LOT_MAX
+
+
+class FileEcriture:
+    """
+    Un thread écrivain reçoit les ventes et annulations de tous les producteurs
+    (threads, boucle asyncio...) et les enregistre par paquets :
+    - un paquet part quand il a ECRITURE_LOT_MAX commandes ou ECRITURE_DELAI_MS
+      après sa première commande
+    - les commandes sont appliquées dans l'ordre d'arrivée : les ventes qui se
+      suivent passent ensemble par _vendre_lot (stock vérifié en mémoire, dans
+      l'ordre, puis executemany), chaque annulation a son SAVEPOINT (write() imbriqué)
+      si une commande échoue, les autres passent quand même
+    - un seul commit par paquet, puis chaque appelant reçoit son résultat
+      dans un Future (même dict que effectuer_vente / annuler_vente)
+    - une commande mal formée est refusée avant d'entrer dans la file (elle ferait
+      échouer tout son paquet), une commande dont l'appelant a annulé le Future
+      (asyncio.wait_for, tâche annulée...) est sautée
+    """
+    
+    def __init__(self, service, delai_ms=ECRITURE_DELAI_MS, taille_lot=ECRITURE_LOT_MAX):
+        self.service = service
+        self.delai = delai_ms / 1000
+        self.taille_lot = taille_lot
+        self._file = queue.Queue()
+        self._thread = None
+        self._verrou = threading.Lock()
+    
+    @staticmethod
+    def _termine(resultat):
+        # Future déjà terminé (commande refusée sans passer par la file)
+        futur = Future()
+        futur.set_result(resultat)
+        return futur
+    
+    @staticmethod
+    def _repondre(futur, resultat):
+        # L'appelant ne peut plus annuler un Future en cours (voir _prendre),
+        # mais un Future déjà terminé ne doit pas arrêter le thread écrivain
+        try:
+            futur.set_result(resultat)
+        except InvalidStateError:
+            pass
+    
+    def vendre(self, id_acheteur, id_type_billet, quantite):
+        refus = self.service._verifier_commande(
+            {"id_acheteur": id_acheteur, "id_type_billet": id_type_billet, "quantite": quantite})
+        if refus is not None:
+            return self._termine(refus)
+        # Type épuisé d'après le registre du stock : refus tout de suite, sans passer par la file
+        refus = self.service._reserver(id_type_billet, quantite)
+        if refus is not None:
+            return self._termine(refus)
+        return self._soumettre("vente", id_acheteur, id_type_billet, quantite)
+    
+    def annuler(self, id_vente):
+        return self._soumettre("annulation", id_vente)
+    
+    def _soumettre(self, nature, *args):
+        with self._verrou:
+            # Le thread écrivain démarre avec la première commande
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name="file-ecriture", daemon=True)
+                self._thread.start()
+        futur = Future()
+        self._file.put((nature, args, futur))
+        return futur
+    
+    def _prendre(self, commande, lot):
+        # Ajoute la commande au paquet, sauf si son Future a été annulé par l'appelant
+        # (une vente annulée rend alors les billets réservés dans le registre)
+        nature, args, futur = commande
+        if futur.set_running_or_notify_cancel():
+            lot.append(commande)
+        elif nature == "vente":
+            self.service._liberer(args[1], args[2])
+    
+    def _boucle(self):
+        arret = False
+        while not arret:
+            commande = self._file.get()
+            if commande is None:
+                return
+            lot = []
+            self._prendre(commande, lot)
+            # On laisse les autres producteurs arriver pendant quelques ms
+            limite = time.monotonic() + self.delai
+            while len(lot) < self.taille_lot:
+                try:
+                    commande = self._file.get(timeout=max(0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if commande is None:
+                    arret = True
+                    break
+                self._prendre(commande, lot)
+            if not lot:
+                continue
+            try:
+                self._enregistrer(lot)
+            except Exception as e:
+                # Erreur imprévue : les commandes du paquet échouent, le thread continue
+                for _, _, futur in lot:
+                    self._repondre(futur, {"success": False, "error": str(e)})
+    
+    def _enregistrer(self, lot):
+        db = self.service.db
+        resultats = []
+        ids_types = set()
+        try:
+            with db.write():
+                for nature, groupe in itertools.groupby(lot, key=lambda c: c[0]):
+                    if nature == "vente":
+                        # SAVEPOINT dans _vendre_lot : une erreur n'annule que ces ventes
+                        commandes = [{"id_acheteur": a, "id_type_billet": t, "quantite": q}
+                                     for _, (a, t, q), _ in groupe]
+                        resultats_ventes, types_vendus = self.service._vendre_lot(commandes)
+                        resultats.extend(resultats_ventes)
+                        ids_types.update(types_vendus)
+                    else:
+                        for _, args, _ in groupe:
+                            resultat, id_type = self.service._annuler(*args)
+                            if resultat["success"]:
+                                ids_types.add(id_type)
+                            resultats.append(resultat)
+        except Exception as e:
+            # Le commit a échoué : aucune commande du paquet n'est passée
+            resultats = [{"success": False, "error": str(e)} for _ in lot]
+            ids_types.clear()
+            # Les réservations et restitutions du paquet n'ont pas eu lieu en base
+            if self.service.stock is not None:
+                self.service.stock.recharger()
+        
+        # Le cache n'est invalidé qu'une fois les données visibles par les lecteurs
+        if ids_types:
+            self.service._invalider_apres_ventes(ids_types)
+        for (_, _, futur), resultat in zip(lot, resultats):
+            self._repondre(futur, resultat)
+    
+    def fermer(self):
+        """Enregistre les commandes déjà reçues puis arrête le thread écrivain"""
+        with self._verrou:
+            if self._thread is not None:
+                self._file.put(None)
+                self._thread.join()
+                self._thread = None
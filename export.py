@@ -0,0 +1,145 @@
+# Export des ventes et des rapports de stats en CSV ou JSONL (éventuellement compressé en gzip)
+# Les lignes sont lues par paquets (fetchmany) et écrites au fur et à mesure :
+# la mémoire utilisée ne dépend pas du nombre de ventes
+#
+# python export.py ventes ventes_2025.csv.gz --debut 2025-01-01 --fin 2026-01-01
+# python export.py rapport top_billets top.jsonl
+
+import argparse
+import csv
+import gzip
+import json
+import time
+
+from dao import ConnectionPool, VenteDAO, StatsDAO
+
+FORMATS = ("csv", "jsonl")
+TAILLE_LOT_EXPORT = 5000
+
+# Rapports exportables : nom -> méthode de StatsDAO (celles qui renvoient plusieurs lignes)
+RAPPORTS = {
+    "ca_par_evenement": "get_chiffre_affaires_par_evenement",
+    "taux_remplissage": "get_taux_remplissage_par_evenement",
+    "top_billets": "get_top_billets",
+    "top_acheteurs": "get_top_acheteurs",
+    "ventes_par_categorie": "get_ventes_par_categorie",
+}
+
+
+def format_fichier(chemin):
+    """("csv" ou "jsonl", compressé ?) d'après l'extension : ventes.csv, ventes.jsonl.gz..."""
+    nom = chemin.lower()
+    compresse = nom.endswith(".gz")
+    if compresse:
+        nom = nom[:-3]
+    for fmt in FORMATS:
+        if nom.endswith("." + fmt):
+            return fmt, compresse
+    raise ValueError(f"Extension non reconnue (attendu : .csv, .jsonl, avec .gz en option) : {chemin}")
+
+
+def ouvrir_sortie(chemin, compresse):
+    # newline="" : c'est le module csv qui choisit les fins de ligne
+    if compresse:
+        return gzip.open(chemin, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(chemin, "w", encoding="utf-8", newline="")
+
+
+def ecrire_lignes(lignes, chemin, taille_lot=TAILLE_LOT_EXPORT):
+    """
+    Écrit des lignes (sqlite3.Row, lues au fur et à mesure) dans un fichier CSV ou JSONL
+    Les colonnes sont celles de la première ligne. Retourne le nombre de lignes écrites
+    """
+    fmt, compresse = format_fichier(chemin)
+    iterateur = iter(lignes)
+    premiere = next(iterateur, None)
+    colonnes = premiere.keys() if premiere is not None else []
+    total = 0
+    
+    with ouvrir_sortie(chemin, compresse) as f:
+        if fmt == "csv":
+            ecrivain = csv.writer(f)
+            if colonnes:
+                ecrivain.writerow(colonnes)
+            ecrire = ecrivain.writerows
+        else:
+            encoder = json.JSONEncoder(ensure_ascii=False).encode
+            
+            def ecrire(paquet):
+                f.write("".join(encoder(dict(zip(colonnes, ligne))) + "\n" for ligne in paquet))
+        
+        if premiere is not None:
+            ecrire([premiere])
+            total = 1
+        # On écrit par paquets : moins d'appels, et jamais plus d'un paquet en mémoire
+        paquet = []
+        for ligne in iterateur:
+            paquet.append(ligne)
+            if len(paquet) == taille_lot:
+                ecrire(paquet)
+                total += len(paquet)
+                paquet = []
+        ecrire(paquet)
+        total += len(paquet)
+    return total
+
+
+def pool_export():
+    # Un pool à part avec le profil "export" (petit cache, pas de mmap), fermé après l'export
+    return ConnectionPool(taille=1, profil="export")
+
+
+def exporter_ventes(chemin, debut=None, fin=None, pool=None, taille_lot=TAILLE_LOT_EXPORT):
+    """
+    Exporte les ventes de debut (inclus) à fin (exclue) dans l'ordre chronologique
+    Format d'après l'extension de chemin (.csv, .jsonl, + .gz pour compresser)
+    Retourne le nombre de ventes exportées
+    """
+    format_fichier(chemin)  # on vérifie l'extension avant de lancer la requête
+    pool_a_fermer = None if pool else pool_export()
+    try:
+        dao = VenteDAO(pool or pool_a_fermer)
+        return ecrire_lignes(dao.iter_periode(debut, fin, taille_lot), chemin, taille_lot)
+    finally:
+        if pool_a_fermer:
+            pool_a_fermer.close()
+
+
+def exporter_rapport(nom, chemin, pool=None):
+    """Exporte un rapport de StatsDAO (voir RAPPORTS), retourne le nombre de lignes"""
+    if nom not in RAPPORTS:
+        raise ValueError(f"Rapport inconnu : {nom} (possibles : {', '.join(RAPPORTS)})")
+    format_fichier(chemin)
+    pool_a_fermer = None if pool else pool_export()
+    try:
+        methode = getattr(StatsDAO(pool or pool_a_fermer), RAPPORTS[nom])
+        # Pour top_acheteurs, on veut tout le classement et pas seulement les 5 premiers
+        lignes = methode(-1) if nom == "top_acheteurs" else methode()
+        return ecrire_lignes(lignes, chemin)
+    finally:
+        if pool_a_fermer:
+            pool_a_fermer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export des ventes et des rapports (CSV / JSONL, gzip)")
+    sous = parser.add_subparsers(dest="quoi", required=True)
+    p_ventes = sous.add_parser("ventes", help="ventes, dans l'ordre chronologique")
+    p_ventes.add_argument("sortie", help="fichier .csv, .jsonl, .csv.gz ou .jsonl.gz")
+    p_ventes.add_argument("--debut", help="date de début incluse (AAAA-MM-JJ)")
+    p_ventes.add_argument("--fin", help="date de fin exclue (AAAA-MM-JJ)")
+    p_rapport = sous.add_parser("rapport", help="un rapport du tableau de bord")
+    p_rapport.add_argument("nom", choices=sorted(RAPPORTS))
+    p_rapport.add_argument("sortie", help="fichier .csv, .jsonl, .csv.gz ou .jsonl.gz")
+    args = parser.parse_args()
+    
+    debut = time.perf_counter()
+    if args.quoi == "ventes":
+        nb = exporter_ventes(args.sortie, args.debut, args.fin)
+    else:
+        nb = exporter_rapport(args.nom, args.sortie)
+    print(f"{nb} ligne(s) écrite(s) dans {args.sortie} en {time.perf_counter() - debut:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
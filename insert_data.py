@@ -1,12 +1,69 @@
 # Script d'insertion de données de test
+#
+# python insert_data.py                               -> données de test, une insertion à la fois
+# python insert_data.py --rapide --ventes 1000000     -> chargement en masse (voir chargement.py)
+# python insert_data.py --importer ventes.csv         -> ajoute des ventes passées (CSV ou JSONL)
 
-from dao import init_database, AcheteurDAO, EvenementDAO, TypeBilletDAO, VenteDAO, DatabaseConnection
+from dao import init_database, AcheteurDAO, EvenementDAO, TypeBilletDAO, VenteDAO, ConnectionPool
+from chargement import sans_index, inserer_par_paquets, importer_ventes, SQL_VENTE_DATEE
 from datetime import datetime, timedelta
+import argparse
+import math
 import random
+import time
 
+ACHETEURS = [
+    ("Dupont", "Marie", "marie.dupont@email.com", "0612345678"),
+    ("Martin", "Jean", "jean.martin@email.com", "0698765432"),
+    ("Bernard", "Sophie", "sophie.bernard@email.com", "0645678901"),
+    ("Petit", "Lucas", "lucas.petit@email.com", "0654321098"),
+    ("Durand", "Emma", "emma.durand@email.com", "0623456789"),
+    ("Leroy", "Thomas", "thomas.leroy@email.com", "0687654321"),
+    ("Moreau", "Chloé", "chloe.moreau@email.com", "0634567890"),
+    ("Simon", "Hugo", "hugo.simon@email.com", "0676543210"),
+    ("Laurent", "Léa", "lea.laurent@email.com", "0656789012"),
+    ("Roux", "Nathan", "nathan.roux@email.com", "0665432109"),
+]
 
-def inserer_donnees():
-    """Insère des données de test dans la base"""
+# (nom, description, dans combien de jours, heure, lieu, capacité, catégorie)
+EVENEMENTS = [
+    ("Concert Rock Night", "Soirée rock", 30, "20:00", "Salle des Fêtes", 500, "concert"),
+    ("Jazz en Ville", "Festival jazz", 45, "19:30", "Place du Marché", 300, "concert"),
+    ("Électro Party", "Nuit électro", 60, "22:00", "Hangar 42", 800, "concert"),
+    ("Tech Summit", "Conférence IA", 15, "09:00", "Centre des Congrès", 200, "conference"),
+    ("Forum Écologie", "Développement durable", 25, "10:00", "Maison Environnement", 150, "conference"),
+    ("Cirque Moderne", "Spectacle contemporain", 20, "15:00", "Chapiteau", 400, "spectacle"),
+    ("Comédie Musicale", "Les Misérables", 35, "20:30", "Théâtre Municipal", 350, "spectacle"),
+    ("One Man Show", "Humour", 10, "21:00", "Café Théâtre", 100, "spectacle"),
+]
+
+# (nom du type, prix, part de la capacité)
+TYPES_PAR_CAT = {
+    "concert": [("Standard", 25.00, 0.6), ("VIP", 50.00, 0.2), ("Early Bird", 20.00, 0.2)],
+    "conference": [("Simple", 15.00, 0.5), ("Journée", 35.00, 0.3), ("VIP", 75.00, 0.2)],
+    "spectacle": [("Libre", 18.00, 0.5), ("Cat.1", 30.00, 0.3), ("Premium", 45.00, 0.2)],
+}
+
+
+SQL_STOCK_RESTANT = "UPDATE types_billets SET quantite_disponible = ? WHERE id_type_billet = ?"
+
+# Billets par vente en moyenne (quantité tirée entre 1 et 4)
+BILLETS_PAR_VENTE = 2.5
+# Part des places que les ventes aléatoires remplissent au plus (en moyenne)
+REMPLISSAGE_MAX = 0.8
+
+
+def echelle_capacites(nb_ventes):
+    """
+    Facteur appliqué aux capacités des événements : avec --ventes 1000000, les 2800 places
+    de EVENEMENTS ne suffiraient pas (taux de remplissage au-delà de 100 %, stock négatif)
+    """
+    places = sum(e[5] for e in EVENEMENTS)
+    return max(1, math.ceil(nb_ventes * BILLETS_PAR_VENTE / (REMPLISSAGE_MAX * places)))
+
+
+def inserer_donnees(nb_ventes=50):
+    """Insère des données de test dans la base (un commit par ligne)"""
     
     print("Initialisation de la base...")
     init_database()
@@ -18,21 +75,8 @@ def inserer_donnees():
     
     # Acheteurs
     print("Insertion des acheteurs...")
-    acheteurs = [
-        ("Dupont", "Marie", "marie.dupont@email.com", "0612345678"),
-        ("Martin", "Jean", "jean.martin@email.com", "0698765432"),
-        ("Bernard", "Sophie", "sophie.bernard@email.com", "0645678901"),
-        ("Petit", "Lucas", "lucas.petit@email.com", "0654321098"),
-        ("Durand", "Emma", "emma.durand@email.com", "0623456789"),
-        ("Leroy", "Thomas", "thomas.leroy@email.com", "0687654321"),
-        ("Moreau", "Chloé", "chloe.moreau@email.com", "0634567890"),
-        ("Simon", "Hugo", "hugo.simon@email.com", "0676543210"),
-        ("Laurent", "Léa", "lea.laurent@email.com", "0656789012"),
-        ("Roux", "Nathan", "nathan.roux@email.com", "0665432109"),
-    ]
-    
     ids_acheteurs = []
-    for nom, prenom, email, tel in acheteurs:
+    for nom, prenom, email, tel in ACHETEURS:
         id_a = acheteur_dao.create(nom, prenom, email, tel)
         ids_acheteurs.append(id_a)
     print(f"  {len(ids_acheteurs)} acheteurs créés")
@@ -41,63 +85,128 @@ def inserer_donnees():
     print("Insertion des événements...")
     today = datetime.now()
     
-    evenements = [
-        ("Concert Rock Night", "Soirée rock", (today + timedelta(days=30)).strftime("%Y-%m-%d"), 
-         "20:00", "Salle des Fêtes", 500, "concert"),
-        ("Jazz en Ville", "Festival jazz", (today + timedelta(days=45)).strftime("%Y-%m-%d"), 
-         "19:30", "Place du Marché", 300, "concert"),
-        ("Électro Party", "Nuit électro", (today + timedelta(days=60)).strftime("%Y-%m-%d"), 
-         "22:00", "Hangar 42", 800, "concert"),
-        ("Tech Summit", "Conférence IA", (today + timedelta(days=15)).strftime("%Y-%m-%d"), 
-         "09:00", "Centre des Congrès", 200, "conference"),
-        ("Forum Écologie", "Développement durable", (today + timedelta(days=25)).strftime("%Y-%m-%d"), 
-         "10:00", "Maison Environnement", 150, "conference"),
-        ("Cirque Moderne", "Spectacle contemporain", (today + timedelta(days=20)).strftime("%Y-%m-%d"), 
-         "15:00", "Chapiteau", 400, "spectacle"),
-        ("Comédie Musicale", "Les Misérables", (today + timedelta(days=35)).strftime("%Y-%m-%d"), 
-         "20:30", "Théâtre Municipal", 350, "spectacle"),
-        ("One Man Show", "Humour", (today + timedelta(days=10)).strftime("%Y-%m-%d"), 
-         "21:00", "Café Théâtre", 100, "spectacle"),
-    ]
-    
+    echelle = echelle_capacites(nb_ventes)
     ids_evenements = []
-    for nom, desc, date, heure, lieu, cap, cat in evenements:
-        id_e = evenement_dao.create(nom, desc, date, heure, lieu, cap, cat)
-        ids_evenements.append((id_e, cap, cat))
+    for nom, desc, jours, heure, lieu, cap, cat in EVENEMENTS:
+        date = (today + timedelta(days=jours)).strftime("%Y-%m-%d")
+        id_e = evenement_dao.create(nom, desc, date, heure, lieu, cap * echelle, cat)
+        ids_evenements.append((id_e, cap * echelle, cat))
     print(f"  {len(ids_evenements)} événements créés")
     
     # Types de billets
     print("Insertion des types de billets...")
-    types_par_cat = {
-        "concert": [("Standard", 25.00, 0.6), ("VIP", 50.00, 0.2), ("Early Bird", 20.00, 0.2)],
-        "conference": [("Simple", 15.00, 0.5), ("Journée", 35.00, 0.3), ("VIP", 75.00, 0.2)],
-        "spectacle": [("Libre", 18.00, 0.5), ("Cat.1", 30.00, 0.3), ("Premium", 45.00, 0.2)],
-    }
-    
-    ids_types = []
+    types = {}
     for id_evt, capacite, categorie in ids_evenements:
-        for nom_type, prix, ratio in types_par_cat[categorie]:
+        for nom_type, prix, ratio in TYPES_PAR_CAT[categorie]:
             quantite = int(capacite * ratio)
             id_t = type_billet_dao.create(id_evt, nom_type, prix, quantite)
-            ids_types.append((id_t, prix))
-    print(f"  {len(ids_types)} types de billets créés")
+            types[id_t] = [prix, quantite]
+    print(f"  {len(types)} types de billets créés")
     
-    # Ventes
+    # Ventes (le stock est retiré en même temps, comme une vraie vente)
     print("Insertion des ventes...")
-    nb_ventes = 0
-    for _ in range(50):
-        id_acheteur = random.choice(ids_acheteurs)
-        id_type, prix = random.choice(ids_types)
-        quantite = random.randint(1, 4)
-        montant = prix * quantite
-        vente_dao.create(id_acheteur, id_type, quantite, montant)
-        nb_ventes += 1
-    print(f"  {nb_ventes} ventes créées")
+    nb = 0
+    for id_acheteur, id_type, quantite, _, _ in ventes_aleatoires(nb_ventes, ids_acheteurs, types):
+        vente_dao.create_avec_reservation(id_acheteur, id_type, quantite)
+        nb += 1
+    print(f"  {nb} ventes créées")
     
     # Fermeture
-    DatabaseConnection().close()
+    ConnectionPool.get_instance().close()
     print("\nTerminé !")
 
 
+def ventes_aleatoires(nb, ids_acheteurs, types, jours=90):
+    """
+    Générateur : les ventes ne sont jamais toutes en mémoire, étalées sur les `jours` derniers jours
+    types : {id_type_billet: [prix, stock restant]}, mis à jour au fur et à mesure : une vente
+    ne prend jamais plus que le stock restant et un type épuisé n'est plus tiré
+    (s'arrête avant nb ventes si tout est vendu)
+    """
+    maintenant = datetime.now()
+    disponibles = [id_type for id_type, (_, stock) in types.items() if stock > 0]
+    for _ in range(nb):
+        if not disponibles:
+            return
+        i = random.randrange(len(disponibles))
+        id_type = disponibles[i]
+        prix, stock = types[id_type]
+        quantite = min(random.randint(1, 4), stock)
+        types[id_type][1] = stock - quantite
+        if quantite == stock:
+            disponibles[i] = disponibles[-1]
+            disponibles.pop()
+        date = maintenant - timedelta(seconds=random.randrange(jours * 86400))
+        yield (random.choice(ids_acheteurs), id_type, quantite, date.strftime("%Y-%m-%d %H:%M:%S"),
+               prix * quantite)
+
+
+def inserer_donnees_rapide(pool, nb_ventes=50):
+    """
+    Mêmes données de test, chargées en masse : tables créées puis vidées de leurs index
+    et triggers, ventes envoyées par paquets avec executemany, puis index, stats et ANALYZE
+    pool : un pool avec le profil PRAGMA "chargement" (synchronous=OFF, journal en mémoire)
+    """
+    print("Initialisation de la base...")
+    init_database(pool)
+    today = datetime.now()
+    
+    with sans_index(pool):
+        # Peu de lignes ici : une seule transaction suffit (chaque create() devient un SAVEPOINT)
+        with pool.write():
+            acheteur_dao = AcheteurDAO(pool)
+            ids_acheteurs = [acheteur_dao.create(*a) for a in ACHETEURS]
+            
+            evenement_dao = EvenementDAO(pool)
+            type_billet_dao = TypeBilletDAO(pool)
+            echelle = echelle_capacites(nb_ventes)
+            types = {}
+            for nom, desc, jours, heure, lieu, cap, cat in EVENEMENTS:
+                date = (today + timedelta(days=jours)).strftime("%Y-%m-%d")
+                id_evt = evenement_dao.create(nom, desc, date, heure, lieu, cap * echelle, cat)
+                for nom_type, prix, ratio in TYPES_PAR_CAT[cat]:
+                    quantite = int(cap * echelle * ratio)
+                    types[type_billet_dao.create(id_evt, nom_type, prix, quantite)] = [prix, quantite]
+        print(f"  {len(ids_acheteurs)} acheteurs, {len(EVENEMENTS)} événements, "
+              f"{len(types)} types de billets")
+        
+        print("Insertion des ventes...")
+        nb = inserer_par_paquets(SQL_VENTE_DATEE, ventes_aleatoires(nb_ventes, ids_acheteurs, types),
+                                 pool=pool, apres_paquet=lambda total: print(f"  {total} / {nb_ventes} ventes"))
+        print(f"  {nb} ventes créées")
+        # Les ventes sont insérées directement : on retire ici les billets vendus du stock
+        with pool.write() as conn:
+            conn.executemany(SQL_STOCK_RESTANT, [(stock, id_type) for id_type, (_, stock) in types.items()])
+        print("Index, triggers, tables de stats et ANALYZE...")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remplit la base avec des données de test")
+    parser.add_argument("--rapide", action="store_true",
+                        help="chargement en masse (sans index pendant l'insertion, synchronous=OFF)")
+    parser.add_argument("--ventes", type=int, default=50, help="nombre de ventes aléatoires")
+    parser.add_argument("--importer", metavar="FICHIER",
+                        help="ventes passées à ajouter (.csv ou .jsonl), chargées en masse")
+    args = parser.parse_args()
+    
+    if not args.rapide and not args.importer:
+        inserer_donnees(args.ventes)
+        return
+    
+    debut = time.perf_counter()
+    pool = ConnectionPool(profil="chargement")
+    try:
+        if args.rapide:
+            inserer_donnees_rapide(pool, args.ventes)
+        if args.importer:
+            print(f"Import de {args.importer}...")
+            importees, rejetees = importer_ventes(
+                args.importer, pool, apres_paquet=lambda total: print(f"  {total} ventes importées"))
+            print(f"  {importees} ventes importées, {rejetees} ligne(s) rejetée(s)")
+    finally:
+        pool.close()
+    print(f"\nTerminé en {time.perf_counter() - debut:.1f} s !")
+
+
 if __name__ == "__main__":
-    inserer_donnees()
+    main()
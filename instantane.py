@@ -0,0 +1,275 @@
+# Instantané de la base pour les rapports : une copie de billetterie.db (en mémoire ou
+# dans un fichier) faite avec l'API de sauvegarde de SQLite (Connection.backup), par
+# paquets de pages, et refaite régulièrement par un thread
+# Les rapports de StatsDAO lisent la copie : ils ne gardent plus de verrou de lecture
+# sur la vraie base pendant que les acheteurs attendent leur vente
+# Les données lues ont au plus RAPPORTS_INSTANTANE_AGE_MAX secondes de retard
+# Chaque thread lit la copie avec sa propre connexion : les rapports ne s'attendent pas
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from config import (DATABASE_PATH, RAPPORTS_INSTANTANE_CHEMIN, RAPPORTS_INSTANTANE_INTERVALLE,
+                    RAPPORTS_INSTANTANE_AGE_MAX, RAPPORTS_INSTANTANE_PAGES,
+                    RAPPORTS_INSTANTANE_PAUSE_MS)
+from dao import ConnectionPool
+
+# Numéro des copies en mémoire : chacune a son nom ("file:/instantane-3?vfs=memdb")
+_numeros = itertools.count(1)
+
+
+class Copie:
+    """
+    Une copie de la base : la connexion qui l'a remplie (elle la garde ouverte, c'est
+    indispensable pour une copie en mémoire), et une connexion par thread qui la lit
+    La copie en mémoire utilise le VFS "memdb" de SQLite : plusieurs connexions du
+    processus peuvent l'ouvrir, sans le verrou global du "shared cache"
+    """
+    
+    def __init__(self, uri, connexion, date, trace=None):
+        self.uri = uri
+        self.connexion = connexion
+        self.date = date
+        self._trace = trace
+        self._local = threading.local()
+        self._connexions = []
+        self._lecteurs = 0  # rapports en cours sur cette copie
+        self._condition = threading.Condition()
+    
+    def prendre(self):
+        # Un rapport commence : la copie ne sera pas fermée avant rendre()
+        with self._condition:
+            self._lecteurs += 1
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.set_trace_callback(self._trace)
+                conn.execute("PRAGMA query_only = ON")
+            except BaseException:
+                self.rendre()
+                raise
+            self._local.conn = conn
+            with self._condition:
+                self._connexions.append(conn)
+        return conn
+    
+    def definir_trace(self, fonction):
+        # Traçage (instrumentation.py) des connexions déjà ouvertes et des prochaines
+        with self._condition:
+            self._trace = fonction
+            for conn in self._connexions:
+                conn.set_trace_callback(fonction)
+    
+    def rendre(self):
+        with self._condition:
+            self._lecteurs -= 1
+            if not self._lecteurs:
+                self._condition.notify_all()
+    
+    def fermer(self):
+        # Attend la fin des rapports en cours, puis ferme toutes les connexions
+        with self._condition:
+            self._condition.wait_for(lambda: not self._lecteurs)
+            connexions, self._connexions = self._connexions, []
+        for conn in connexions:
+            conn.close()
+        self.connexion.close()
+
+
+class InstantaneRapports:
+    """
+    S'utilise comme un pool en lecture seule : StatsDAO(instantane), puis
+    `with instantane.read() as conn` dans le DAO
+    - chemin=None : copie en mémoire (elle prend autant de place que la base)
+    - chemin="..." : copie sur disque, dans les fichiers <chemin>.a et <chemin>.b
+    Si la copie est plus vieille que age_max, read() la refait avant de répondre
+    (et si la copie échoue, on lit la vraie base plutôt que de servir des données trop vieilles)
+    """
+    
+    def __init__(self, pool=None, chemin=RAPPORTS_INSTANTANE_CHEMIN,
+                 intervalle=RAPPORTS_INSTANTANE_INTERVALLE, age_max=RAPPORTS_INSTANTANE_AGE_MAX,
+                 pages=RAPPORTS_INSTANTANE_PAGES, pause_ms=RAPPORTS_INSTANTANE_PAUSE_MS):
+        self.pool = pool or ConnectionPool.get_instance()
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self.age_max = age_max
+        self.pages = pages
+        self.pause = pause_ms / 1000
+        # Copie en service (None tant qu'il n'y en a pas)
+        self._courante = None
+        self._verrou = threading.Lock()
+        # Réentrant : read() peut refaire la copie alors qu'il tient déjà ce verrou
+        self._verrou_rafraichir = threading.RLock()
+        self._arret = None
+        self.nb_rafraichissements = 0
+        self._trace = None
+    
+    def age(self):
+        # Secondes depuis la prise de la copie en service (None s'il n'y en a pas encore)
+        courante = self._courante
+        return time.monotonic() - courante.date if courante is not None else None
+    
+    def _copier(self):
+        """Copie la base page par page, retourne une Copie"""
+        source = sqlite3.connect(self.pool.chemin or DATABASE_PATH, isolation_level=None)
+        destination = None
+        try:
+            # On garde une transaction de lecture ouverte pendant toute la copie : la copie
+            # est celle de la base à cet instant. Sans ça, chaque vente enregistrée entre deux
+            # paquets de pages fait recommencer la copie depuis le début (elle ne finit jamais)
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            date = time.monotonic()
+            # En WAL, cette transaction ne bloque pas les ventes : on fait une petite pause
+            # entre deux paquets pour laisser le disque aux vendeurs. Sans WAL, elle bloque
+            # les commits, donc on copie d'une traite
+            wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+            pause = self.pause if wal else 0
+            
+            # Sur disque, deux fichiers à tour de rôle : on écrit l'un pendant qu'on lit l'autre
+            # (l'ancien est fermé avant la copie suivante, voir rafraichir())
+            if self.chemin:
+                fichier = os.path.abspath(f"{self.chemin}.{'ab'[self.nb_rafraichissements % 2]}")
+                if os.path.exists(fichier):
+                    os.remove(fichier)
+                uri = f"file:{pathname2url(fichier)}"
+            else:
+                uri = f"file:/instantane-{next(_numeros)}?vfs=memdb"
+            destination = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            # Une copie perdue se refait : pas besoin de journal ni de fsync
+            destination.execute("PRAGMA journal_mode = OFF")
+            destination.execute("PRAGMA synchronous = OFF")
+            # La copie d'une base WAL est marquée WAL, et memdb ne sait pas ouvrir une base WAL
+            # à plusieurs : on la repasse en mode normal, en verrou exclusif (seul cas où SQLite
+            # accepte une base WAL sans fichier -shm), avant que les lecteurs ne l'ouvrent
+            destination.execute("PRAGMA locking_mode = EXCLUSIVE")
+            source.backup(destination, pages=self.pages,
+                          progress=(lambda *_: time.sleep(pause)) if pause else None)
+            source.execute("COMMIT")
+            destination.execute("PRAGMA journal_mode = DELETE")
+            destination.execute("PRAGMA locking_mode = NORMAL")
+            # Le verrou exclusif n'est rendu qu'à la lecture suivante
+            destination.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            return Copie(uri, destination, date)
+        except BaseException:
+            if destination is not None:
+                destination.close()
+            raise
+        finally:
+            source.close()
+    
+    def rafraichir(self):
+        """Refait la copie et la met en service ; retourne la durée de la copie en secondes"""
+        with self._verrou_rafraichir:
+            debut = time.perf_counter()
+            copie = self._copier()
+            with self._verrou:
+                copie.definir_trace(self._trace)
+                ancienne, self._courante = self._courante, copie
+            self.nb_rafraichissements += 1
+            if ancienne is not None:
+                # On attend la fin des rapports en cours sur l'ancienne copie avant de la fermer
+                ancienne.fermer()
+            return time.perf_counter() - debut
+    
+    def _a_jour(self):
+        # Copie en service si elle respecte age_max, sinon on en refait une
+        # (un autre thread est peut-être déjà en train de la refaire : on l'attend)
+        age = self.age()
+        if age is not None and age <= self.age_max:
+            return True
+        with self._verrou_rafraichir:
+            age = self.age()
+            if age is not None and age <= self.age_max:
+                return True
+            try:
+                self.rafraichir()
+            except sqlite3.Error as e:
+                print(f"Erreur instantané: {e}")
+                return False
+        return True
+    
+    @contextmanager
+    def read(self):
+        """Connexion du thread courant vers la copie (plusieurs rapports en même temps)"""
+        courante, conn = None, None
+        if self._a_jour():
+            # On s'inscrit sur la copie avant de relâcher self._verrou :
+            # rafraichir() ne peut pas la fermer entre les deux
+            with self._verrou:
+                courante = self._courante
+                if courante is not None:
+                    conn = courante.prendre()
+        if courante is None:
+            # Pas de copie assez récente : la vraie base, plutôt que des données trop vieilles
+            with self.pool.read() as conn:
+                yield conn
+            return
+        try:
+            yield conn
+        finally:
+            courante.rendre()
+    
+    def definir_trace(self, fonction):
+        """
+        Comme ConnectionPool.definir_trace : fonction(sql) sur les connexions de lecture
+        de la copie en service, et de toutes les copies suivantes (None pour l'enlever)
+        """
+        with self._verrou:
+            self._trace = fonction
+            courante = self._courante
+        if courante is not None:
+            courante.definir_trace(fonction)
+    
+    def write(self):
+        # Les écritures (StatsDAO.rebuild_stats) vont dans la vraie base,
+        # la copie les verra au prochain rafraîchissement
+        return self.pool.write()
+    
+    def demarrer(self, intervalle=None, attendre=True):
+        """
+        Fait une première copie puis lance le thread qui la refait toutes les `intervalle` s
+        attendre=False : c'est le thread qui fait la première copie, on rend la main tout de
+        suite (démarrage de l'interface) ; un rapport demandé avant attend la fin de cette copie
+        (ou la fait lui-même si le thread n'a pas encore commencé)
+        """
+        intervalle = intervalle or self.intervalle
+        if self._arret is not None:
+            return
+        if attendre:
+            self.rafraichir()
+            if not intervalle:
+                return
+        arret = threading.Event()
+        
+        def boucle():
+            delai = intervalle if attendre else 0
+            while not arret.wait(delai):
+                try:
+                    self.rafraichir()
+                except sqlite3.Error as e:
+                    print(f"Erreur instantané: {e}")
+                if not intervalle:
+                    break
+                delai = intervalle
+        
+        self._arret = arret
+        threading.Thread(target=boucle, name="instantane-rapports", daemon=True).start()
+    
+    def close(self):
+        # Arrête le thread et ferme la copie (read() en refera une si on s'en sert encore)
+        if self._arret is not None:
+            self._arret.set()
+            self._arret = None
+        with self._verrou_rafraichir:
+            with self._verrou:
+                ancienne, self._courante = self._courante, None
+            if ancienne is not None:
+                ancienne.fermer()
@@ -0,0 +1,217 @@
+# Mesure des appels aux DAO : nombre d'appels, temps (total, p50 / p95 / p99),
+# lignes renvoyées et requêtes SQL exécutées, avec leur plan (EXPLAIN QUERY PLAN)
+# Activée avec INSTRUMENTATION_ACTIVE dans config.py (ou BILLETTERIE_INSTRUMENTATION=1)
+
+import functools
+import inspect
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from config import INSTRUMENTATION_ECHANTILLONS, SEUIL_REQUETE_LENTE_MS
+
+journal_lent = logging.getLogger("billetterie.lent")
+
+# On note le SQL exécuté pendant les premiers appels de chaque méthode, puis de temps
+# en temps seulement (les requêtes ont un texte fixe, pas besoin de tout regarder)
+APPELS_CAPTURES = 5
+CAPTURE_TOUS_LES = 64
+REQUETES_MAX_PAR_METHODE = 20
+
+# Le texte reçu par le traçage contient les valeurs des paramètres :
+# on les remplace par "?" pour retrouver la "forme" de la requête
+RE_CHAINE = re.compile(r"'(?:[^']|'')*'")
+RE_NOMBRE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+RE_NULL = re.compile(r"\bNULL\b", re.I)
+RE_LISTE_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+RE_ESPACES = re.compile(r"\s+")
+# Ce qui n'est pas une requête intéressante (transactions, réglages, triggers)
+RE_IGNOREES = re.compile(r"\s*(--|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA|EXPLAIN)", re.I)
+
+
+def normaliser_sql(sql):
+    """Remplace les valeurs par "?" et les listes IN (...) par IN (?)"""
+    sql = RE_CHAINE.sub("?", sql)
+    sql = RE_NOMBRE.sub("?", sql)
+    sql = RE_NULL.sub("?", sql)
+    sql = RE_LISTE_IN.sub("IN (?)", sql)
+    return RE_ESPACES.sub(" ", sql).strip()
+
+
+def percentile(valeurs_triees, p):
+    return valeurs_triees[min(len(valeurs_triees) - 1, int(len(valeurs_triees) * p / 100))]
+
+
+class StatsMethode:
+    """Compteurs d'une méthode de DAO"""
+    __slots__ = ("appels", "total", "lignes", "durees", "requetes")
+    
+    def __init__(self):
+        self.appels = 0
+        self.total = 0.0
+        self.lignes = 0
+        self.durees = []     # les INSTRUMENTATION_ECHANTILLONS dernières durées
+        self.requetes = set()  # SQL normalisé
+
+
+def compter_lignes(resultat):
+    # fetchall() -> liste, fetchone() -> sqlite3.Row ou None, get_stocks -> dict
+    if isinstance(resultat, (list, dict)):
+        return len(resultat)
+    return 1 if isinstance(resultat, sqlite3.Row) else 0
+
+
+class Instrumentation:
+    """
+    Enveloppe les méthodes publiques des DAO pour les chronométrer, et se branche
+    sur le traçage des connexions du pool pour savoir quel SQL chaque méthode exécute
+    Le plan de chaque forme de requête n'est demandé qu'une fois, au premier rapport
+    """
+    
+    def __init__(self, pool, taille_echantillon=INSTRUMENTATION_ECHANTILLONS,
+                 seuil_lent_ms=SEUIL_REQUETE_LENTE_MS, sources=()):
+        # sources : autres connexions à tracer, avec leur definir_trace (instantané des rapports)
+        self.pool = pool
+        self.sources = (pool, *sources)
+        self.taille_echantillon = taille_echantillon
+        self.seuil_lent = seuil_lent_ms / 1000 if seuil_lent_ms else None
+        self._methodes = {}  # "VenteDAO.get_all" -> StatsMethode
+        self._plans = {}     # SQL normalisé -> lignes du plan
+        self._verrou = threading.Lock()
+        # Méthode en cours sur ce thread dont on veut noter le SQL
+        self._local = threading.local()
+        for source in self.sources:
+            source.definir_trace(self._tracer)
+    
+    def instrumenter(self, dao):
+        """Remplace les méthodes publiques de ce DAO par leur version chronométrée"""
+        nom_classe = type(dao).__name__
+        for nom, methode in inspect.getmembers(dao, inspect.ismethod):
+            if not nom.startswith("_") and methode.__self__ is dao:
+                setattr(dao, nom, self._envelopper(f"{nom_classe}.{nom}", methode))
+        return dao
+    
+    def _envelopper(self, nom, methode):
+        stats = self._methodes.setdefault(nom, StatsMethode())
+        
+        if inspect.isgeneratorfunction(methode):
+            # Générateur (iter_all) : on ne compte que le temps passé à produire les lignes
+            @functools.wraps(methode)
+            def generateur(*args, **kwargs):
+                duree, lignes = 0.0, 0
+                iterateur = methode(*args, **kwargs)
+                try:
+                    while True:
+                        capture = self._debut_capture(stats)
+                        debut = time.perf_counter()
+                        try:
+                            ligne = next(iterateur)
+                        except StopIteration:
+                            return
+                        finally:
+                            duree += time.perf_counter() - debut
+                            self._fin_capture(capture)
+                        lignes += 1
+                        yield ligne
+                finally:
+                    # Si l'appelant s'arrête avant la fin, on libère la connexion tout de suite
+                    iterateur.close()
+                    self._enregistrer(nom, stats, duree, lignes)
+            return generateur
+        
+        @functools.wraps(methode)
+        def chronometre(*args, **kwargs):
+            capture = self._debut_capture(stats)
+            debut = time.perf_counter()
+            lignes = 0
+            try:
+                resultat = methode(*args, **kwargs)
+                lignes = compter_lignes(resultat)
+                return resultat
+            finally:
+                duree = time.perf_counter() - debut
+                self._fin_capture(capture)
+                self._enregistrer(nom, stats, duree, lignes)
+        return chronometre
+    
+    def _debut_capture(self, stats):
+        # Retourne ce qu'il faudra remettre en place à la fin de l'appel (ou False : rien à faire)
+        if stats.appels < APPELS_CAPTURES or stats.appels % CAPTURE_TOUS_LES == 0:
+            precedente = getattr(self._local, "stats", None)
+            self._local.stats = stats
+            return precedente
+        return False
+    
+    def _fin_capture(self, capture):
+        if capture is not False:
+            self._local.stats = capture
+    
+    def _tracer(self, sql):
+        # Appelé par sqlite3 pour chaque requête, sur le thread qui l'exécute
+        stats = getattr(self._local, "stats", None)
+        if stats is not None and len(stats.requetes) < REQUETES_MAX_PAR_METHODE \
+                and not RE_IGNOREES.match(sql):
+            forme = normaliser_sql(sql)
+            with self._verrou:
+                stats.requetes.add(forme)
+    
+    def _enregistrer(self, nom, stats, duree, lignes):
+        with self._verrou:
+            if len(stats.durees) < self.taille_echantillon:
+                stats.durees.append(duree)
+            else:
+                stats.durees[stats.appels % self.taille_echantillon] = duree
+            stats.appels += 1
+            stats.total += duree
+            stats.lignes += lignes
+        
+        if self.seuil_lent is not None and duree > self.seuil_lent:
+            journal_lent.warning("%s : %.1f ms, %d ligne(s) - %s", nom, duree * 1000, lignes,
+                                 " | ".join(sorted(stats.requetes)) or "SQL non capturé")
+    
+    def _plan(self, sql):
+        # EXPLAIN QUERY PLAN une seule fois par forme de requête
+        if sql not in self._plans:
+            try:
+                with self.pool.read() as conn:
+                    lignes = conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?")).fetchall()
+                self._plans[sql] = [ligne[3] for ligne in lignes]
+            except sqlite3.Error as e:
+                self._plans[sql] = [f"plan indisponible : {e}"]
+        return self._plans[sql]
+    
+    def rapport(self):
+        """
+        {"VenteDAO.get_all": {appels, total_ms, moyenne_ms, p50_ms, p95_ms, p99_ms,
+                              lignes, requetes: [{sql, plan}]}, ...}
+        Les méthodes jamais appelées sont omises, les plus coûteuses viennent en premier
+        """
+        with self._verrou:
+            copies = [(nom, s.appels, s.total, s.lignes, sorted(s.durees), sorted(s.requetes))
+                      for nom, s in self._methodes.items() if s.appels]
+        
+        rapport = {}
+        for nom, appels, total, lignes, durees, requetes in sorted(copies, key=lambda c: -c[2]):
+            rapport[nom] = {
+                "appels": appels,
+                "total_ms": round(total * 1000, 3),
+                "moyenne_ms": round(total * 1000 / appels, 3),
+                "p50_ms": round(percentile(durees, 50) * 1000, 3),
+                "p95_ms": round(percentile(durees, 95) * 1000, 3),
+                "p99_ms": round(percentile(durees, 99) * 1000, 3),
+                "lignes": lignes,
+                "requetes": [{"sql": sql, "plan": self._plan(sql)} for sql in requetes],
+            }
+        return rapport
+    
+    def reinitialiser(self):
+        with self._verrou:
+            for stats in self._methodes.values():
+                stats.appels, stats.total, stats.lignes = 0, 0.0, 0
+                stats.durees.clear()
+    
+    def arreter(self):
+        for source in self.sources:
+            source.definir_trace(None)
@@ -1,6 +1,15 @@
 -- Schéma de la base de données - Billetterie locale
 
 -- Suppression des tables (ordre inverse des dépendances)
+DROP TABLE IF EXISTS recherche_evenements;
+DROP TABLE IF EXISTS recherche_acheteurs;
+DROP TABLE IF EXISTS rollups_etat;
+DROP TABLE IF EXISTS ventes_par_jour;
+DROP TABLE IF EXISTS ventes_par_heure;
+DROP TABLE IF EXISTS stats_acheteurs;
+DROP TABLE IF EXISTS stats_categories;
+DROP TABLE IF EXISTS stats_types_billets;
+DROP TABLE IF EXISTS stats_evenements;
 DROP TABLE IF EXISTS ventes;
 DROP TABLE IF EXISTS types_billets;
 DROP TABLE IF EXISTS evenements;
@@ -11,7 +20,9 @@ CREATE TABLE acheteurs (
     id_acheteur INTEGER PRIMARY KEY AUTOINCREMENT,
     nom TEXT NOT NULL,
     prenom TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
+    -- Enregistré en minuscules (dao.normaliser_email) ; NOCASE en plus pour l'unicité
+    -- et les recherches par email, même sur des lignes écrites sans passer par le DAO
+    email TEXT UNIQUE NOT NULL COLLATE NOCASE,
     telephone TEXT,
     date_inscription DATE DEFAULT CURRENT_DATE
 );
@@ -51,7 +62,237 @@ CREATE TABLE ventes (
 );
 
 -- Index pour les performances
-CREATE INDEX idx_ventes_date ON ventes(date_vente);
-CREATE INDEX idx_ventes_acheteur ON ventes(id_acheteur);
+-- Choisis d'après EXPLAIN QUERY PLAN de chaque requête des DAO
+-- (vérification : python -m benchmarks.plans_requetes)
+-- (date_vente, id_vente) : tri stable des ventes et pagination "keyset" (VenteDAO.iter_page),
+-- SQLite le parcourt dans les deux sens donc pas besoin d'une version DESC
+CREATE INDEX idx_ventes_date ON ventes(date_vente, id_vente);
+-- Tri de la liste des ventes par montant (pagination keyset)
+CREATE INDEX idx_ventes_montant ON ventes(montant_total, id_vente);
+-- Index "couvrants" : le recalcul des stats par type de billet et par acheteur
+-- (StatsDAO.rebuild_stats) lit tout dans l'index, déjà groupé, sans toucher à la table
+-- Ils servent aussi aux vérifications des clés étrangères de ventes
+CREATE INDEX idx_ventes_type ON ventes(id_type_billet, quantite, montant_total);
+CREATE INDEX idx_ventes_acheteur ON ventes(id_acheteur, quantite, montant_total);
+-- Listes triées sans passer par un tri temporaire
+CREATE INDEX idx_acheteurs_nom ON acheteurs(nom, prenom);
 CREATE INDEX idx_evenements_date ON evenements(date_evenement);
-CREATE INDEX idx_types_billets_evenement ON types_billets(id_evenement);
+CREATE INDEX idx_evenements_categorie ON evenements(categorie, date_evenement);
+CREATE INDEX idx_types_billets_evenement ON types_billets(id_evenement, prix);
+
+-- Tables de statistiques (une ligne par événement / type / catégorie / acheteur)
+-- Elles sont tenues à jour par les triggers plus bas à chaque vente ou annulation,
+-- comme ça les stats du tableau de bord ne relisent pas toute la table ventes
+-- En cas de doute : StatsDAO.rebuild_stats() les recalcule depuis ventes
+CREATE TABLE stats_evenements (
+    id_evenement INTEGER PRIMARY KEY,
+    nombre_ventes INTEGER NOT NULL DEFAULT 0,
+    billets_vendus INTEGER NOT NULL DEFAULT 0,
+    chiffre_affaires REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE stats_types_billets (
+    id_type_billet INTEGER PRIMARY KEY,
+    id_evenement INTEGER NOT NULL,
+    nombre_ventes INTEGER NOT NULL DEFAULT 0,
+    total_vendu INTEGER NOT NULL DEFAULT 0,
+    ca_type REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE stats_categories (
+    categorie TEXT PRIMARY KEY,
+    nombre_ventes INTEGER NOT NULL DEFAULT 0,
+    billets_vendus INTEGER NOT NULL DEFAULT 0,
+    chiffre_affaires REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE stats_acheteurs (
+    id_acheteur INTEGER PRIMARY KEY,
+    nombre_achats INTEGER NOT NULL DEFAULT 0,
+    total_billets INTEGER NOT NULL DEFAULT 0,
+    total_depense REAL NOT NULL DEFAULT 0
+);
+
+-- Pour le top des acheteurs sans trier toute la table
+CREATE INDEX idx_stats_acheteurs_depense ON stats_acheteurs(total_depense);
+
+-- Nouvelle vente : on ajoute aux compteurs (ou on crée la ligne)
+CREATE TRIGGER trg_ventes_insert_stats AFTER INSERT ON ventes
+BEGIN
+    INSERT INTO stats_types_billets (id_type_billet, id_evenement, nombre_ventes, total_vendu, ca_type)
+    SELECT NEW.id_type_billet, tb.id_evenement, 1, NEW.quantite, NEW.montant_total
+    FROM types_billets tb WHERE tb.id_type_billet = NEW.id_type_billet
+    ON CONFLICT(id_type_billet) DO UPDATE SET
+        nombre_ventes = nombre_ventes + 1,
+        total_vendu = total_vendu + excluded.total_vendu,
+        ca_type = ca_type + excluded.ca_type;
+
+    INSERT INTO stats_evenements (id_evenement, nombre_ventes, billets_vendus, chiffre_affaires)
+    SELECT tb.id_evenement, 1, NEW.quantite, NEW.montant_total
+    FROM types_billets tb WHERE tb.id_type_billet = NEW.id_type_billet
+    ON CONFLICT(id_evenement) DO UPDATE SET
+        nombre_ventes = nombre_ventes + 1,
+        billets_vendus = billets_vendus + excluded.billets_vendus,
+        chiffre_affaires = chiffre_affaires + excluded.chiffre_affaires;
+
+    INSERT INTO stats_categories (categorie, nombre_ventes, billets_vendus, chiffre_affaires)
+    SELECT e.categorie, 1, NEW.quantite, NEW.montant_total
+    FROM types_billets tb JOIN evenements e ON tb.id_evenement = e.id_evenement
+    WHERE tb.id_type_billet = NEW.id_type_billet
+    ON CONFLICT(categorie) DO UPDATE SET
+        nombre_ventes = nombre_ventes + 1,
+        billets_vendus = billets_vendus + excluded.billets_vendus,
+        chiffre_affaires = chiffre_affaires + excluded.chiffre_affaires;
+
+    INSERT INTO stats_acheteurs (id_acheteur, nombre_achats, total_billets, total_depense)
+    VALUES (NEW.id_acheteur, 1, NEW.quantite, NEW.montant_total)
+    ON CONFLICT(id_acheteur) DO UPDATE SET
+        nombre_achats = nombre_achats + 1,
+        total_billets = total_billets + excluded.total_billets,
+        total_depense = total_depense + excluded.total_depense;
+END;
+
+-- Vente annulée : on retire des compteurs
+CREATE TRIGGER trg_ventes_delete_stats AFTER DELETE ON ventes
+BEGIN
+    UPDATE stats_types_billets SET
+        nombre_ventes = nombre_ventes - 1,
+        total_vendu = total_vendu - OLD.quantite,
+        ca_type = ca_type - OLD.montant_total
+    WHERE id_type_billet = OLD.id_type_billet;
+
+    UPDATE stats_evenements SET
+        nombre_ventes = nombre_ventes - 1,
+        billets_vendus = billets_vendus - OLD.quantite,
+        chiffre_affaires = chiffre_affaires - OLD.montant_total
+    WHERE id_evenement = (SELECT id_evenement FROM types_billets WHERE id_type_billet = OLD.id_type_billet);
+
+    UPDATE stats_categories SET
+        nombre_ventes = nombre_ventes - 1,
+        billets_vendus = billets_vendus - OLD.quantite,
+        chiffre_affaires = chiffre_affaires - OLD.montant_total
+    WHERE categorie = (SELECT e.categorie FROM types_billets tb
+                       JOIN evenements e ON tb.id_evenement = e.id_evenement
+                       WHERE tb.id_type_billet = OLD.id_type_billet);
+
+    UPDATE stats_acheteurs SET
+        nombre_achats = nombre_achats - 1,
+        total_billets = total_billets - OLD.quantite,
+        total_depense = total_depense - OLD.montant_total
+    WHERE id_acheteur = OLD.id_acheteur;
+END;
+
+-- Cumuls des ventes par heure et par jour, pour chaque événement et type de billet
+-- (vitesse des ventes pendant une ouverture de billetterie). Contrairement aux stats_*,
+-- ils ne sont pas tenus à jour à chaque vente : RollupDAO.rafraichir() ajoute les ventes
+-- dont l'id dépasse rollups_etat.dernier_id_vente, puis avance ce repère
+-- Clé (id_evenement, période, type) : une fenêtre de temps d'un événement = un intervalle de la clé
+CREATE TABLE ventes_par_heure (
+    id_evenement INTEGER NOT NULL,
+    heure TEXT NOT NULL,            -- 'AAAA-MM-JJ HH:00:00'
+    id_type_billet INTEGER NOT NULL,
+    nombre_ventes INTEGER NOT NULL DEFAULT 0,
+    billets_vendus INTEGER NOT NULL DEFAULT 0,
+    chiffre_affaires REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_evenement, heure, id_type_billet)
+) WITHOUT ROWID;
+
+CREATE TABLE ventes_par_jour (
+    id_evenement INTEGER NOT NULL,
+    jour TEXT NOT NULL,             -- 'AAAA-MM-JJ'
+    id_type_billet INTEGER NOT NULL,
+    nombre_ventes INTEGER NOT NULL DEFAULT 0,
+    billets_vendus INTEGER NOT NULL DEFAULT 0,
+    chiffre_affaires REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_evenement, jour, id_type_billet)
+) WITHOUT ROWID;
+
+-- Une seule ligne : le plus grand id_vente déjà compté dans les cumuls
+CREATE TABLE rollups_etat (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    dernier_id_vente INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO rollups_etat (id, dernier_id_vente) VALUES (1, 0);
+
+-- Vente annulée alors qu'elle est déjà comptée : on la retire des cumuls
+-- (les ventes plus récentes que le repère ne sont pas encore dedans)
+-- Mêmes expressions de période que dans RollupDAO (date illisible -> période '')
+CREATE TRIGGER trg_ventes_delete_rollups AFTER DELETE ON ventes
+WHEN OLD.id_vente <= (SELECT dernier_id_vente FROM rollups_etat WHERE id = 1)
+BEGIN
+    UPDATE ventes_par_heure SET
+        nombre_ventes = nombre_ventes - 1,
+        billets_vendus = billets_vendus - OLD.quantite,
+        chiffre_affaires = chiffre_affaires - OLD.montant_total
+    WHERE id_evenement = (SELECT id_evenement FROM types_billets WHERE id_type_billet = OLD.id_type_billet)
+      AND heure = COALESCE(strftime('%Y-%m-%d %H:00:00', OLD.date_vente), '')
+      AND id_type_billet = OLD.id_type_billet;
+
+    UPDATE ventes_par_jour SET
+        nombre_ventes = nombre_ventes - 1,
+        billets_vendus = billets_vendus - OLD.quantite,
+        chiffre_affaires = chiffre_affaires - OLD.montant_total
+    WHERE id_evenement = (SELECT id_evenement FROM types_billets WHERE id_type_billet = OLD.id_type_billet)
+      AND jour = COALESCE(date(OLD.date_vente), '')
+      AND id_type_billet = OLD.id_type_billet;
+END;
+
+-- Recherche plein texte (FTS5) sur les acheteurs et les événements (AcheteurDAO.rechercher, ...)
+-- Tables "à contenu externe" : elles ne gardent que l'index, le texte reste dans
+-- acheteurs / evenements. Les triggers plus bas les tiennent à jour
+-- (résultats classés par bm25 dans la requête, avec un poids par colonne : dao.requete_recherche)
+-- remove_diacritics : "chloe" trouve "Chloé" ; prefix : index en plus pour les débuts de mots
+-- de 2 à 8 lettres (sans lui, un début de mot courant coûte plusieurs ms ; l'index prend
+-- ~50 % de place en plus)
+CREATE VIRTUAL TABLE recherche_acheteurs USING fts5(
+    nom, prenom, email, telephone,
+    content='acheteurs', content_rowid='id_acheteur',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8'
+);
+
+CREATE VIRTUAL TABLE recherche_evenements USING fts5(
+    nom, description, lieu,
+    content='evenements', content_rowid='id_evenement',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8'
+);
+
+-- Avec un contenu externe, on retire une ligne de l'index en redonnant ses anciennes valeurs
+CREATE TRIGGER trg_acheteurs_recherche_insert AFTER INSERT ON acheteurs
+BEGIN
+    INSERT INTO recherche_acheteurs (rowid, nom, prenom, email, telephone)
+    VALUES (NEW.id_acheteur, NEW.nom, NEW.prenom, NEW.email, NEW.telephone);
+END;
+
+CREATE TRIGGER trg_acheteurs_recherche_delete AFTER DELETE ON acheteurs
+BEGIN
+    INSERT INTO recherche_acheteurs (recherche_acheteurs, rowid, nom, prenom, email, telephone)
+    VALUES ('delete', OLD.id_acheteur, OLD.nom, OLD.prenom, OLD.email, OLD.telephone);
+END;
+
+CREATE TRIGGER trg_acheteurs_recherche_update AFTER UPDATE OF nom, prenom, email, telephone ON acheteurs
+BEGIN
+    INSERT INTO recherche_acheteurs (recherche_acheteurs, rowid, nom, prenom, email, telephone)
+    VALUES ('delete', OLD.id_acheteur, OLD.nom, OLD.prenom, OLD.email, OLD.telephone);
+    INSERT INTO recherche_acheteurs (rowid, nom, prenom, email, telephone)
+    VALUES (NEW.id_acheteur, NEW.nom, NEW.prenom, NEW.email, NEW.telephone);
+END;
+
+CREATE TRIGGER trg_evenements_recherche_insert AFTER INSERT ON evenements
+BEGIN
+    INSERT INTO recherche_evenements (rowid, nom, description, lieu)
+    VALUES (NEW.id_evenement, NEW.nom, NEW.description, NEW.lieu);
+END;
+
+CREATE TRIGGER trg_evenements_recherche_delete AFTER DELETE ON evenements
+BEGIN
+    INSERT INTO recherche_evenements (recherche_evenements, rowid, nom, description, lieu)
+    VALUES ('delete', OLD.id_evenement, OLD.nom, OLD.description, OLD.lieu);
+END;
+
+CREATE TRIGGER trg_evenements_recherche_update AFTER UPDATE OF nom, description, lieu ON evenements
+BEGIN
+    INSERT INTO recherche_evenements (recherche_evenements, rowid, nom, description, lieu)
+    VALUES ('delete', OLD.id_evenement, OLD.nom, OLD.description, OLD.lieu);
+    INSERT INTO recherche_evenements (rowid, nom, description, lieu)
+    VALUES (NEW.id_evenement, NEW.nom, NEW.description, NEW.lieu);
+END;
@@ -1,8 +1,50 @@
 # C'est la couche "métier" : on gère la logique de l'application ici
 
 from dao import (AcheteurDAO, EvenementDAO, TypeBilletDAO, VenteDAO, 
-                 StatsDAO, DatabaseConnection, init_database)
+                 StatsDAO, RollupDAO, ConnectionPool, init_database, normaliser_email)
+from cache import CacheTTL, en_cache
+from instrumentation import Instrumentation
+from stock import RegistreStock
+from instantane import InstantaneRapports
+import export
+import chargement
+from config import (CACHE_ACTIF, CACHE_TAILLE_MAX, INSTRUMENTATION_ACTIVE, STOCK_MEMOIRE_ACTIF,
+                    RAPPORTS_INSTANTANE_ACTIF, INDICATEURS_SAUVEGARDE_CHEMIN)
 from datetime import datetime
+import json
+import os
+import tempfile
+
+
+# Méthodes de stats en cache : une vente ou une annulation les rend toutes fausses
+STATS_VENTES = ("calculer_chiffre_affaires_total", "calculer_ca_par_evenement",
+                "calculer_taux_remplissage", "obtenir_top_billets", "obtenir_top_acheteurs",
+                "obtenir_stats_par_categorie", "calculer_indicateurs_avances")
+# Celles qui listent tous les événements (même sans vente)
+STATS_EVENEMENTS = ("calculer_ca_par_evenement", "calculer_taux_remplissage",
+                    "obtenir_stats_par_categorie", "calculer_indicateurs_avances")
+
+
+class DaoAuPremierUsage:
+    """
+    Attribut de BilletterieService qui crée son DAO au premier accès
+    (DAO(service.<source>)), puis le range dans l'instance : les accès suivants
+    ne passent plus par ici. Créer le service ne coûte presque rien
+    """
+    
+    def __init__(self, classe, source="db"):
+        self.classe = classe
+        self.source = source
+    
+    def __set_name__(self, proprietaire, nom):
+        self.nom = nom
+    
+    def __get__(self, service, proprietaire=None):
+        if service is None:
+            return self
+        dao = self.classe(getattr(service, self.source))
+        service.__dict__[self.nom] = dao
+        return dao
 
 
 class BilletterieService:
@@ -11,19 +53,87 @@ class BilletterieService:
     C'est lui qui vérifie les données avant de les envoyer à la base
     """
     
+    # Les objets DAO pour accéder aux données (créés au premier usage)
+    acheteur_dao = DaoAuPremierUsage(AcheteurDAO)
+    evenement_dao = DaoAuPremierUsage(EvenementDAO)
+    type_billet_dao = DaoAuPremierUsage(TypeBilletDAO)
+    vente_dao = DaoAuPremierUsage(VenteDAO)
+    rollup_dao = DaoAuPremierUsage(RollupDAO)
+    # Les rapports lisent l'instantané s'il y en a un (None : le pool partagé)
+    stats_dao = DaoAuPremierUsage(StatsDAO, source="instantane")
+    # Tables de stats de la vraie base, pour ce qui s'affiche à côté des ventes elles-mêmes
+    stats_direct_dao = DaoAuPremierUsage(StatsDAO)
+    
     def __init__(self):
-        # On crée les objets DAO pour accéder aux données
-        self.acheteur_dao = AcheteurDAO()
-        self.evenement_dao = EvenementDAO()
-        self.type_billet_dao = TypeBilletDAO()
-        self.vente_dao = VenteDAO()
-        self.stats_dao = StatsDAO()
+        # Le pool n'ouvre ses connexions qu'à la première requête
+        self.db = ConnectionPool.get_instance()
+        
+        # Les rapports lisent un instantané de la base si c'est activé dans config.py
+        # La première copie se fait en arrière-plan : elle ne retarde pas le démarrage
+        self.instantane = None
+        if RAPPORTS_INSTANTANE_ACTIF:
+            self.instantane = InstantaneRapports(self.db)
+            self.instantane.demarrer(attendre=False)
+        
+        # Cache des lectures (None si désactivé dans config.py)
+        self.cache = CacheTTL(CACHE_TAILLE_MAX) if CACHE_ACTIF else None
+        # id_type_billet -> id_evenement, rempli quand on met une liste de types en cache
+        # (pour savoir quelle liste invalider après une vente sans relire la base)
+        self._evenement_du_type = {}
+        
+        # Stock de chaque type de billet en mémoire (None si désactivé dans config.py)
+        # Chargé par un thread : lire tous les types prendrait du temps au démarrage de l'interface
+        self.stock = None
+        if STOCK_MEMOIRE_ACTIF:
+            self.stock = RegistreStock(self.db)
+            self.stock.charger(attendre=False)
+        
+        # Mesure des appels aux DAO (None si désactivé dans config.py)
+        self.perf = None
+        if INSTRUMENTATION_ACTIVE:
+            self.activer_instrumentation()
+    
+    def _invalider(self, *cles, methodes=()):
+        if self.cache is not None:
+            self.cache.invalider(*cles)
+            self.cache.invalider_methodes(*methodes)
+    
+    def _invalider_apres_ventes(self, ids_types):
+        # Le stock des types vendus a changé, et toutes les stats aussi
+        cles = {("lister_types_billets_evenement", self._evenement_du_type[t])
+                for t in ids_types if t in self._evenement_du_type}
+        self._invalider(*cles, methodes=STATS_VENTES)
+    
+    def get_cache_stats(self):
+        # Compteurs hits / misses du cache
+        return self.cache.stats() if self.cache is not None else {}
+    
+    def activer_instrumentation(self):
+        # Chronomètre toutes les méthodes des DAO (voir instrumentation.py)
+        if self.perf is None:
+            # Les rapports de StatsDAO lisent peut-être l'instantané : on trace aussi ses connexions
+            sources = (self.instantane,) if self.instantane is not None else ()
+            self.perf = Instrumentation(self.db, sources=sources)
+            for dao in (self.acheteur_dao, self.evenement_dao, self.type_billet_dao,
+                        self.vente_dao, self.stats_dao, self.stats_direct_dao, self.rollup_dao):
+                self.perf.instrumenter(dao)
+        return self.perf
+    
+    def get_perf_report(self):
+        """
+        Temps et requêtes de chaque méthode de DAO appelée :
+        {"VenteDAO.iter_page": {appels, total_ms, p50_ms, p95_ms, p99_ms, lignes,
+                                requetes: [{sql, plan}]}, ...}
+        Vide si l'instrumentation n'est pas activée
+        """
+        return self.perf.rapport() if self.perf is not None else {}
     
         
     # Gestion des acheteurs
     
     def inscrire_acheteur(self, nom, prenom, email, telephone=None):
         # On vérifie que les champs obligatoires sont remplis
+        email = normaliser_email(email or "")
         if not nom or not prenom or not email:
             return {"success": False, "error": "Nom, prénom et email obligatoires"}
         
@@ -31,19 +141,41 @@ class BilletterieService:
         if "@" not in email:
             return {"success": False, "error": "Email invalide"}
         
-        # On vérifie que l'email n'est pas déjà pris
-        if self.acheteur_dao.get_by_email(email):
+        # Une seule requête : l'insertion ne fait rien si l'email est déjà pris
+        try:
+            id_acheteur = self.acheteur_dao.inscrire(nom, prenom, email, telephone)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        if id_acheteur is None:
             return {"success": False, "error": "Email déjà utilisé"}
-        
+        self._invalider(("lister_acheteurs",))
+        return {"success": True, "id_acheteur": id_acheteur}
+    
+    def importer_acheteurs(self, acheteurs, apres_paquet=None):
+        """
+        Import en masse (fichier client, CRM...) : dicts nom, prenom, email, telephone
+        Un email déjà connu met la fiche à jour (voir chargement.importer_acheteurs)
+        """
         try:
-            id_acheteur = self.acheteur_dao.create(nom, prenom, email, telephone)
-            return {"success": True, "id_acheteur": id_acheteur}
+            inseres, mis_a_jour, rejetes = chargement.importer_acheteurs(
+                acheteurs, self.db, apres_paquet=apres_paquet)
         except Exception as e:
             return {"success": False, "error": str(e)}
+        # Les noms apparaissent aussi dans le top des acheteurs
+        self._invalider(("lister_acheteurs",), methodes=("obtenir_top_acheteurs",))
+        return {"success": True, "inseres": inseres, "mis_a_jour": mis_a_jour, "rejetes": rejetes}
     
+    @en_cache
     def lister_acheteurs(self):
-        # Transforme les résultats en liste de dictionnaires
-        return [dict(a) for a in self.acheteur_dao.get_all()]
+        # Des lignes sqlite3.Row (a["nom"]) ; dict(a) si on a besoin d'un vrai dict
+        return self.acheteur_dao.get_all()
+    
+    def rechercher_acheteurs(self, texte, limit=20):
+        """
+        Recherche pendant la frappe : acheteurs dont le nom, le prénom, l'email ou le
+        téléphone commence par chacun des mots tapés ("dup mar"), les plus pertinents d'abord
+        """
+        return self.acheteur_dao.rechercher(texte, limit)
     
     # Gestion des événements
     
@@ -64,15 +196,23 @@ class BilletterieService:
             id_evt = self.evenement_dao.create(
                 nom, description, date_evenement, heure_debut, lieu, capacite_max, categorie
             )
+            self._invalider(("lister_evenements",), ("lister_evenements_par_categorie", categorie),
+                            methodes=STATS_EVENEMENTS)
             return {"success": True, "id_evenement": id_evt}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @en_cache
     def lister_evenements(self):
-        return [dict(e) for e in self.evenement_dao.get_all()]
+        return self.evenement_dao.get_all()
     
+    @en_cache
     def lister_evenements_par_categorie(self, categorie):
-        return [dict(e) for e in self.evenement_dao.get_by_categorie(categorie)]
+        return self.evenement_dao.get_by_categorie(categorie)
+    
+    def rechercher_evenements(self, texte, limit=20):
+        # Même chose sur le nom, la description et le lieu des événements
+        return self.evenement_dao.rechercher(texte, limit)
     
     # Gestion des billets
 
@@ -89,72 +229,252 @@ class BilletterieService:
         
         try:
             id_type = self.type_billet_dao.create(id_evenement, nom_type, prix, quantite)
+            if self.stock is not None:
+                self.stock.definir(id_type, quantite)
+            self._invalider(("lister_types_billets_evenement", id_evenement))
             return {"success": True, "id_type_billet": id_type}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @en_cache
     def lister_types_billets_evenement(self, id_evenement):
-        return [dict(t) for t in self.type_billet_dao.get_by_evenement(id_evenement)]
+        types = self.type_billet_dao.get_by_evenement(id_evenement)
+        for t in types:
+            self._evenement_du_type[t['id_type_billet']] = id_evenement
+        return types
     
  
     # Gestion des ventes
   
     
+    def _reserver(self, id_type_billet, quantite):
+        # Registre du stock : un type épuisé est refusé ici, sans lire la base ni passer par
+        # la file d'écriture (les billets rendus par un autre processus reviennent dans le
+        # registre à sa prochaine relecture, voir RegistreStock.charger)
+        # Retourne le résultat du refus, ou None si la vente continue (réservée, ou la base décidera)
+        if self.stock is None or self.stock.reserver(id_type_billet, quantite) is not False:
+            return None
+        dispo = self.stock.disponible(id_type_billet)
+        return {"success": False, "error": f"Stock insuffisant ({dispo} dispo)"}
+    
+    def _liberer(self, id_type_billet, quantite):
+        # Vente réservée dans le registre mais pas enregistrée : on rend les billets
+        if self.stock is not None:
+            self.stock.liberer(id_type_billet, quantite)
+    
+    def _confirmer(self, id_type_billet, quantite):
+        # Vente réservée dans le registre et enregistrée en base
+        if self.stock is not None:
+            self.stock.confirmer(id_type_billet, quantite)
+    
     def effectuer_vente(self, id_acheteur, id_type_billet, quantite):
+        if quantite <= 0:
+            return {"success": False, "error": "Quantité doit être positive"}
+        
+        refus = self._reserver(id_type_billet, quantite)
+        if refus is not None:
+            return refus
+        
         # On vérifie que l'acheteur existe
         acheteur = self.acheteur_dao.get_by_id(id_acheteur)
         if not acheteur:
+            self._liberer(id_type_billet, quantite)
             return {"success": False, "error": "Acheteur introuvable"}
         
-        # On vérifie que le type de billet existe
-        type_billet = self.type_billet_dao.get_by_id(id_type_billet)
-        if not type_billet:
-            return {"success": False, "error": "Type de billet introuvable"}
+        try:
+            # Réservation du stock + enregistrement de la vente en une transaction
+            # (le stock est vérifié par le UPDATE lui-même, pas avant)
+            resultat = self.vente_dao.create_avec_reservation(id_acheteur, id_type_billet, quantite)
+        except Exception as e:
+            self._liberer(id_type_billet, quantite)
+            return {"success": False, "error": str(e)}
         
-        # On vérifie qu'il reste assez de billets en stock
-        if type_billet['quantite_disponible'] < quantite:
+        if resultat is None:
+            # Soit le type de billet n'existe pas, soit il n'y a plus assez de stock
+            self._liberer(id_type_billet, quantite)
+            type_billet = self.type_billet_dao.get_by_id(id_type_billet)
+            if not type_billet:
+                return {"success": False, "error": "Type de billet introuvable"}
+            # Le registre croyait qu'il en restait : la base a été modifiée à côté, on le recale
+            # (sans toucher aux réservations des autres ventes en cours)
+            if self.stock is not None:
+                self.stock.recaler(id_type_billet, type_billet['quantite_disponible'])
             return {"success": False, "error": f"Stock insuffisant ({type_billet['quantite_disponible']} dispo)"}
         
-        # Calcul du prix total
-        montant_total = type_billet['prix'] * quantite
+        id_vente, montant_total = resultat
+        self._confirmer(id_type_billet, quantite)
+        self._invalider_apres_ventes([id_type_billet])
+        return {"success": True, "id_vente": id_vente, "montant_total": montant_total}
+    
+    def effectuer_ventes_batch(self, commandes):
+        """
+        Enregistre un paquet de commandes en une seule transaction
+        commandes : liste de dicts {id_acheteur, id_type_billet, quantite}
+        Les commandes sont validées dans l'ordre avec le stock gardé en mémoire,
+        puis tout est écrit avec executemany et un seul commit
+        Retourne un résultat par commande (même format que effectuer_vente)
+        Une commande mal formée (clé manquante, valeur non entière) est refusée
+        comme les autres, sans empêcher les suivantes de passer
+        """
+        commandes = list(commandes)
+        resultats = [None] * len(commandes)
+        positions = []  # commandes qui ont passé le registre du stock
+        for i, c in enumerate(commandes):
+            # On vérifie la commande avant de réserver : rien ne doit lever une fois
+            # des billets réservés pour les commandes précédentes
+            resultats[i] = self._verifier_commande(c)
+            if resultats[i] is None:
+                resultats[i] = self._reserver(c['id_type_billet'], c['quantite'])
+            if resultats[i] is None:
+                positions.append(i)
         
+        resultats_lot, ids_types = self._vendre_lot([commandes[i] for i in positions])
+        for i, resultat in zip(positions, resultats_lot):
+            resultats[i] = resultat
+        if ids_types:
+            self._invalider_apres_ventes(ids_types)
+        return resultats
+    
+    @staticmethod
+    def _verifier_commande(commande):
+        # Refus d'une commande mal formée, ou None si elle peut continuer
         try:
-            # On enregistre la vente
-            id_vente = self.vente_dao.create(id_acheteur, id_type_billet, quantite, montant_total)
-            
-            # On met à jour le stock (on enlève les billets vendus)
-            nouvelle_qte = type_billet['quantite_disponible'] - quantite
-            self.type_billet_dao.update_quantite(id_type_billet, nouvelle_qte)
-            
-            return {"success": True, "id_vente": id_vente, "montant_total": montant_total}
+            valeurs = (commande['id_acheteur'], commande['id_type_billet'], commande['quantite'])
+        except (KeyError, TypeError, IndexError):
+            return {"success": False, "error": "Commande incomplète (id_acheteur, id_type_billet, quantite)"}
+        # type(v) is int : ni bool ni texte ("2"), et plus rapide que isinstance sur 100k commandes
+        if not all(type(v) is int for v in valeurs):
+            return {"success": False, "error": "id_acheteur, id_type_billet et quantite doivent être des entiers"}
+        if commande['quantite'] <= 0:
+            return {"success": False, "error": "Quantité doit être positive"}
+        return None
+    
+    def _vendre_lot(self, commandes):
+        # Retourne (résultats, types de billets vendus), sans toucher au cache
+        # (utilisé aussi par la file d'écriture, dans sa propre transaction)
+        # Les commandes ont déjà été réservées dans le registre du stock (_reserver) :
+        # on rend les billets de celles qui ne passent pas
+        commandes = list(commandes)
+        resultats = [None] * len(commandes)
+        a_relire = set()  # types dont la base a moins de stock que ce que croyait le registre
+        
+        try:
+            with self.db.write():
+                # On lit le stock dans la transaction : personne ne peut le modifier entre temps
+                stocks = self.type_billet_dao.get_stocks(c['id_type_billet'] for c in commandes)
+                acheteurs = self.acheteur_dao.get_ids_existants(c['id_acheteur'] for c in commandes)
+                
+                stock_restant = {id_type: stock for id_type, (stock, _) in stocks.items()}
+                a_retirer = {}
+                acceptees = []  # (position dans la liste, ligne à insérer)
+                
+                for i, c in enumerate(commandes):
+                    id_type, quantite = c['id_type_billet'], c['quantite']
+                    if quantite <= 0:
+                        resultats[i] = {"success": False, "error": "Quantité doit être positive"}
+                    elif c['id_acheteur'] not in acheteurs:
+                        resultats[i] = {"success": False, "error": "Acheteur introuvable"}
+                    elif id_type not in stocks:
+                        resultats[i] = {"success": False, "error": "Type de billet introuvable"}
+                    elif stock_restant[id_type] < quantite:
+                        resultats[i] = {"success": False,
+                                        "error": f"Stock insuffisant ({stock_restant[id_type]} dispo)"}
+                        a_relire.add(id_type)
+                    else:
+                        stock_restant[id_type] -= quantite
+                        a_retirer[id_type] = a_retirer.get(id_type, 0) + quantite
+                        montant_total = stocks[id_type][1] * quantite
+                        acceptees.append((i, (c['id_acheteur'], id_type, quantite, montant_total)))
+                
+                self.type_billet_dao.decrement_many(a_retirer)
+                ids_ventes = self.vente_dao.create_many([ligne for _, ligne in acceptees])
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            # Toute la transaction a été annulée : aucune commande n'est passée
+            for c in commandes:
+                self._liberer(c['id_type_billet'], c['quantite'])
+            return [{"success": False, "error": str(e)} for _ in commandes], set()
+        
+        for (i, ligne), id_vente in zip(acceptees, ids_ventes):
+            resultats[i] = {"success": True, "id_vente": id_vente, "montant_total": ligne[3]}
+        for c, resultat in zip(commandes, resultats):
+            if resultat["success"]:
+                self._confirmer(c['id_type_billet'], c['quantite'])
+            else:
+                self._liberer(c['id_type_billet'], c['quantite'])
+        if a_relire and self.stock is not None:
+            self.stock.recharger(a_relire)
+        return resultats, set(a_retirer)
     
     def lister_ventes(self):
-        return [dict(v) for v in self.vente_dao.get_all()]
+        # Charge toutes les ventes d'un coup : pour une grosse base,
+        # utiliser plutôt lister_ventes_page() ou iterer_ventes()
+        return self.vente_dao.get_all()
     
-    def annuler_vente(self, id_vente):
-        # On vérifie que la vente existe avant de la supprimer
-        vente = self.vente_dao.get_by_id(id_vente)
-        if not vente:
-            return {"success": False, "error": "Vente introuvable"}
-        
+    def lister_ventes_page(self, apres=None, limite=50, tri="date_vente", descendant=True, avant=None):
+        """
+        Une page de ventes triée par `tri` (date_vente, montant_total ou id_vente)
+        apres / avant : clé (valeur triée, id_vente) d'où repartir, dans un sens ou l'autre
+        Retourne {"ventes": [...], "suivant": clé à passer en `apres` pour la page
+        suivante, ou None s'il n'y a plus rien}
+        """
+        ventes = self.vente_dao.iter_page(apres, limite, tri, descendant, avant)
+        suivant = None
+        if len(ventes) == limite:
+            suivant = (ventes[-1][tri], ventes[-1]['id_vente'])
+        return {"ventes": ventes, "suivant": suivant}
+    
+    def compter_ventes(self):
+        # Nombre total de ventes (lu dans les tables de stats, pas de COUNT sur ventes)
+        # Jamais dans l'instantané : il s'affiche à côté de la liste des ventes, qui est à jour
+        return self.stats_direct_dao.get_nombre_ventes()
+    
+    def iterer_ventes(self, taille_lot=1000):
+        # Générateur sur toutes les ventes, lues par paquets
+        yield from self.vente_dao.iter_all(taille_lot)
+    
+    def exporter_ventes(self, chemin, debut=None, fin=None):
+        """
+        Écrit les ventes de debut (inclus) à fin (exclue) dans un fichier
+        .csv / .jsonl (+ .gz pour compresser), sans les charger en mémoire
+        """
         try:
-            # On remet les billets en stock avant de supprimer
-            type_billet = self.type_billet_dao.get_by_id(vente['id_type_billet'])
-            if type_billet:
-                nouvelle_qte = type_billet['quantite_disponible'] + vente['quantite']
-                self.type_billet_dao.update_quantite(vente['id_type_billet'], nouvelle_qte)
-            
-            # On supprime la vente
-            self.vente_dao.delete(id_vente)
-            return {"success": True, "message": f"Vente #{id_vente} supprimée"}
+            nb = export.exporter_ventes(chemin, debut or None, fin or None)
+            return {"success": True, "nb_lignes": nb, "chemin": chemin}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def exporter_rapport(self, nom, chemin):
+        # nom : une clé de export.RAPPORTS (ca_par_evenement, top_billets...)
+        try:
+            nb = export.exporter_rapport(nom, chemin, self.instantane)
+            return {"success": True, "nb_lignes": nb, "chemin": chemin}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def annuler_vente(self, id_vente):
+        resultat, id_type = self._annuler(id_vente)
+        if resultat["success"]:
+            self._invalider_apres_ventes([id_type])
+        return resultat
+    
+    def _annuler(self, id_vente):
+        # Retourne (résultat, id_type_billet de la vente ou None), sans toucher au cache
+        # (la file d'écriture appelle ça dans sa transaction et invalide après le commit)
+        try:
+            # On remet les billets en stock et on supprime la vente d'un coup
+            vente = self.vente_dao.delete_avec_restitution(id_vente)
+            if vente is None:
+                return {"success": False, "error": "Vente introuvable"}, None
+            if self.stock is not None:
+                self.stock.rendre(vente['id_type_billet'], vente['quantite'])
+            return {"success": True, "message": f"Vente #{id_vente} supprimée"}, vente['id_type_billet']
+        except Exception as e:
+            return {"success": False, "error": str(e)}, None
+    
 
     # Statistiques
     
+    @en_cache
     def calculer_chiffre_affaires_total(self):
         # On récupère le CA et le nombre de billets vendus
         ca = self.stats_dao.get_chiffre_affaires_total()
@@ -165,47 +485,113 @@ class BilletterieService:
             "panier_moyen": round(ca / qte, 2) if qte > 0 else 0
         }
     
+    @en_cache
     def calculer_ca_par_evenement(self):
-        return [dict(r) for r in self.stats_dao.get_chiffre_affaires_par_evenement()]
+        return self.stats_dao.get_chiffre_affaires_par_evenement()
     
+    @en_cache
     def calculer_taux_remplissage(self):
-        return [dict(r) for r in self.stats_dao.get_taux_remplissage_par_evenement()]
+        return self.stats_dao.get_taux_remplissage_par_evenement()
     
+    @en_cache
     def obtenir_top_billets(self):
-        return [dict(r) for r in self.stats_dao.get_top_billets()]
+        return self.stats_dao.get_top_billets()
     
+    @en_cache
     def obtenir_top_acheteurs(self, limit=5):
-        return [dict(r) for r in self.stats_dao.get_top_acheteurs(limit)]
+        return self.stats_dao.get_top_acheteurs(limit)
     
+    @en_cache
     def obtenir_stats_par_categorie(self):
-        return [dict(r) for r in self.stats_dao.get_ventes_par_categorie()]
+        return self.stats_dao.get_ventes_par_categorie()
+    
+    def reconstruire_stats(self):
+        # Recalcule les tables de stats depuis les ventes (réparation)
+        try:
+            self.stats_dao.rebuild_stats()
+            self.rollup_dao.reconstruire()
+            if self.instantane is not None:
+                self.instantane.rafraichir()
+            self._invalider(methodes=STATS_VENTES)
+            return {"success": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def rafraichir_cumuls(self):
+        # Ajoute aux tables de cumuls les ventes arrivées depuis la dernière fois (c'est une écriture)
+        return self.rollup_dao.rafraichir()
     
+    def ventes_par_heure(self, id_evenement, debut=None, fin=None, par_type=False, rafraichir=True):
+        """
+        Ventes d'un événement heure par heure sur [debut, fin[ (dates "AAAA-MM-JJ [HH:MM:SS]")
+        Lu dans les tables de cumuls, après y avoir ajouté les ventes arrivées depuis la
+        dernière fois : le coût dépend de la fenêtre demandée, pas de tout l'historique
+        par_type=True : une ligne par heure et par type de billet
+        rafraichir=False : lecture seule, l'appelant a fait rafraichir_cumuls() lui-même
+        """
+        if rafraichir:
+            self.rafraichir_cumuls()
+        return self.rollup_dao.get_par_heure(id_evenement, debut, fin, par_type)
+    
+    def ventes_par_jour(self, id_evenement, debut=None, fin=None, par_type=False, rafraichir=True):
+        # Même chose jour par jour
+        if rafraichir:
+            self.rafraichir_cumuls()
+        return self.rollup_dao.get_par_jour(id_evenement, debut, fin, par_type)
+    
+    @en_cache
     def calculer_indicateurs_avances(self):
-        # Ici on fait des calculs en Python 
-        ca = self.stats_dao.get_chiffre_affaires_total()
-        qte = self.stats_dao.get_quantite_totale_vendue()
-        ca_evt = self.calculer_ca_par_evenement()
-        taux = self.calculer_taux_remplissage()
-        
-        if ca_evt:
-            # Calcul de la moyenne des CA
-            ca_moyen = sum(e['chiffre_affaires'] for e in ca_evt) / len(ca_evt)
-            # On trouve l'événement avec le plus gros CA
-            top_evt = max(ca_evt, key=lambda x: x['chiffre_affaires'])
-            # Moyenne des taux de remplissage
-            taux_moyen = sum(t['taux_remplissage'] for t in taux) / len(taux)
-        else:
-            ca_moyen, top_evt, taux_moyen = 0, None, 0
+        # Une seule requête pour toutes les cartes du tableau de bord
+        ind = self.stats_dao.get_indicateurs()
+        ca = ind['chiffre_affaires_total']
+        qte = ind['quantite_totale']
         
         return {
             "chiffre_affaires_total": ca,
             "quantite_totale": qte,
+            "nombre_evenements": ind['nombre_evenements'],
             "prix_moyen_billet": round(ca / qte, 2) if qte > 0 else 0,
-            "ca_moyen_par_evenement": round(ca_moyen, 2),
-            "taux_remplissage_moyen": round(taux_moyen, 2),
-            "evenement_top": top_evt['evenement'] if top_evt else "Aucun",
+            "ca_moyen_par_evenement": round(ind['ca_moyen_par_evenement'], 2),
+            "taux_remplissage_moyen": round(ind['taux_remplissage_moyen'], 2),
+            "evenement_top": ind['evenement_top'] if ind['nombre_evenements'] else "Aucun",
             "date_analyse": datetime.now().strftime("%Y-%m-%d %H:%M")
         }
     
+    def indicateurs_sauvegardes(self):
+        """
+        Les indicateurs du dernier calcul_et_sauvegarde_indicateurs() (même sur un autre
+        lancement de l'application), sans toucher à la base. None s'il n'y en a pas
+        """
+        try:
+            with open(INDICATEURS_SAUVEGARDE_CHEMIN, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def calcul_et_sauvegarde_indicateurs(self):
+        # Indicateurs à jour, gardés aussi pour le prochain démarrage (voir indicateurs_sauvegardes)
+        indicateurs = self.calculer_indicateurs_avances()
+        temporaire = None
+        try:
+            # Un fichier temporaire à nom unique, à côté du vrai : deux sauvegardes en même
+            # temps n'écrivent pas dans le même fichier
+            with tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", delete=False, suffix=".tmp",
+                    prefix=f"{os.path.basename(INDICATEURS_SAUVEGARDE_CHEMIN)}.",
+                    dir=os.path.dirname(INDICATEURS_SAUVEGARDE_CHEMIN) or ".") as f:
+                temporaire = f.name
+                json.dump(indicateurs, f, ensure_ascii=False)
+            # Remplacement d'un coup : un démarrage ne lit jamais un fichier à moitié écrit
+            os.replace(temporaire, INDICATEURS_SAUVEGARDE_CHEMIN)
+        except OSError as e:
+            print(f"Indicateurs non sauvegardés : {e}")
+            if temporaire is not None and os.path.exists(temporaire):
+                os.remove(temporaire)
+        return indicateurs
+    
     def fermer_connexion(self):
-        DatabaseConnection().close()
+        if self.instantane is not None:
+            self.instantane.close()
+        if self.stock is not None:
+            self.stock.fermer()
+        self.db.close()
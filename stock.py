@@ -0,0 +1,197 @@
+# Registre du stock en mémoire : le stock restant de chaque type de billet,
+# chargé depuis types_billets par un thread au démarrage du service
+# Pendant une grosse ouverture de billetterie, une demande pour un type épuisé
+# est refusée sans passer par la file d'écriture ni prendre le verrou d'écriture
+# La base reste la référence : une vente acceptée ici passe quand même par le
+# UPDATE conditionnel (pas de survente possible si le registre se trompe)
+# Un refus ne lit pas la base : le thread du registre relit régulièrement le stock
+# des types épuisés (annulations et ventes faites par d'autres processus)
+
+import sqlite3
+import threading
+from array import array
+
+from config import STOCK_MEMOIRE_RECALAGE
+from dao import TypeBilletDAO
+
+# Nombre de verrous : un type de billet utilise le verrou id % NB_VERROUS
+NB_VERROUS = 64
+# Valeur des cases des types que le registre ne connaît pas (c'est la base qui décide)
+INCONNU = -1
+
+
+class RegistreStock:
+    """
+    Stock de chaque type dans un tableau d'entiers indexé par id_type_billet
+    (les ids sont consécutifs : 8 octets par type, pas de dict ni d'objet par type)
+    Verrous "par bande" : deux ventes sur des types différents ne s'attendent presque jamais
+    On garde aussi, par type, les billets réservés pas encore enregistrés en base
+    (reserver() puis confirmer() ou liberer()) : on a toujours
+    stock du registre = stock en base - billets réservés pas encore enregistrés
+    Si la base a été modifiée à côté (autre processus, autre service), recaler() ou
+    recharger() remettent le registre d'accord avec elle sans perdre les réservations en cours
+    """
+    
+    def __init__(self, pool=None, nb_verrous=NB_VERROUS):
+        self.type_billet_dao = TypeBilletDAO(pool)
+        self._stock = array("q")
+        self._reserves = array("q")
+        self._verrous = [threading.Lock() for _ in range(nb_verrous)]
+        self._verrou_taille = threading.Lock()
+        # Mis quand le premier chargement est fini (voir charger)
+        self.pret = threading.Event()
+        self._arret = None
+    
+    def _verrou(self, id_type):
+        return self._verrous[id_type % len(self._verrous)]
+    
+    def charger(self, attendre=True, intervalle=STOCK_MEMOIRE_RECALAGE):
+        """
+        Premier chargement du stock depuis la base, puis un thread relit toutes les
+        `intervalle` s le stock des types épuisés (0 = jamais)
+        attendre=False : c'est le thread qui fait le premier chargement, on rend la main tout
+        de suite (démarrage de l'interface, boucle asyncio) ; en attendant, les types sont
+        inconnus du registre et c'est la base qui décide de chaque vente
+        """
+        if self._arret is not None:
+            return
+        
+        def charger():
+            try:
+                self.recharger()
+            finally:
+                self.pret.set()
+        
+        if attendre:
+            charger()
+            if not intervalle:
+                return
+        arret = threading.Event()
+        
+        def boucle():
+            if not attendre:
+                charger()
+            while intervalle and not arret.wait(intervalle):
+                try:
+                    self.recharger(self.epuises())
+                except sqlite3.Error as e:
+                    print(f"Erreur registre du stock: {e}")
+        
+        self._arret = arret
+        threading.Thread(target=boucle, name="registre-stock", daemon=True).start()
+    
+    def fermer(self):
+        # Arrête le thread de relecture
+        if self._arret is not None:
+            self._arret.set()
+            self._arret = None
+    
+    def recharger(self, ids_types=None):
+        """
+        Relit le stock en base : tous les types, ou seulement ceux de ids_types
+        Retourne le nombre de types chargés (0 si la base n'a pas encore de tables)
+        """
+        if ids_types is not None and not ids_types:
+            return 0
+        try:
+            if ids_types is None:
+                lignes = [(r['id_type_billet'], r['quantite_disponible'])
+                          for r in self.type_billet_dao.get_all_stocks()]
+            else:
+                lignes = [(id_type, stock) for id_type, (stock, _)
+                          in self.type_billet_dao.get_stocks(ids_types).items()]
+        except sqlite3.OperationalError:
+            return 0
+        for id_type, stock in lignes:
+            self.recaler(id_type, stock)
+        return len(lignes)
+    
+    def _agrandir(self, id_type):
+        if id_type >= len(self._stock):
+            with self._verrou_taille:
+                manque = id_type + 1 - len(self._stock)
+                if manque > 0:
+                    self._reserves.extend([0] * manque)
+                    self._stock.extend([INCONNU] * manque)
+    
+    def definir(self, id_type, stock):
+        # Nouveau type de billet (aucune réservation en cours)
+        self._agrandir(id_type)
+        with self._verrou(id_type):
+            self._stock[id_type] = stock
+    
+    def recaler(self, id_type, stock_base):
+        """
+        Stock relu en base : le registre prend ce stock moins les réservations pas encore
+        enregistrées (celles-ci ne sont pas dans stock_base, on ne les écrase pas)
+        """
+        self._agrandir(id_type)
+        with self._verrou(id_type):
+            self._stock[id_type] = max(0, stock_base - self._reserves[id_type])
+    
+    def reserver(self, id_type, quantite):
+        """
+        Retire quantite du stock s'il en reste assez
+        True : réservé ; False : pas assez de stock ; None : type inconnu du registre
+        (ou quantité invalide), c'est alors la base qui décide
+        """
+        if quantite <= 0 or not 0 <= id_type < len(self._stock):
+            return None
+        with self._verrou(id_type):
+            stock = self._stock[id_type]
+            if stock == INCONNU:
+                return None
+            if stock < quantite:
+                return False
+            self._stock[id_type] = stock - quantite
+            self._reserves[id_type] += quantite
+            return True
+    
+    def confirmer(self, id_type, quantite):
+        # Réservation enregistrée en base : ces billets ne sont plus "en cours"
+        if quantite <= 0 or not 0 <= id_type < len(self._stock):
+            return
+        with self._verrou(id_type):
+            if self._stock[id_type] != INCONNU:
+                self._reserves[id_type] = max(0, self._reserves[id_type] - quantite)
+    
+    def liberer(self, id_type, quantite):
+        # Réservation abandonnée (vente refusée par la base, ou erreur) : on rend les billets
+        if quantite <= 0 or not 0 <= id_type < len(self._stock):
+            return
+        with self._verrou(id_type):
+            if self._stock[id_type] != INCONNU:
+                self._stock[id_type] += quantite
+                self._reserves[id_type] = max(0, self._reserves[id_type] - quantite)
+    
+    def rendre(self, id_type, quantite):
+        # Vente annulée en base : ses billets reviennent dans le stock
+        if quantite <= 0 or not 0 <= id_type < len(self._stock):
+            return
+        with self._verrou(id_type):
+            if self._stock[id_type] != INCONNU:
+                self._stock[id_type] += quantite
+    
+    def epuises(self):
+        # Types dont le registre refuse toute demande (ceux qu'une annulation peut rouvrir)
+        return [id_type for id_type, stock in enumerate(self._stock) if stock == 0]
+    
+    def disponible(self, id_type):
+        # Stock restant d'après le registre (None si le type est inconnu)
+        if not 0 <= id_type < len(self._stock):
+            return None
+        stock = self._stock[id_type]
+        return None if stock == INCONNU else stock
+    
+    def ecarts(self):
+        """
+        Types dont le stock diffère de la base : {id_type_billet: (registre, base)}
+        À appeler quand aucune vente n'est en cours (sinon les réservations comptent comme écarts)
+        """
+        self.pret.wait()
+        ecarts = {}
+        for r in self.type_billet_dao.get_all_stocks():
+            registre = self.disponible(r['id_type_billet'])
+            if registre != r['quantite_disponible']:
+                ecarts[r['id_type_billet']] = (registre, r['quantite_disponible'])
+        return ecarts
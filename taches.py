@@ -0,0 +1,110 @@
+# Exécution des appels au service en arrière-plan pour l'interface Tkinter
+# Tkinter n'aime pas qu'on le touche depuis un autre thread : les threads ne font
+# que les requêtes, et les résultats sont récupérés dans le thread Tk avec root.after
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+journal = logging.getLogger("billetterie.taches")
+
+
+class ExecuteurTaches:
+    """
+    Lance des fonctions dans un pool de threads et appelle le callback
+    sur_resultat (ou sur_erreur) dans le thread Tkinter
+    Chaque tâche a un "canal" (ex: "resultat" pour la zone principale) :
+    lancer une nouvelle tâche sur un canal rend la précédente obsolète,
+    elle est annulée si elle n'a pas commencé, sinon son résultat est ignoré
+    """
+    INTERVALLE_MS = 30  # fréquence de vérification des tâches terminées
+    
+    def __init__(self, root, nb_threads=2, sur_activite=None):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix="billetterie")
+        # sur_activite(liste de (libellé, secondes écoulées)) : pour la barre de statut
+        self.sur_activite = sur_activite
+        self._generations = {}  # canal -> numéro de la dernière tâche lancée
+        self._en_cours = []
+        self._verification = None
+    
+    def lancer(self, canal, fonction, *args, libelle="", sur_resultat=None, sur_erreur=None):
+        generation = self._generations.get(canal, 0) + 1
+        self._generations[canal] = generation
+        for tache in self._en_cours:
+            if tache["canal"] == canal:
+                tache["future"].cancel()
+        
+        self._en_cours.append({
+            "future": self.pool.submit(fonction, *args),
+            "canal": canal,
+            "generation": generation,
+            "libelle": libelle,
+            "debut": time.monotonic(),
+            "sur_resultat": sur_resultat,
+            "sur_erreur": sur_erreur,
+        })
+        self._planifier()
+        return generation
+    
+    def annuler(self, canal):
+        # Le résultat de la tâche en cours sur ce canal sera ignoré
+        self._generations[canal] = self._generations.get(canal, 0) + 1
+        for tache in self._en_cours:
+            if tache["canal"] == canal:
+                tache["future"].cancel()
+    
+    def _est_obsolete(self, tache):
+        return tache["generation"] != self._generations.get(tache["canal"])
+    
+    def _planifier(self):
+        if self._verification is None:
+            self._verification = self.root.after(self.INTERVALLE_MS, self._verifier)
+    
+    def _verifier(self):
+        # Tourne dans le thread Tk : on traite les tâches terminées
+        # (un callback peut lancer une nouvelle tâche : elle s'ajoute à self._en_cours)
+        self._verification = None
+        restantes = []
+        i = 0
+        try:
+            while i < len(self._en_cours):
+                tache = self._en_cours[i]
+                i += 1
+                future = tache["future"]
+                if not future.done():
+                    if not self._est_obsolete(tache):
+                        restantes.append(tache)
+                    continue
+                if future.cancelled() or self._est_obsolete(tache):
+                    continue
+                self._rappeler(tache)
+        finally:
+            # Même si quelque chose a planté : les tâches traitées ne repassent pas,
+            # et on continue de surveiller les autres
+            self._en_cours = restantes + self._en_cours[i:]
+            if self._en_cours:
+                self._planifier()
+        
+        if self.sur_activite:
+            maintenant = time.monotonic()
+            self.sur_activite([(t["libelle"], maintenant - t["debut"]) for t in restantes if t["libelle"]])
+    
+    def _rappeler(self, tache):
+        # Un callback qui lève ne doit pas arrêter la boucle : on note l'erreur et on passe
+        future = tache["future"]
+        try:
+            erreur = future.exception()
+            if erreur is not None:
+                if tache["sur_erreur"]:
+                    tache["sur_erreur"](erreur)
+            elif tache["sur_resultat"]:
+                tache["sur_resultat"](future.result())
+        except Exception:
+            journal.exception("Erreur dans le callback de la tâche %r", tache["libelle"] or tache["canal"])
+    
+    def fermer(self):
+        if self._verification is not None:
+            self.root.after_cancel(self._verification)
+            self._verification = None
+        self.pool.shutdown(wait=False, cancel_futures=True)